@@ -31,11 +31,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'oficina.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'oficina.middleware.OficinaMiddleware',
+    'oficina.replica.LeituraPrimarioMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,13 +67,87 @@ WSGI_APPLICATION = 'mecanosync_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Configurado por variáveis de ambiente (padrão: SQLite em db.sqlite3):
+# DB_ENGINE, DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT.
+# As conexões são reaproveitadas entre requisições por DB_CONN_MAX_AGE
+# segundos e verificadas antes do reuso (DB_CONN_HEALTH_CHECKS).
+#
+# Em produção com SQLite use DB_ENGINE=oficina.backends.sqlite3 (WAL,
+# busy_timeout e transações IMMEDIATE; ver oficina/backends/sqlite3/base.py)
+# e os comandos sqlite_checkpoint, sqlite_otimizar e sqlite_backup.
+#
+# Réplica de leitura (opcional): DB_REPLICA_NAME e/ou DB_REPLICA_HOST,
+# DB_REPLICA_PORT, DB_REPLICA_USER, DB_REPLICA_PASSWORD; os demais valores
+# vêm do primário. Só as views com @somente_leitura leem dela (ver
+# oficina/replica.py). Para testar localmente, copie db.sqlite3 para outro
+# arquivo e use DB_REPLICA_NAME=<arquivo>.
+
+def _banco(prefixo, base=None):
+    base = base or {}
+    return {
+        chave: os.environ.get(f'{prefixo}_{chave}', base.get(chave, padrao))
+        for chave, padrao in [
+            ('ENGINE', 'django.db.backends.sqlite3'),
+            ('NAME', str(BASE_DIR / 'db.sqlite3')),
+            ('USER', ''),
+            ('PASSWORD', ''),
+            ('HOST', ''),
+            ('PORT', ''),
+        ]
+    }
+
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        **_banco('DB'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
     }
 }
 
+if os.environ.get('DB_REPLICA_NAME') or os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        **_banco('DB_REPLICA', base=DATABASES['default']),
+        # Nos testes a réplica é o próprio banco de teste do primário
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['oficina.replica.RoteadorReplica']
+
+# Segundos em que as leituras de um navegador ficam no primário após ele alterar dados
+REPLICA_ATRASO_MAXIMO = int(os.environ.get('DB_REPLICA_ATRASO_MAXIMO', 10))
+
+
+# Cache
+# Precisa ser compartilhado entre os processos do servidor: o contexto da
+# oficina e o dashboard são invalidados nele. Em produção aponte para
+# Redis/Memcached, ex.: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://127.0.0.1:6379/1
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+
+
+# Métricas de desempenho (oficina/metricas.py), expostas em /metricas/ para superusuários
+# METRICAS_DIR é compartilhado pelos workers e deve ser esvaziado a cada reinício do servidor
+
+METRICAS_HABILITADAS = os.environ.get('MECANOSYNC_METRICAS', '1') == '1'
+METRICAS_DIR = os.environ.get('METRICAS_DIR', str(BASE_DIR / 'metricas'))
+METRICAS_INTERVALO_GRAVACAO = int(os.environ.get('METRICAS_INTERVALO_GRAVACAO', '5'))
+
+
+# Exclusão de oficinas em segundo plano (oficina/exclusao.py)
+# Sem a thread, as exclusões ficam pendentes até o comando processar_exclusoes rodar
+
+EXCLUSAO_EM_SEGUNDO_PLANO = os.environ.get('MECANOSYNC_EXCLUSAO_THREAD', '1') == '1'
+EXCLUSAO_TAMANHO_LOTE = int(os.environ.get('EXCLUSAO_TAMANHO_LOTE', '500'))
+EXCLUSAO_CONCESSAO_SEGUNDOS = int(os.environ.get('EXCLUSAO_CONCESSAO_SEGUNDOS', '60'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
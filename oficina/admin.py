@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Cliente, Veiculo, Servico, OrdemServico, ItemServico, Pagamento, Oficina
+from .catalogo import ServicoChoiceField
+from .models import (
+    Cliente, Veiculo, Servico, OrdemServico, ItemServico, Pagamento, Oficina,
+    Peca, MovimentoEstoque, SaldoEstoque, ExclusaoOficina,
+)
 
 
 @admin.register(Oficina)
@@ -31,6 +35,10 @@ class ClienteAdmin(admin.ModelAdmin):
     search_fields = ('nome', 'cpf_cnpj', 'telefone', 'email')
     date_hierarchy = 'data_cadastro'
 
+    def get_readonly_fields(self, request, obj=None):
+        # A oficina não muda depois do cadastro (ver Cliente.clean)
+        return ('oficina',) if obj is not None else ()
+
 
 @admin.register(Veiculo)
 class VeiculoAdmin(admin.ModelAdmin):
@@ -49,6 +57,13 @@ class ServicoAdmin(admin.ModelAdmin):
 class ItemServicoInline(admin.TabularInline):
     model = ItemServico
     extra = 1
+    readonly_fields = ('valor_total',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'servico':
+            # Um select por linha: servido pelo catálogo em memória, sem consultas
+            return ServicoChoiceField(apenas_ativos=False, required=not db_field.blank, label=db_field.verbose_name)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 class PagamentoInline(admin.TabularInline):
@@ -63,7 +78,12 @@ class OrdemServicoAdmin(admin.ModelAdmin):
     search_fields = ('numero_os', 'cliente__nome', 'veiculo__placa')
     date_hierarchy = 'data_entrada'
     inlines = [ItemServicoInline, PagamentoInline]
-    readonly_fields = ('numero_os', 'criado_em', 'atualizado_em')
+    # valor_total é a soma dos itens (ver totais.py)
+    readonly_fields = ('numero_os', 'valor_total', 'valor_final', 'criado_em', 'atualizado_em')
+
+    def get_readonly_fields(self, request, obj=None):
+        # A oficina não muda depois do cadastro (ver OrdemServico.clean)
+        return self.readonly_fields + (('oficina',) if obj is not None else ())
 
 
 @admin.register(Pagamento)
@@ -72,3 +92,52 @@ class PagamentoAdmin(admin.ModelAdmin):
     list_filter = ('status', 'metodo', 'data_pagamento')
     search_fields = ('ordem__numero_os', 'ordem__cliente__nome')
     date_hierarchy = 'data_pagamento'
+
+
+@admin.register(Peca)
+class PecaAdmin(admin.ModelAdmin):
+    list_display = ('codigo', 'nome', 'oficina', 'unidade', 'custo_unitario', 'estoque_minimo', 'ativo')
+    list_filter = ('ativo',)
+    search_fields = ('codigo', 'nome', 'oficina__nome')
+
+
+@admin.register(MovimentoEstoque)
+class MovimentoEstoqueAdmin(admin.ModelAdmin):
+    list_display = ('criado_em', 'peca', 'tipo', 'quantidade', 'custo_unitario', 'ordem', 'usuario')
+    list_filter = ('tipo', 'criado_em')
+    search_fields = ('peca__codigo', 'peca__nome', 'ordem__numero_os')
+    raw_id_fields = ('peca', 'ordem')
+    date_hierarchy = 'criado_em'
+
+    # O razão só recebe lançamentos novos, feitos pela tela de movimentação
+    # (estoque.registrar_movimento confere o saldo das saídas); correções são
+    # feitas com ajustes
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SaldoEstoque)
+class SaldoEstoqueAdmin(admin.ModelAdmin):
+    list_display = ('peca', 'quantidade', 'ultimo_movimento_id', 'criado_em')
+    search_fields = ('peca__codigo', 'peca__nome')
+    raw_id_fields = ('peca',)
+
+
+@admin.register(ExclusaoOficina)
+class ExclusaoOficinaAdmin(admin.ModelAdmin):
+    list_display = ('oficina_nome', 'status', 'etapa', 'removidos', 'total', 'criado_em', 'concluido_em')
+    list_filter = ('status',)
+    search_fields = ('oficina_nome',)
+
+    # Criadas pelo painel de oficinas e atualizadas só por exclusao.py
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -5,3 +5,10 @@ class OficinaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'oficina'
     verbose_name = 'Oficina Mecânica'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals
+
+        post_migrate.connect(signals.garantir_busca_apos_migrate, sender=self)
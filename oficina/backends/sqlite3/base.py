@@ -0,0 +1,46 @@
+"""
+Backend SQLite para produção (DB_ENGINE=oficina.backends.sqlite3).
+
+Igual ao backend sqlite3 do Django, mas cada conexão nova recebe os PRAGMAs
+abaixo e as transações (transaction.atomic) começam com BEGIN IMMEDIATE.
+
+- journal_mode=WAL: leitores não bloqueiam o escritor e vice-versa;
+- synchronous=NORMAL: seguro com WAL, sem fsync a cada commit;
+- busy_timeout: espera o lock de escrita em vez de falhar na hora com
+  "database is locked";
+- BEGIN IMMEDIATE: a transação pega o lock de escrita logo no início. Com o
+  BEGIN padrão (DEFERRED) uma transação que leu e depois tenta escrever
+  enquanto outra escreve recebe SQLITE_BUSY sem passar pelo busy_timeout.
+
+Os valores podem ser trocados em OPTIONS['pragmas'] no settings.
+"""
+from django.db.backends.sqlite3 import base
+
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10000,  # ms
+    'cache_size': -64000,  # KiB (negativo), ou seja, 64 MB por conexão
+    'mmap_size': 268435456,  # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Opção deste backend, não do sqlite3.connect
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = {**PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+        for nome, valor in pragmas.items():
+            conn.execute(f'PRAGMA {nome} = {valor}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,343 @@
+"""
+Busca textual de clientes, veículos e ordens de serviço.
+
+Cada registro indexado vira uma linha de IndiceBusca com o texto já
+normalizado (minúsculas e sem acentos). Sobre essa tabela:
+
+- SQLite: tabela virtual FTS5 de conteúdo externo, mantida por triggers;
+- PostgreSQL: índice GIN sobre to_tsvector('simple', conteudo);
+- outros bancos: icontains sobre o conteúdo normalizado.
+
+Os termos buscados são casados por prefixo e todos precisam aparecer. O
+índice é atualizado pelos sinais de save/delete (ver signals.py); caminhos
+que usam bulk_create devem chamar indexar_em_lote.
+
+No SQLite, migrações que alterem a tabela oficina_indicebusca a recriam e
+descartam os triggers. Depois de todo migrate, garantir_estrutura_busca
+(sinal post_migrate, ver apps.py) recria o que estiver faltando e
+reconstrói a tabela FTS5 a partir do índice.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Cliente, IndiceBusca, OrdemServico, Veiculo
+
+
+TABELA = 'oficina_indicebusca'
+TABELA_FTS = 'oficina_indicebusca_fts'
+# Autocomplete: resultados por resposta e caracteres mínimos digitados
+LIMITE_SUGESTOES = 10
+MINIMO_SUGESTAO = 2
+
+
+def normalizar(texto):
+    """Remove acentos e converte para minúsculas"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def termos(texto):
+    """Termos alfanuméricos normalizados de um texto de busca"""
+    return re.findall(r'[a-z0-9]+', normalizar(texto))
+
+
+def _digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def _juntar(*partes):
+    return normalizar(' '.join(str(p) for p in partes if p))
+
+
+def conteudo_cliente(cliente):
+    # CPF/CNPJ e telefone também sem pontuação, para buscas só com números
+    return _juntar(
+        cliente.nome, cliente.cpf_cnpj, _digitos(cliente.cpf_cnpj),
+        cliente.telefone, _digitos(cliente.telefone), cliente.email
+    )
+
+
+def conteudo_veiculo(veiculo):
+    placa = veiculo.placa or ''
+    return _juntar(placa, placa.replace('-', ''), veiculo.marca, veiculo.modelo, veiculo.ano, veiculo.cor)
+
+
+def conteudo_ordem(ordem):
+    return _juntar(ordem.numero_os, ordem.descricao_problema)
+
+
+def _tipo(objeto):
+    if isinstance(objeto, Cliente):
+        return 'cliente'
+    if isinstance(objeto, Veiculo):
+        return 'veiculo'
+    if isinstance(objeto, OrdemServico):
+        return 'ordem'
+    raise TypeError(f'Objeto não indexável: {objeto!r}')
+
+
+def _entrada(objeto):
+    """Retorna (tipo, oficina_id, conteudo) do objeto a indexar"""
+    tipo = _tipo(objeto)
+    if tipo == 'cliente':
+        return tipo, objeto.oficina_id, conteudo_cliente(objeto)
+    if tipo == 'veiculo':
+        return tipo, objeto.oficina_id, conteudo_veiculo(objeto)
+    return tipo, objeto.oficina_id, conteudo_ordem(objeto)
+
+
+def indexar(objeto):
+    """Cria ou atualiza a entrada do objeto no índice de busca"""
+    tipo, oficina_id, conteudo = _entrada(objeto)
+    entrada = IndiceBusca.objects.filter(tipo=tipo, objeto_id=objeto.pk)
+    if oficina_id is None:
+        # Registros sem oficina não aparecem em nenhuma busca
+        entrada.delete()
+    elif not entrada.update(oficina_id=oficina_id, conteudo=conteudo):
+        IndiceBusca.objects.create(tipo=tipo, objeto_id=objeto.pk, oficina_id=oficina_id, conteudo=conteudo)
+
+
+def indexar_em_lote(objetos, batch_size=1000):
+    """Indexa objetos recém-criados com bulk_create (que não dispara sinais)"""
+    entradas = []
+    for objeto in objetos:
+        tipo, oficina_id, conteudo = _entrada(objeto)
+        if oficina_id is not None:
+            entradas.append(IndiceBusca(tipo=tipo, objeto_id=objeto.pk, oficina_id=oficina_id, conteudo=conteudo))
+    IndiceBusca.objects.bulk_create(entradas, batch_size=batch_size)
+
+
+def remover(objeto):
+    """Remove o objeto do índice de busca"""
+    IndiceBusca.objects.filter(tipo=_tipo(objeto), objeto_id=objeto.pk).delete()
+
+
+def _consulta(lista_termos):
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f'{termo}:*' for termo in lista_termos)
+    return ' '.join(f'"{termo}"*' for termo in lista_termos)
+
+
+def filtro_ids(tipo, oficina, texto):
+    """
+    Subconsulta com os IDs dos objetos do `tipo` da oficina que casam com o
+    texto, para usar em `pk__in`. Retorna None se o texto não tiver termos.
+    """
+    lista_termos = termos(texto)
+    if not lista_termos:
+        return None
+
+    if connection.vendor == 'sqlite':
+        return RawSQL(
+            f'SELECT b.objeto_id FROM {TABELA} b WHERE b.oficina_id = %s AND b.tipo = %s '
+            f'AND b.id IN (SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s)',
+            (oficina.pk, tipo, _consulta(lista_termos))
+        )
+    if connection.vendor == 'postgresql':
+        return RawSQL(
+            f"SELECT objeto_id FROM {TABELA} WHERE oficina_id = %s AND tipo = %s "
+            f"AND to_tsvector('simple', conteudo) @@ to_tsquery('simple', %s)",
+            (oficina.pk, tipo, _consulta(lista_termos))
+        )
+
+    entradas = IndiceBusca.objects.filter(oficina=oficina, tipo=tipo)
+    for termo in lista_termos:
+        entradas = entradas.filter(conteudo__icontains=termo)
+    return entradas.values('objeto_id')
+
+
+def buscar(oficina, texto, tipos=None, limite=20):
+    """
+    Busca ordenada por relevância. Retorna uma lista de (tipo, objeto_id)
+    com no máximo `limite` resultados dos tipos informados (padrão: todos).
+    """
+    lista_termos = termos(texto)
+    if not lista_termos:
+        return []
+    tipos = list(tipos or dict(IndiceBusca.TIPO_CHOICES))
+    marcadores = ', '.join(['%s'] * len(tipos))
+    consulta = _consulta(lista_termos)
+
+    if connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT b.tipo, b.objeto_id FROM {TABELA_FTS} JOIN {TABELA} b ON b.id = {TABELA_FTS}.rowid '
+            f'WHERE {TABELA_FTS} MATCH %s AND b.oficina_id = %s AND b.tipo IN ({marcadores}) '
+            f'ORDER BY bm25({TABELA_FTS}) LIMIT %s'
+        )
+        parametros = [consulta, oficina.pk, *tipos, limite]
+    elif connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT tipo, objeto_id FROM {TABELA} "
+            f"WHERE oficina_id = %s AND tipo IN ({marcadores}) "
+            f"AND to_tsvector('simple', conteudo) @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank(to_tsvector('simple', conteudo), to_tsquery('simple', %s)) DESC LIMIT %s"
+        )
+        parametros = [oficina.pk, *tipos, consulta, consulta, limite]
+    else:
+        entradas = IndiceBusca.objects.filter(oficina=oficina, tipo__in=tipos)
+        for termo in lista_termos:
+            entradas = entradas.filter(conteudo__icontains=termo)
+        return list(entradas.order_by('id').values_list('tipo', 'objeto_id')[:limite])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return cursor.fetchall()
+
+
+def rotulo_cliente(cliente):
+    return f'{cliente.nome} - {cliente.cpf_cnpj}'
+
+
+def _posicoes(encontrados, tipo, relacionados):
+    """
+    Posição de relevância de cada objeto do `tipo`: a do próprio objeto ou a
+    do melhor registro relacionado encontrado (`relacionados`: {pk do
+    relacionado: pk do objeto}).
+    """
+    posicoes = {}
+    for posicao, (tipo_encontrado, pk) in enumerate(encontrados):
+        pk = pk if tipo_encontrado == tipo else relacionados.get(pk)
+        if pk is not None:
+            posicoes.setdefault(pk, posicao)
+    return posicoes
+
+
+def sugestoes(oficina, tipo, texto, cliente_id=None, limite=LIMITE_SUGESTOES):
+    """
+    Clientes ativos, veículos ou ordens não encerradas da oficina para o
+    autocomplete dos formulários, em ordem de relevância. Um cliente também
+    é encontrado pela placa dos seus veículos, um veículo pelo nome ou
+    CPF/CNPJ do dono e uma ordem pelo cliente ou pela placa. Retorna
+    dicionários prontos para a resposta JSON.
+    """
+    lista_termos = termos(texto)
+    if tipo == 'veiculo' and cliente_id and not lista_termos:
+        # Sem texto: os veículos do cliente já escolhido
+        veiculos = Veiculo.objects.filter(oficina=oficina, cliente_id=cliente_id).order_by('marca', 'modelo', 'id')
+        return [
+            {'id': veiculo.pk, 'texto': str(veiculo), 'cliente_id': veiculo.cliente_id}
+            for veiculo in veiculos[:limite]
+        ]
+    if sum(len(termo) for termo in lista_termos) < MINIMO_SUGESTAO:
+        return []
+
+    # Mais resultados que o limite: parte deles pode ser descartada (inativos, outro cliente)
+    tipos = ['cliente', 'veiculo', 'ordem'] if tipo == 'ordem' else ['cliente', 'veiculo']
+    encontrados = buscar(oficina, texto, tipos=tipos, limite=limite * 3)
+    ids = {'cliente': [], 'veiculo': [], 'ordem': []}
+    for tipo_encontrado, pk in encontrados:
+        ids[tipo_encontrado].append(pk)
+
+    if tipo == 'ordem':
+        ordens = list(OrdemServico.objects.filter(
+            Q(pk__in=ids['ordem']) | Q(cliente_id__in=ids['cliente']) | Q(veiculo_id__in=ids['veiculo']),
+            oficina=oficina,
+        ).exclude(status__in=OrdemServico.STATUS_ENCERRADOS).select_related('cliente').order_by('-pk')[:limite * 3])
+        posicoes = [_posicoes(encontrados, relacionado, {}) for relacionado in ('ordem', 'cliente', 'veiculo')]
+        infinito = len(encontrados)
+        ordens.sort(key=lambda ordem: min(
+            posicao.get(pk, infinito) for posicao, pk in zip(posicoes, (ordem.pk, ordem.cliente_id, ordem.veiculo_id))
+        ))
+        return [{'id': ordem.pk, 'texto': str(ordem)} for ordem in ordens[:limite]]
+
+    if tipo == 'cliente':
+        donos = dict(Veiculo.objects.filter(oficina=oficina, pk__in=ids['veiculo']).values_list('pk', 'cliente_id'))
+        posicoes = _posicoes(encontrados, 'cliente', donos)
+        clientes = Cliente.objects.filter(oficina=oficina, ativo=True, pk__in=list(posicoes))
+        clientes = sorted(clientes, key=lambda cliente: posicoes[cliente.pk])[:limite]
+        return [{'id': cliente.pk, 'texto': rotulo_cliente(cliente)} for cliente in clientes]
+
+    veiculos = Veiculo.objects.filter(
+        Q(pk__in=ids['veiculo']) | Q(cliente_id__in=ids['cliente']), oficina=oficina
+    ).select_related('cliente')
+    if cliente_id:
+        veiculos = veiculos.filter(cliente_id=cliente_id)
+    veiculos = list(veiculos[:limite * 3])
+    posicoes = _posicoes(encontrados, 'veiculo', {})
+    donos = _posicoes(encontrados, 'cliente', {})
+    infinito = len(encontrados)
+    veiculos.sort(key=lambda veiculo: min(posicoes.get(veiculo.pk, infinito), donos.get(veiculo.cliente_id, infinito)))
+    return [
+        {
+            'id': veiculo.pk, 'texto': str(veiculo),
+            'cliente_id': veiculo.cliente_id, 'cliente': rotulo_cliente(veiculo.cliente),
+        }
+        for veiculo in veiculos[:limite]
+    ]
+
+
+def _comandos_estrutura(vendor):
+    """SQL que cria a tabela FTS5 e seus triggers (SQLite) ou o índice GIN (PostgreSQL)"""
+    if vendor == 'sqlite':
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+            f"conteudo, content='{TABELA}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ai AFTER INSERT ON {TABELA} BEGIN "
+            f"INSERT INTO {TABELA_FTS}(rowid, conteudo) VALUES (new.id, new.conteudo); END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ad AFTER DELETE ON {TABELA} BEGIN "
+            f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, conteudo) VALUES ('delete', old.id, old.conteudo); END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA}_au AFTER UPDATE ON {TABELA} BEGIN "
+            f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, conteudo) VALUES ('delete', old.id, old.conteudo); "
+            f"INSERT INTO {TABELA_FTS}(rowid, conteudo) VALUES (new.id, new.conteudo); END",
+            f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')",
+        ]
+    if vendor == 'postgresql':
+        return [
+            f"CREATE INDEX IF NOT EXISTS {TABELA}_tsv_idx ON {TABELA} "
+            f"USING GIN (to_tsvector('simple', conteudo))"
+        ]
+    return []
+
+
+def criar_estrutura_busca(schema_editor):
+    """Cria a tabela FTS5 e seus triggers (SQLite) ou o índice GIN (PostgreSQL)"""
+    for comando in _comandos_estrutura(schema_editor.connection.vendor):
+        schema_editor.execute(comando)
+
+
+def _estrutura_incompleta(conexao):
+    tabelas = conexao.introspection.table_names()
+    if TABELA not in tabelas:
+        # Banco migrado para antes do índice de busca
+        return False
+    if conexao.vendor == 'sqlite':
+        esperados = {TABELA_FTS, f'{TABELA}_ai', f'{TABELA}_ad', f'{TABELA}_au'}
+        with conexao.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+                sorted(esperados),
+            )
+            return {nome for nome, in cursor.fetchall()} != esperados
+    if conexao.vendor == 'postgresql':
+        with conexao.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', [f'{TABELA}_tsv_idx'])
+            return cursor.fetchone() is None
+    return False
+
+
+def garantir_estrutura_busca(conexao):
+    """
+    Recria a estrutura de busca se faltar alguma parte (ex.: triggers
+    descartados por uma migração que recriou a tabela no SQLite).
+    Retorna True se precisou recriar.
+    """
+    if not _estrutura_incompleta(conexao):
+        return False
+    with conexao.cursor() as cursor:
+        for comando in _comandos_estrutura(conexao.vendor):
+            cursor.execute(comando)
+    return True
+
+
+def remover_estrutura_busca(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sufixo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {TABELA}_{sufixo}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABELA_FTS}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TABELA}_tsv_idx')
@@ -0,0 +1,173 @@
+"""
+Catálogo de serviços (Servico) em memória.
+
+Os serviços são poucos, comuns a todas as oficinas e quase nunca mudam, mas
+aparecem no select de cada item de serviço (formulário da OS e inlines do
+admin) e na consulta de preço padrão. Cada processo guarda o catálogo
+inteiro em memória junto com a versão com que foi lido; a versão fica no
+cache compartilhado e é trocada sempre que um serviço é salvo ou excluído
+(ver signals.py). Cada acesso compara a versão local com a compartilhada:
+com o catálogo atual, o select e o preço não fazem nenhuma consulta SQL, e
+todos os workers descartam a cópia antiga sem reiniciar.
+
+A versão é lida antes da consulta ao banco, que é sempre feita no primário
+(ver replica.py): se um serviço mudar durante a leitura, o catálogo fica
+guardado com a versão antiga e é relido no acesso seguinte.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from django import forms
+from django.core.cache import cache
+
+from .models import Servico
+from .replica import leitura_no_primario
+
+
+CHAVE_VERSAO = 'catalogo_servicos:versao'
+
+_trava = threading.Lock()
+_local = {'versao': None, 'servicos': {}}
+
+
+@dataclass(frozen=True)
+class ServicoCatalogo:
+    pk: int
+    nome: str
+    valor_padrao: Decimal
+    tempo_estimado: Optional[int]
+    ativo: bool
+
+    def instancia(self):
+        """Servico equivalente, como se lido do banco, sem consulta"""
+        servico = Servico(
+            pk=self.pk, nome=self.nome, valor_padrao=self.valor_padrao,
+            tempo_estimado=self.tempo_estimado, ativo=self.ativo,
+        )
+        servico._state.adding = False
+        servico._state.db = 'default'
+        return servico
+
+
+def versao_catalogo():
+    """Versão atual do catálogo (trocada a cada alteração de serviço)"""
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO, time.time_ns(), None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def invalidar_catalogo():
+    """Faz todos os processos relerem o catálogo no próximo acesso"""
+    cache.set(CHAVE_VERSAO, time.time_ns(), None)
+
+
+def catalogo():
+    """{id: ServicoCatalogo} de todos os serviços, em ordem de nome"""
+    versao = versao_catalogo()
+    if _local['versao'] == versao:
+        return _local['servicos']
+    with leitura_no_primario():
+        servicos = {
+            linha[0]: ServicoCatalogo(*linha)
+            for linha in Servico.objects.order_by('nome', 'pk').values_list(
+                'pk', 'nome', 'valor_padrao', 'tempo_estimado', 'ativo'
+            )
+        }
+    with _trava:
+        _local['versao'] = versao
+        _local['servicos'] = servicos
+    return servicos
+
+
+def servico(pk):
+    """ServicoCatalogo do id, ou None"""
+    return catalogo().get(pk)
+
+
+def valor_padrao(pk):
+    """Preço padrão do serviço, ou None se não existir"""
+    encontrado = servico(pk)
+    return encontrado.valor_padrao if encontrado else None
+
+
+def nomes(pks):
+    """{id: nome} dos serviços informados que existem"""
+    servicos = catalogo()
+    return {pk: servicos[pk].nome for pk in pks if pk in servicos}
+
+
+class _Opcoes:
+    """Opções do select, lidas do catálogo a cada iteração"""
+
+    def __init__(self, campo):
+        self.campo = campo
+
+    def __iter__(self):
+        if self.campo.empty_label is not None:
+            yield ('', self.campo.empty_label)
+        for item in self.campo._disponiveis():
+            yield (item.pk, item.nome)
+
+    def __len__(self):
+        return len(self.campo._disponiveis()) + (self.campo.empty_label is not None)
+
+    def __bool__(self):
+        return self.campo.empty_label is not None or bool(self.campo._disponiveis())
+
+
+class ServicoChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField de Servico servido pelo catálogo: as opções e a
+    validação do id enviado não consultam o banco. Com apenas_ativos os
+    serviços inativos ficam de fora (exceto `incluir`, o serviço atual de um
+    item já lançado).
+    """
+
+    def __init__(self, apenas_ativos=True, incluir=None, **kwargs):
+        # Antes do super(): atribuir o queryset já monta as opções do widget
+        self.apenas_ativos = apenas_ativos
+        self.incluir = incluir
+        kwargs.setdefault('queryset', Servico.objects.none())
+        super().__init__(**kwargs)
+
+    def _disponiveis(self):
+        return [
+            item for item in catalogo().values()
+            if not self.apenas_ativos or item.ativo or item.pk == self.incluir
+        ]
+
+    def _get_choices(self):
+        # Preguiçoso como o ModelChoiceIterator: o form é montado na importação
+        return _Opcoes(self)
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def prepare_value(self, value):
+        if isinstance(value, Servico):
+            return value.pk
+        return super().prepare_value(value)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, Servico):
+            return value
+        try:
+            pk = int(value)
+        except (TypeError, ValueError):
+            pk = None
+        encontrado = next((item for item in self._disponiveis() if item.pk == pk), None)
+        if encontrado is None:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return encontrado.instancia()
+
+    def has_changed(self, initial, data):
+        if self.disabled:
+            return False
+        inicial = initial.pk if isinstance(initial, Servico) else initial
+        return str(inicial if inicial is not None else '') != str(data if data is not None else '')
@@ -0,0 +1,89 @@
+"""
+Validadores de GET condicional (ETag/Last-Modified) para o decorator
+django.views.decorators.http.condition.
+
+Cada validador faz uma única consulta leve (values_list/aggregate) sobre
+os carimbos atualizado_em; quando o navegador já tem a versão atual, a view
+responde 304 sem carregar os objetos nem renderizar nada. Os valores são
+guardados na requisição porque o decorator chama a função de ETag e a de
+Last-Modified separadamente.
+
+Páginas HTML também dependem do usuário, dos módulos da oficina (menu) e
+de mensagens pendentes: o ETag inclui o usuário e a geração do contexto de
+oficina (ver middleware.py), e com mensagens na fila não há validador.
+"""
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+
+from .catalogo import versao_catalogo
+from .middleware import geracao_contexto
+from .models import OrdemServico, Veiculo
+
+
+def _etag(*partes):
+    return hashlib.md5('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+
+
+def _memorizar(request, chave, calcular):
+    cache = request.__dict__.setdefault('_validadores', {})
+    if chave not in cache:
+        cache[chave] = calcular()
+    return cache[chave]
+
+
+def _ordem(request, pk):
+    def calcular():
+        if request.oficina is None or len(get_messages(request)):
+            return None
+        return OrdemServico.objects.filter(pk=pk, oficina=request.oficina).values_list(
+            'atualizado_em', 'veiculo__atualizado_em', 'cliente__nome', 'cliente__telefone'
+        ).first()
+    return _memorizar(request, ('ordem', pk), calcular)
+
+
+def etag_ordem(request, pk):
+    dados = _ordem(request, pk)
+    if dados is None:
+        return None
+    # Os itens da ordem mostram o nome do serviço do catálogo
+    return _etag('ordem', pk, request.user.pk, geracao_contexto(request.user.pk), versao_catalogo(), *dados)
+
+
+def ultima_alteracao_ordem(request, pk):
+    dados = _ordem(request, pk)
+    if dados is None:
+        return None
+    # Alterações só do cliente não mudam as datas; nesses casos vale o ETag
+    return max(dados[0], dados[1])
+
+
+def _veiculo(request, pk):
+    def calcular():
+        if request.oficina is None:
+            return None
+        return Veiculo.objects.filter(pk=pk, oficina=request.oficina).values_list('atualizado_em', flat=True).first()
+    return _memorizar(request, ('veiculo', pk), calcular)
+
+
+def etag_veiculo(request, pk):
+    atualizado_em = _veiculo(request, pk)
+    if atualizado_em is None:
+        return None
+    return _etag('veiculo', pk, atualizado_em.isoformat())
+
+
+def ultima_alteracao_veiculo(request, pk):
+    return _veiculo(request, pk)
+
+
+def etag_veiculos_cliente(request):
+    cliente_id = request.GET.get('cliente_id')
+    if request.oficina is None or not cliente_id or not cliente_id.isdigit():
+        return None
+    # A contagem cobre exclusões, que não deixam carimbo de data
+    dados = Veiculo.objects.filter(cliente_id=cliente_id, oficina=request.oficina).aggregate(
+        quantidade=Count('id'), ultima=Max('atualizado_em')
+    )
+    return _etag('veiculos', cliente_id, dados['quantidade'], dados['ultima'])
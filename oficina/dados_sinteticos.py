@@ -0,0 +1,339 @@
+"""
+Dados sintéticos para testes de carga e benchmarks.
+
+Gera oficinas completas (proprietário, clientes, veículos, ordens com itens,
+pagamentos e peças em estoque) com bulk_create, em lotes, sem passar pelo
+save() e pelos sinais de cada registro. O que os sinais manteriam é feito em
+lote aqui mesmo: números de OS em blocos de SequenciaOS.reservar, índice de
+busca com indexar_em_lote e faturamento diário com registrar_pagamentos_novos.
+
+A geração é reprodutível pela `semente`. Usuários, CNPJs e placas levam um
+rótulo que ainda não existe no banco, então várias gerações podem conviver
+no mesmo banco (inclusive com dados reais).
+"""
+import random
+import string
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .busca import indexar_em_lote
+from .catalogo import invalidar_catalogo
+from .estatisticas import invalidar_dashboard
+from .models import (
+    Cliente, ItemServico, MovimentoEstoque, Oficina, OrdemServico, Pagamento, Peca, SequenciaOS, Servico, Veiculo,
+)
+from .receita import registrar_pagamentos_novos
+
+
+TAMANHO_LOTE = 1000
+
+NOMES = [
+    'Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+    'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sabrina', 'Thiago', 'Vanessa', 'Wagner',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+]
+CIDADES = ['São Paulo', 'Campinas', 'Santos', 'Sorocaba', 'Ribeirão Preto', 'Belo Horizonte', 'Curitiba']
+MODELOS = {
+    'Volkswagen': ['Gol', 'Polo', 'Saveiro', 'T-Cross'],
+    'Chevrolet': ['Onix', 'Prisma', 'S10', 'Tracker'],
+    'Fiat': ['Uno', 'Argo', 'Strada', 'Toro'],
+    'Ford': ['Ka', 'Fiesta', 'Ranger', 'EcoSport'],
+    'Toyota': ['Corolla', 'Etios', 'Hilux', 'Yaris'],
+    'Hyundai': ['HB20', 'Creta', 'Tucson'],
+}
+CORES = ['Branco', 'Prata', 'Preto', 'Cinza', 'Vermelho', 'Azul']
+PROBLEMAS = [
+    'Barulho na suspensão dianteira', 'Revisão periódica', 'Freio fazendo ruído', 'Troca de óleo e filtros',
+    'Motor falhando na partida', 'Ar-condicionado não gela', 'Luz de injeção acesa', 'Vazamento de óleo',
+    'Embreagem patinando', 'Alinhamento e balanceamento',
+]
+SERVICOS = [
+    ('Troca de óleo', Decimal('120.00')), ('Alinhamento', Decimal('80.00')), ('Balanceamento', Decimal('60.00')),
+    ('Troca de pastilhas de freio', Decimal('180.00')), ('Revisão completa', Decimal('450.00')),
+    ('Diagnóstico eletrônico', Decimal('150.00')), ('Troca de embreagem', Decimal('900.00')),
+    ('Higienização do ar-condicionado', Decimal('130.00')), ('Troca de amortecedores', Decimal('700.00')),
+    ('Troca de correia dentada', Decimal('550.00')),
+]
+PECAS = [
+    ('Filtro de óleo', 'un'), ('Óleo 5W30', 'l'), ('Pastilha de freio', 'jg'), ('Filtro de ar', 'un'),
+    ('Vela de ignição', 'un'), ('Correia dentada', 'un'), ('Amortecedor dianteiro', 'un'), ('Fluido de freio', 'l'),
+    ('Lâmpada H4', 'un'), ('Palheta limpador', 'un'),
+]
+METODOS = [metodo for metodo, _ in Pagamento.METODO_CHOICES]
+
+
+@dataclass
+class Escala:
+    """Tamanho do conjunto gerado. Valores "por" são máximos sorteados de 1 até o valor"""
+    oficinas: int = 2
+    clientes: int = 200  # por oficina
+    veiculos: int = 2  # por cliente
+    ordens: int = 1000  # por oficina
+    itens: int = 3  # por ordem
+    pagamentos: int = 2  # por ordem concluída ou entregue
+    pecas: int = 30  # por oficina
+    meses: int = 12  # período das datas de entrada
+
+
+@dataclass
+class ResultadoGeracao:
+    rotulo: str = ''
+    oficinas: list = field(default_factory=list)
+    usuarios: list = field(default_factory=list)
+    superusuario: User = None
+    contagem: dict = field(default_factory=dict)
+
+    def somar(self, nome, quantidade):
+        self.contagem[nome] = self.contagem.get(nome, 0) + quantidade
+
+
+def _em_lotes(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def _rotulo_livre(aleatorio):
+    """Três letras que ainda não aparecem em usuários nem placas do banco"""
+    while True:
+        rotulo = ''.join(aleatorio.choices(string.ascii_uppercase, k=3))
+        if (not User.objects.filter(username__startswith=f'sint_{rotulo.lower()}_').exists()
+                and not Veiculo.objects.filter(placa__startswith=rotulo).exists()):
+            return rotulo
+
+
+def _catalogo_servicos():
+    """Serviços ativos, criando o catálogo de exemplo se ainda não houver nenhum"""
+    servicos = list(Servico.objects.filter(ativo=True))
+    if not servicos:
+        servicos = Servico.objects.bulk_create(
+            [Servico(nome=nome, valor_padrao=valor, tempo_estimado=2) for nome, valor in SERVICOS]
+        )
+        # bulk_create não dispara o sinal que troca a versão do catálogo
+        transaction.on_commit(invalidar_catalogo)
+    return servicos
+
+
+def _documento(aleatorio):
+    numeros = ''.join(aleatorio.choices(string.digits, k=11))
+    return f'{numeros[:3]}.{numeros[3:6]}.{numeros[6:9]}-{numeros[9:]}'
+
+
+def _telefone(aleatorio):
+    return f'(11) 9{aleatorio.randint(1000, 9999)}-{aleatorio.randint(1000, 9999)}'
+
+
+def gerar(escala, semente=0, senha=None, tamanho_lote=TAMANHO_LOTE, ao_progredir=None):
+    """
+    Gera `escala.oficinas` oficinas com seus dados e retorna um
+    ResultadoGeracao. Sem `senha` os usuários criados não podem fazer login
+    (os benchmarks usam force_login). `ao_progredir(mensagem)` recebe o
+    andamento.
+    """
+    aleatorio = random.Random(semente)
+    # O rótulo não sai da semente: os dados gerados não dependem do que já existe no banco
+    resultado = ResultadoGeracao(rotulo=_rotulo_livre(random.Random()))
+    senha_hash = make_password(senha)
+    servicos = _catalogo_servicos()
+    avisar = ao_progredir or (lambda mensagem: None)
+    prefixo = f'sint_{resultado.rotulo.lower()}_'
+
+    resultado.superusuario = User.objects.create(
+        username=f'{prefixo}admin', password=senha_hash, is_staff=True, is_superuser=True
+    )
+    usuarios = User.objects.bulk_create([
+        User(username=f'{prefixo}{numero}', password=senha_hash) for numero in range(1, escala.oficinas + 1)
+    ])
+    oficinas = Oficina.objects.bulk_create([
+        Oficina(
+            nome=f'Oficina Sintética {resultado.rotulo} {numero}',
+            cnpj=f'SINT-{resultado.rotulo}-{numero:06d}',
+            proprietario=usuario,
+            telefone=_telefone(aleatorio),
+            email=f'{usuario.username}@exemplo.com.br',
+            cidade=aleatorio.choice(CIDADES),
+            modulo_estoque=True,
+            modulo_relatorios=True,
+        )
+        for numero, usuario in enumerate(usuarios, start=1)
+    ])
+    resultado.usuarios, resultado.oficinas = usuarios, oficinas
+
+    placas = iter(range(36 ** 5))
+    for oficina in oficinas:
+        _gerar_oficina(oficina, escala, aleatorio, servicos, resultado, placas, tamanho_lote)
+        invalidar_dashboard(oficina.pk)
+        avisar(f'{oficina.nome}: concluída')
+    return resultado
+
+
+def _placa(rotulo, numero):
+    # Rótulo + número em base 36: única no sistema e no formato de 8 caracteres do campo
+    digitos = ''
+    while True:
+        numero, resto = divmod(numero, 36)
+        digitos = (string.digits + string.ascii_uppercase)[resto] + digitos
+        if not numero:
+            break
+    return f'{rotulo}{digitos.rjust(5, "0")}'
+
+
+def _gerar_oficina(oficina, escala, aleatorio, servicos, resultado, placas, tamanho_lote):
+    hoje = timezone.localdate()
+    inicio_periodo = hoje - timedelta(days=30 * escala.meses)
+
+    clientes = [
+        Cliente(
+            oficina=oficina,
+            nome=f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}',
+            cpf_cnpj=_documento(aleatorio),
+            telefone=_telefone(aleatorio),
+            email=f'cliente{numero}@exemplo.com.br' if aleatorio.random() < 0.6 else None,
+            cidade=aleatorio.choice(CIDADES),
+            ativo=aleatorio.random() < 0.95,
+        )
+        for numero in range(escala.clientes)
+    ]
+    for lote in _em_lotes(clientes, tamanho_lote):
+        with transaction.atomic():
+            Cliente.objects.bulk_create(lote)
+            indexar_em_lote(lote)
+    resultado.somar('clientes', len(clientes))
+
+    veiculos = []
+    for cliente in clientes:
+        for _ in range(aleatorio.randint(1, escala.veiculos)):
+            marca = aleatorio.choice(list(MODELOS))
+            veiculos.append(Veiculo(
+                oficina=oficina,
+                cliente=cliente,
+                marca=marca,
+                modelo=aleatorio.choice(MODELOS[marca]),
+                ano=aleatorio.randint(2005, hoje.year),
+                placa=_placa(resultado.rotulo, next(placas)),
+                cor=aleatorio.choice(CORES),
+                km_atual=aleatorio.randint(5000, 250000),
+            ))
+    for lote in _em_lotes(veiculos, tamanho_lote):
+        with transaction.atomic():
+            Veiculo.objects.bulk_create(lote)
+            indexar_em_lote(lote)
+    resultado.somar('veiculos', len(veiculos))
+
+    ultima_visita = {}
+    for inicio in range(0, escala.ordens, tamanho_lote):
+        quantidade = min(tamanho_lote, escala.ordens - inicio)
+        with transaction.atomic():
+            numeros = SequenciaOS.reservar(oficina.pk, quantidade)
+            ordens, itens, pagamentos = [], [], []
+            for numero in numeros:
+                veiculo = aleatorio.choice(veiculos)
+                ordem = _ordem(oficina, veiculo, numero, inicio_periodo, hoje, aleatorio)
+                itens_ordem = []
+                for _ in range(aleatorio.randint(1, escala.itens)):
+                    servico, vezes = aleatorio.choice(servicos), aleatorio.randint(1, 2)
+                    itens_ordem.append(ItemServico(
+                        oficina=oficina, ordem=ordem, servico=servico, quantidade=vezes,
+                        valor_unitario=servico.valor_padrao, valor_total=vezes * servico.valor_padrao,
+                    ))
+                ordem.valor_total = sum(item.valor_total for item in itens_ordem)
+                if aleatorio.random() < 0.2:
+                    ordem.desconto = (ordem.valor_total * Decimal('0.05')).quantize(Decimal('0.01'))
+                ordem.valor_final = ordem.valor_total - ordem.desconto
+                ordens.append(ordem)
+                itens.extend(itens_ordem)
+                pagamentos.extend(_pagamentos(oficina, ordem, escala.pagamentos, aleatorio))
+                visita = ultima_visita.get(veiculo.cliente_id)
+                if visita is None or ordem.data_entrada > visita:
+                    ultima_visita[veiculo.cliente_id] = ordem.data_entrada
+
+            # Itens e pagamentos pegam o pk das ordens preenchido pelo bulk_create
+            OrdemServico.objects.bulk_create(ordens)
+            ItemServico.objects.bulk_create(itens)
+            Pagamento.objects.bulk_create(pagamentos)
+            registrar_pagamentos_novos(pagamentos)
+            indexar_em_lote(ordens)
+        resultado.somar('ordens', len(ordens))
+        resultado.somar('itens', len(itens))
+        resultado.somar('pagamentos', len(pagamentos))
+
+    for cliente in clientes:
+        cliente.ultima_visita = ultima_visita.get(cliente.pk)
+    Cliente.objects.bulk_update(clientes, ['ultima_visita'], batch_size=tamanho_lote)
+
+    _gerar_estoque(oficina, escala, aleatorio, resultado)
+
+
+def _ordem(oficina, veiculo, numero, inicio_periodo, hoje, aleatorio):
+    entrada = inicio_periodo + timedelta(days=aleatorio.randint(0, (hoje - inicio_periodo).days))
+    # Ordens antigas quase sempre já foram encerradas
+    if (hoje - entrada).days > 15:
+        status = aleatorio.choices(
+            ['entregue', 'concluida', 'cancelada', 'em_andamento'], weights=[70, 15, 10, 5]
+        )[0]
+    else:
+        status = aleatorio.choice([situacao for situacao, _ in OrdemServico.STATUS_CHOICES])
+    conclusao = None
+    if status in ('concluida', 'entregue'):
+        conclusao = min(hoje, entrada + timedelta(days=aleatorio.randint(0, 10)))
+    return OrdemServico(
+        oficina=oficina,
+        cliente_id=veiculo.cliente_id,
+        veiculo=veiculo,
+        numero_os=OrdemServico.formatar_numero(numero),
+        data_entrada=entrada,
+        data_previsao=entrada + timedelta(days=aleatorio.randint(1, 10)),
+        data_conclusao=conclusao,
+        status=status,
+        descricao_problema=aleatorio.choice(PROBLEMAS),
+    )
+
+
+def _pagamentos(oficina, ordem, maximo, aleatorio):
+    if maximo < 1 or ordem.status not in ('concluida', 'entregue') or ordem.valor_final <= 0:
+        return []
+    partes = aleatorio.randint(1, maximo)
+    valor = (ordem.valor_final / partes).quantize(Decimal('0.01'))
+    valores = [valor] * (partes - 1) + [ordem.valor_final - valor * (partes - 1)]
+    status = 'pago' if ordem.status == 'entregue' or aleatorio.random() < 0.5 else 'pendente'
+    return [
+        Pagamento(
+            oficina=oficina, ordem=ordem, valor=parte, metodo=aleatorio.choice(METODOS),
+            status=status, data_pagamento=ordem.data_conclusao,
+        )
+        for parte in valores
+    ]
+
+
+def _gerar_estoque(oficina, escala, aleatorio, resultado):
+    pecas = []
+    for numero in range(escala.pecas):
+        nome, unidade = PECAS[numero % len(PECAS)]
+        custo = Decimal(aleatorio.randint(500, 30000)) / 100
+        pecas.append(Peca(
+            oficina=oficina,
+            codigo=f'P{numero + 1:05d}',
+            nome=f'{nome} {numero // len(PECAS) + 1}' if numero >= len(PECAS) else nome,
+            unidade=unidade,
+            custo_unitario=custo,
+            preco_venda=(custo * Decimal('1.6')).quantize(Decimal('0.01')),
+            estoque_minimo=aleatorio.randint(0, 10),
+        ))
+    with transaction.atomic():
+        Peca.objects.bulk_create(pecas)
+        MovimentoEstoque.objects.bulk_create([
+            MovimentoEstoque(
+                oficina=oficina, peca=peca, tipo='entrada', quantidade=aleatorio.randint(0, 50),
+                custo_unitario=peca.custo_unitario, observacao='Carga inicial (dados sintéticos)',
+            )
+            for peca in pecas
+        ])
+    resultado.somar('pecas', len(pecas))
@@ -0,0 +1,37 @@
+from functools import wraps
+
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+
+MODULOS = {
+    'clientes': 'Clientes',
+    'ordens': 'Ordens de Serviço',
+    'faturamento': 'Faturamento',
+    'estoque': 'Estoque',
+    'relatorios': 'Relatórios',
+}
+
+
+def modulo_requerido(modulo, api=False):
+    """
+    Bloqueia a view se o módulo estiver desabilitado na oficina da requisição.
+
+    Requisições sem oficina (superusuários) passam adiante e continuam
+    tratadas pela própria view. Com api=True a recusa é um JSON 403.
+    """
+    nome = MODULOS[modulo]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            oficina = getattr(request, 'oficina', None)
+            if oficina is not None and not getattr(oficina, f'modulo_{modulo}'):
+                if api:
+                    return JsonResponse({'error': f'Módulo {nome} não habilitado'}, status=403)
+                messages.error(request, f'O módulo {nome} não está habilitado para sua oficina.')
+                return redirect('dashboard')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
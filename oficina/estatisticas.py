@@ -0,0 +1,155 @@
+"""
+Estatísticas do dashboard da oficina.
+
+Os indicadores são calculados em poucas consultas agregadas e guardados em
+cache por oficina. O cache é invalidado pelos sinais de OrdemServico,
+Pagamento e Cliente (ver signals.py) trocando a versão da oficina.
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Cliente, FaturamentoDiario, Oficina, OrdemServico, STATUS_OS_ABERTOS
+from .receita import faturamento_por_mes
+from .replica import leitura_no_primario
+
+
+CACHE_TIMEOUT = 300
+# Tempo máximo da trava de cálculo e da espera de quem não a obteve (segundos)
+TRAVA_TIMEOUT = 30
+ESPERA_MAXIMA = 5
+MESES_GRAFICO = 6
+
+
+def _chave(oficina_id):
+    return f'dashboard:{oficina_id}'
+
+
+def _chave_versao(oficina_id):
+    return f'dashboard:{oficina_id}:versao'
+
+
+def invalidar_dashboard(oficina_id):
+    """Marca as estatísticas em cache da oficina como desatualizadas"""
+    if oficina_id is not None:
+        cache.set(_chave_versao(oficina_id), time.time_ns(), None)
+
+
+def versao_dashboard(oficina_id):
+    """Versão atual dos dados da oficina, trocada a cada invalidação do dashboard"""
+    return cache.get(_chave_versao(oficina_id))
+
+
+def meses_calendario(hoje, quantidade):
+    """Primeiro dia dos últimos `quantidade` meses do calendário, do mais antigo ao atual"""
+    ano, mes = hoje.year, hoje.month
+    meses = []
+    for _ in range(quantidade):
+        meses.append(date(ano, mes, 1))
+        ano, mes = (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+    return meses[::-1]
+
+
+def proximo_mes(dia):
+    """Primeiro dia do mês seguinte a `dia`"""
+    return date(dia.year + 1, 1, 1) if dia.month == 12 else date(dia.year, dia.month + 1, 1)
+
+
+def calcular_estatisticas(oficina, hoje):
+    """Calcula os indicadores do dashboard com três consultas agregadas"""
+    ordens = OrdemServico.objects.filter(
+        oficina=oficina,
+        status__in_literal=STATUS_OS_ABERTOS
+    ).aggregate(
+        abertas=Count('id'),
+        atrasadas=Count('id', filter=Q(data_previsao__lt=hoje)),
+    )
+
+    clientes_ativos = Cliente.objects.filter(oficina=oficina, ativo=True).count()
+
+    # Faturamento por mês do calendário em uma única consulta sobre o consolidado diário
+    meses = meses_calendario(hoje, MESES_GRAFICO)
+    totais = faturamento_por_mes(oficina, meses[0], proximo_mes(hoje) - timedelta(days=1))
+
+    return {
+        'ordens_abertas': ordens['abertas'],
+        'ordens_atrasadas': ordens['atrasadas'],
+        'clientes_ativos': clientes_ativos,
+        'faturamento_mensal': totais.get(meses[-1]) or 0,
+        'faturamento_meses': [
+            {'mes': mes.strftime('%b'), 'valor': float(totais.get(mes) or 0)}
+            for mes in meses
+        ],
+    }
+
+
+def estatisticas_dashboard(oficina):
+    """
+    Retorna as estatísticas do dashboard a partir do cache, calculando-as
+    quando necessário. Requisições simultâneas que encontram o cache vazio
+    aguardam o cálculo de uma só delas em vez de repeti-lo.
+    """
+    chave, chave_versao = _chave(oficina.pk), _chave_versao(oficina.pk)
+    hoje = timezone.now().date()
+
+    def em_cache():
+        valores = cache.get_many([chave, chave_versao])
+        dados = valores.get(chave)
+        if dados and dados['data'] == hoje and dados['versao'] == valores.get(chave_versao):
+            return dados, None
+        return None, valores.get(chave_versao)
+
+    dados, versao = em_cache()
+    if dados:
+        return dados['estatisticas']
+
+    trava = f'{chave}:calculando'
+    dono_trava = cache.add(trava, True, TRAVA_TIMEOUT)
+    prazo = time.monotonic() + ESPERA_MAXIMA
+    while not dono_trava and time.monotonic() < prazo:
+        time.sleep(0.05)
+        dados, versao = em_cache()
+        if dados:
+            return dados['estatisticas']
+        dono_trava = cache.add(trava, True, TRAVA_TIMEOUT)
+
+    try:
+        with leitura_no_primario():
+            estatisticas = calcular_estatisticas(oficina, hoje)
+        # Grava com a versão lida antes do cálculo: se algo mudou nesse meio
+        # tempo, a versão já é outra e o resultado não será reaproveitado
+        cache.set(chave, {'data': hoje, 'versao': versao, 'estatisticas': estatisticas}, CACHE_TIMEOUT)
+    finally:
+        if dono_trava:
+            cache.delete(trava)
+    return estatisticas
+
+
+def _por_oficina(queryset, agregado, output_field):
+    """Subconsulta correlacionada com o agregado das linhas de cada oficina"""
+    subconsulta = queryset.filter(oficina=OuterRef('pk')).order_by().values('oficina').annotate(
+        valor=agregado
+    ).values('valor')
+    return Coalesce(Subquery(subconsulta, output_field=output_field), Value(0), output_field=output_field)
+
+
+def oficinas_com_totais():
+    """
+    Oficinas anotadas com total_clientes, total_ordens e faturamento_total.
+
+    Cada total é uma subconsulta independente (o faturamento vem de
+    FaturamentoDiario): juntar clientes, ordens e pagamentos na mesma
+    consulta multiplicaria as linhas e inflaria contagens e somas.
+    """
+    return Oficina.objects.select_related('proprietario').annotate(
+        total_clientes=_por_oficina(Cliente.objects.all(), Count('pk'), IntegerField()),
+        total_ordens=_por_oficina(OrdemServico.objects.all(), Count('pk'), IntegerField()),
+        faturamento_total=_por_oficina(
+            FaturamentoDiario.objects.filter(status='pago'), Sum('total'),
+            DecimalField(max_digits=14, decimal_places=2)
+        ),
+    )
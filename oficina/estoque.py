@@ -0,0 +1,147 @@
+"""
+Saldos do estoque de peças.
+
+O estoque é um razão de movimentos (MovimentoEstoque) que só recebe novos
+lançamentos. De tempos em tempos o comando consolidar_estoque grava um
+SaldoEstoque por peça com o saldo acumulado até o último movimento lido.
+
+O saldo atual de uma peça é o último saldo consolidado mais a soma dos
+movimentos posteriores a ele. Com o índice (peca, id) dos movimentos, o
+custo de ler um saldo depende só dos movimentos desde a última
+consolidação, não de todo o histórico da oficina.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import MovimentoEstoque, Peca, SaldoEstoque
+
+
+TAMANHO_LOTE = 1000
+_QUANTIDADE = DecimalField(max_digits=12, decimal_places=3)
+_VALOR = DecimalField(max_digits=14, decimal_places=2)
+
+
+class SaldoInsuficiente(Exception):
+    """Saída maior que o saldo da peça no momento do lançamento"""
+
+
+def _ultimo_saldo(campo):
+    return Subquery(
+        SaldoEstoque.objects.filter(peca=OuterRef('pk')).order_by('-ultimo_movimento_id').values(campo)[:1]
+    )
+
+
+def com_saldo(pecas):
+    """Anota `saldo` (último saldo consolidado + movimentos posteriores) em um queryset de Peca"""
+    movimentos = MovimentoEstoque.objects.filter(
+        peca=OuterRef('pk'), id__gt=OuterRef('saldo_ate')
+    ).order_by().values('peca').annotate(soma=Sum('quantidade')).values('soma')
+    return pecas.annotate(
+        saldo_ate=Coalesce(_ultimo_saldo('ultimo_movimento_id'), Value(0)),
+        saldo_consolidado=Coalesce(_ultimo_saldo('quantidade'), Value(Decimal('0')), output_field=_QUANTIDADE),
+    ).annotate(
+        saldo=F('saldo_consolidado') + Coalesce(Subquery(movimentos), Value(Decimal('0')), output_field=_QUANTIDADE),
+    )
+
+
+def saldo_atual(peca):
+    """Saldo atual de uma única peça"""
+    return com_saldo(Peca.objects.filter(pk=peca.pk)).values_list('saldo', flat=True).get()
+
+
+def abaixo_do_minimo(pecas):
+    """Peças ativas com saldo abaixo do estoque mínimo"""
+    return com_saldo(pecas.filter(ativo=True)).filter(saldo__lt=F('estoque_minimo'))
+
+
+def resumo_estoque(oficina):
+    """Itens ativos, valor do estoque ao custo e peças abaixo do mínimo, em uma consulta"""
+    pecas = com_saldo(Peca.objects.filter(oficina=oficina, ativo=True))
+    return pecas.aggregate(
+        itens=Coalesce(Sum(Value(1)), 0),
+        valor=Coalesce(
+            Sum(F('saldo') * F('custo_unitario'), output_field=_VALOR), Value(Decimal('0')), output_field=_VALOR
+        ),
+        abaixo_minimo=Coalesce(Sum(Value(1), filter=Q(saldo__lt=F('estoque_minimo'))), 0),
+    )
+
+
+def registrar_movimento(peca, tipo, quantidade, usuario=None, ordem=None, custo_unitario=None, observacao=None):
+    """
+    Lança um movimento no razão. `quantidade` é informada sempre positiva para
+    entradas e saídas (o sinal é aplicado aqui) e com sinal para ajustes.
+
+    Saídas travam a linha da peça (por onde passa todo lançamento dela) e
+    conferem o saldo dentro da transação: duas saídas simultâneas não passam
+    ambas pela validação do formulário e deixam o saldo negativo. Levanta
+    SaldoInsuficiente se a saída não couber no saldo.
+    """
+    if tipo == 'saida':
+        quantidade = -abs(quantidade)
+    elif tipo == 'entrada':
+        quantidade = abs(quantidade)
+    with transaction.atomic():
+        if tipo == 'saida':
+            Peca.objects.select_for_update().filter(pk=peca.pk).values_list('pk').get()
+            if -quantidade > saldo_atual(peca):
+                raise SaldoInsuficiente
+        return MovimentoEstoque.objects.create(
+            peca=peca,
+            tipo=tipo,
+            quantidade=quantidade,
+            custo_unitario=peca.custo_unitario if custo_unitario is None else custo_unitario,
+            ordem=ordem,
+            usuario=usuario,
+            observacao=observacao,
+        )
+
+
+def consolidar(oficina=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Grava um novo SaldoEstoque para cada peça com movimentos desde o último
+    saldo. Retorna quantos saldos foram criados.
+
+    O limite é o maior id de movimento lido no início: lançamentos feitos
+    durante a consolidação ficam para a próxima, sem risco de contar um
+    movimento duas vezes ou de pular algum.
+    """
+    movimentos = MovimentoEstoque.objects.all()
+    pecas = Peca.objects.all()
+    if oficina is not None:
+        movimentos = movimentos.filter(oficina=oficina)
+        pecas = pecas.filter(oficina=oficina)
+
+    limite = movimentos.aggregate(maior=Max('id'))['maior']
+    if limite is None:
+        return 0
+
+    ate_limite = MovimentoEstoque.objects.filter(
+        peca=OuterRef('pk'), id__gt=OuterRef('saldo_ate'), id__lte=limite
+    ).order_by().values('peca').annotate(soma=Sum('quantidade')).values('soma')
+    pendentes = pecas.annotate(
+        saldo_ate=Coalesce(_ultimo_saldo('ultimo_movimento_id'), Value(0)),
+        saldo_consolidado=Coalesce(_ultimo_saldo('quantidade'), Value(Decimal('0')), output_field=_QUANTIDADE),
+        delta=Subquery(ate_limite, output_field=_QUANTIDADE),
+    ).filter(delta__isnull=False).values_list('pk', 'oficina_id', 'saldo_consolidado', 'delta')
+
+    criados = 0
+    lote = []
+    for peca_id, oficina_id, consolidado, delta in pendentes.iterator(chunk_size=tamanho_lote):
+        lote.append(SaldoEstoque(
+            oficina_id=oficina_id, peca_id=peca_id, quantidade=consolidado + delta, ultimo_movimento_id=limite
+        ))
+        if len(lote) >= tamanho_lote:
+            criados += _gravar_saldos(lote)
+            lote = []
+    if lote:
+        criados += _gravar_saldos(lote)
+    return criados
+
+
+def _gravar_saldos(saldos):
+    with transaction.atomic():
+        SaldoEstoque.objects.bulk_create(saldos, ignore_conflicts=True)
+    return len(saldos)
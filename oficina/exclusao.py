@@ -0,0 +1,213 @@
+"""
+Exclusão de oficinas (tenants) em segundo plano.
+
+oficina.delete() passa pelo coletor de cascata do Django, que carrega em
+memória todos os clientes, veículos, ordens, itens e pagamentos da oficina
+(e dispara os sinais de cada um) antes de apagar; numa oficina grande isso
+estoura o tempo da requisição e segura a trava de escrita do SQLite.
+
+A view apenas desativa a oficina e registra uma ExclusaoOficina. O trabalho
+é feito aqui, fora da requisição: as tabelas são esvaziadas das filhas para
+as mães (ETAPAS), em lotes de EXCLUSAO_TAMANHO_LOTE linhas, cada lote um
+DELETE por id na sua própria transação junto com a atualização do progresso.
+Sinais e regras do model (como a proibição de excluir movimentos de
+estoque) não se aplicam: a oficina inteira está saindo. No fim a própria
+oficina é excluída pelo caminho normal, já sem dependentes, e o proprietário
+também, se não tiver outra oficina.
+
+Quem executa é uma thread iniciada depois do commit da requisição
+(EXCLUSAO_EM_SEGUNDO_PLANO) ou o comando processar_exclusoes. Cada exclusão
+é reivindicada com uma concessão (executor + concessao_ate) renovada a cada
+lote; se o processo morrer, a concessão vence e a próxima execução retoma
+de onde parou, já que cada etapa só procura o que ainda resta. O painel só
+lê o progresso: uma exclusão parada é retomada pelo comando ou pedindo a
+exclusão de novo (botão Retomar), que inicia a thread.
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import (
+    Cliente, ExclusaoOficina, FaturamentoDiario, IndiceBusca, ItemServico, MovimentoEstoque, Oficina,
+    OrdemServico, Pagamento, Peca, SaldoEstoque, SequenciaOS, Veiculo,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# (etapa, model, caminho até o id da oficina), das tabelas filhas para as mães.
+# Itens, pagamentos e veículos seguem a ordem/cliente em vez da cópia da
+# oficina: uma linha esquecida impediria a exclusão da mãe
+ETAPAS = [
+    ('indice_busca', IndiceBusca, 'oficina'),
+    ('saldos_estoque', SaldoEstoque, 'peca__oficina'),
+    ('movimentos_estoque', MovimentoEstoque, 'peca__oficina'),
+    ('pagamentos', Pagamento, 'ordem__oficina'),
+    ('itens_servico', ItemServico, 'ordem__oficina'),
+    ('faturamento_diario', FaturamentoDiario, 'oficina'),
+    ('ordens', OrdemServico, 'oficina'),
+    ('veiculos', Veiculo, 'cliente__oficina'),
+    ('clientes', Cliente, 'oficina'),
+    ('pecas', Peca, 'oficina'),
+    ('sequencia_os', SequenciaOS, 'oficina'),
+]
+
+
+class ConcessaoPerdida(Exception):
+    """Outro processo assumiu a exclusão (a concessão deste venceu)"""
+
+
+def solicitar_exclusao(oficina, usuario):
+    """
+    Desativa a oficina e registra a exclusão, iniciada depois do commit.
+    Retorna a ExclusaoOficina (a já existente, se houver uma em andamento,
+    que é retomada se estiver parada).
+    """
+    with transaction.atomic():
+        transaction.on_commit(iniciar_em_segundo_plano)
+        existente = ExclusaoOficina.objects.filter(
+            oficina=oficina, status__in=ExclusaoOficina.STATUS_ATIVOS
+        ).first()
+        if existente is not None:
+            return existente
+        if oficina.ativo:
+            oficina.ativo = False
+            oficina.save(update_fields=['ativo'])
+        exclusao = ExclusaoOficina.objects.create(
+            oficina=oficina, oficina_nome=oficina.nome,
+            proprietario_id=oficina.proprietario_id, solicitado_por=usuario,
+        )
+    return exclusao
+
+
+def _executor():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'[:100]
+
+
+def _reivindicaveis(agora):
+    return ExclusaoOficina.objects.filter(status__in=ExclusaoOficina.STATUS_ATIVOS).filter(
+        Q(concessao_ate__isnull=True) | Q(concessao_ate__lt=agora)
+    )
+
+
+def _concessao(agora):
+    return agora + timedelta(seconds=settings.EXCLUSAO_CONCESSAO_SEGUNDOS)
+
+
+def reivindicar(executor):
+    """Assume a exclusão pendente mais antiga (ou com concessão vencida); retorna o id ou None"""
+    agora = timezone.now()
+    for pk in _reivindicaveis(agora).order_by('criado_em').values_list('pk', flat=True):
+        # UPDATE condicional: se outro processo reivindicou antes, não altera nada
+        if _reivindicaveis(agora).filter(pk=pk).update(
+            status='em_andamento', executor=executor, concessao_ate=_concessao(agora), atualizado_em=agora
+        ):
+            return pk
+    return None
+
+
+def _restantes(oficina_id):
+    return sum(modelo.objects.filter(**{caminho: oficina_id}).count() for _, modelo, caminho in ETAPAS)
+
+
+def _excluir_lote(modelo, caminho, oficina_id, tamanho):
+    """Apaga até `tamanho` linhas da oficina na tabela do model; retorna quantas"""
+    ids = list(
+        modelo.objects.filter(**{caminho: oficina_id}).order_by().values_list('pk', flat=True)[:tamanho]
+    )
+    if ids:
+        tabela = connection.ops.quote_name(modelo._meta.db_table)
+        coluna = connection.ops.quote_name(modelo._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {tabela} WHERE {coluna} IN ({", ".join(["%s"] * len(ids))})', ids)
+    return len(ids)
+
+
+def _registrar_progresso(pk, executor, campos):
+    """Grava `campos` na exclusão e renova a concessão, se ela ainda for deste executor"""
+    agora = timezone.now()
+    campos = {'concessao_ate': _concessao(agora), 'atualizado_em': agora, **campos}
+    if not ExclusaoOficina.objects.filter(pk=pk, executor=executor, status='em_andamento').update(**campos):
+        raise ConcessaoPerdida
+
+
+def executar(pk, executor, tamanho_lote=None):
+    """Executa (ou retoma) a exclusão `pk`, já reivindicada por `executor`"""
+    tamanho_lote = tamanho_lote or settings.EXCLUSAO_TAMANHO_LOTE
+    exclusao = ExclusaoOficina.objects.get(pk=pk)
+    oficina_id = exclusao.oficina_id
+    try:
+        if oficina_id is not None:
+            if exclusao.total is None:
+                _registrar_progresso(pk, executor, {'total': _restantes(oficina_id)})
+            for etapa, modelo, caminho in ETAPAS:
+                while True:
+                    with transaction.atomic():
+                        removidos = _excluir_lote(modelo, caminho, oficina_id, tamanho_lote)
+                        _registrar_progresso(pk, executor, {'etapa': etapa, 'removidos': F('removidos') + removidos})
+                    if removidos < tamanho_lote:
+                        break
+
+        with transaction.atomic():
+            _registrar_progresso(pk, executor, {'etapa': 'oficina'})
+            # Sem dependentes, o coletor não carrega mais nada; os sinais da
+            # oficina descartam o contexto em cache dos usuários
+            Oficina.objects.filter(pk=oficina_id).delete()
+            proprietario = User.objects.filter(pk=exclusao.proprietario_id, is_superuser=False).first()
+            if proprietario is not None and not proprietario.oficinas.exists():
+                proprietario.delete()
+            _registrar_progresso(pk, executor, {
+                'status': 'concluida', 'etapa': '', 'executor': '', 'concessao_ate': None,
+                'concluido_em': timezone.now(),
+            })
+    except ConcessaoPerdida:
+        logger.warning('Exclusão %s assumida por outro processo', pk)
+    except Exception as erro:
+        logger.exception('Erro na exclusão %s', pk)
+        ExclusaoOficina.objects.filter(pk=pk, executor=executor).update(
+            status='erro', erro=str(erro), executor='', concessao_ate=None, atualizado_em=timezone.now()
+        )
+
+
+def processar_exclusoes(tamanho_lote=None):
+    """Executa as exclusões pendentes até não restar nenhuma; retorna quantas foram processadas"""
+    executor = _executor()
+    processadas = 0
+    while (pk := reivindicar(executor)) is not None:
+        executar(pk, executor, tamanho_lote)
+        processadas += 1
+    return processadas
+
+
+_trava = threading.Lock()
+_thread = None
+
+
+def _executar_em_thread():
+    try:
+        processar_exclusoes()
+    except Exception:
+        logger.exception('Erro ao processar exclusões de oficinas')
+    finally:
+        connections.close_all()
+
+
+def iniciar_em_segundo_plano():
+    """Inicia a thread de exclusões deste processo, se não houver uma rodando"""
+    global _thread
+    if not settings.EXCLUSAO_EM_SEGUNDO_PLANO:
+        return
+    with _trava:
+        if _thread is not None and _thread.is_alive():
+            return
+        _thread = threading.Thread(target=_executar_em_thread, name='exclusao-oficinas', daemon=True)
+        _thread.start()
+
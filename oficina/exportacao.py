@@ -0,0 +1,92 @@
+"""
+Exportação em CSV das listagens da oficina.
+
+As respostas são geradas em streaming: o queryset é percorrido com
+iterator() em blocos e cada linha é escrita assim que lida, então a memória
+usada não depende de quantos registros a oficina tem. O arquivo sai com
+BOM e separador ";" para abrir direto no Excel em português.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import OrdemServico, Pagamento
+
+
+TAMANHO_BLOCO = 2000
+
+
+CABECALHO_PAGAMENTOS = ['Data', 'OS', 'Cliente', 'Método', 'Valor', 'Status', 'Observação']
+CABECALHO_ORDENS = [
+    'OS', 'Cliente', 'Placa', 'Veículo', 'Entrada', 'Previsão', 'Conclusão', 'Status',
+    'Valor Total', 'Desconto', 'Valor Final', 'Problema',
+]
+CABECALHO_CLIENTES = [
+    'ID', 'Nome', 'CPF/CNPJ', 'Telefone', 'E-mail', 'Endereço', 'Cidade', 'Ativo', 'Cadastro', 'Última Visita',
+]
+
+
+class _Eco:
+    """Buffer que devolve o que recebe, para o csv.writer gerar texto sob demanda"""
+
+    def write(self, valor):
+        return valor
+
+
+def _data(valor):
+    return valor.strftime('%d/%m/%Y') if valor else ''
+
+
+def _dinheiro(valor):
+    return f'{valor:.2f}'.replace('.', ',') if valor is not None else ''
+
+
+def resposta_csv(nome, cabecalho, linhas):
+    """StreamingHttpResponse com o CSV `nome`_<data>.csv"""
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    def gerar():
+        yield '\ufeff' + escritor.writerow(cabecalho)
+        for linha in linhas:
+            yield escritor.writerow(linha)
+
+    resposta = StreamingHttpResponse(gerar(), content_type='text/csv; charset=utf-8')
+    arquivo = f'{nome}_{timezone.localdate():%Y-%m-%d}.csv'
+    resposta['Content-Disposition'] = f'attachment; filename="{arquivo}"'
+    return resposta
+
+
+def linhas_pagamentos(pagamentos):
+    metodos = dict(Pagamento.METODO_CHOICES)
+    status = dict(Pagamento.STATUS_CHOICES)
+    valores = pagamentos.values_list(
+        'data_pagamento', 'ordem__numero_os', 'ordem__cliente__nome', 'metodo', 'valor', 'status', 'observacao'
+    )
+    for data, numero_os, cliente, metodo, valor, situacao, observacao in valores.iterator(chunk_size=TAMANHO_BLOCO):
+        yield [_data(data), numero_os, cliente, metodos.get(metodo, metodo), _dinheiro(valor),
+               status.get(situacao, situacao), observacao or '']
+
+
+def linhas_ordens(ordens):
+    status = dict(OrdemServico.STATUS_CHOICES)
+    valores = ordens.values_list(
+        'numero_os', 'cliente__nome', 'veiculo__placa', 'veiculo__marca', 'veiculo__modelo',
+        'data_entrada', 'data_previsao', 'data_conclusao', 'status',
+        'valor_total', 'desconto', 'valor_final', 'descricao_problema'
+    )
+    for (numero_os, cliente, placa, marca, modelo, entrada, previsao, conclusao, situacao,
+         total, desconto, final, descricao) in valores.iterator(chunk_size=TAMANHO_BLOCO):
+        yield [numero_os, cliente, placa, f'{marca} {modelo}', _data(entrada), _data(previsao), _data(conclusao),
+               status.get(situacao, situacao), _dinheiro(total), _dinheiro(desconto), _dinheiro(final), descricao]
+
+
+def linhas_clientes(clientes):
+    valores = clientes.values_list(
+        'id', 'nome', 'cpf_cnpj', 'telefone', 'email', 'endereco', 'cidade', 'ativo', 'data_cadastro', 'ultima_visita'
+    )
+    for (pk, nome, cpf_cnpj, telefone, email, endereco, cidade, ativo,
+         cadastro, ultima_visita) in valores.iterator(chunk_size=TAMANHO_BLOCO):
+        yield [pk, nome, cpf_cnpj, telefone, email or '', endereco or '', cidade or '',
+               'Sim' if ativo else 'Não', _data(timezone.localtime(cadastro)), _data(ultima_visita)]
+
@@ -1,6 +1,13 @@
 from django import forms
 from django.contrib.auth.models import User
-from .models import Cliente, Veiculo, OrdemServico, ItemServico, Pagamento, Oficina
+from django.db.models import Q
+from django.urls import reverse
+from .busca import rotulo_cliente
+from .catalogo import ServicoChoiceField
+from .estoque import saldo_atual
+from .models import (
+    Cliente, Veiculo, OrdemServico, ItemServico, Pagamento, Oficina, Peca, MovimentoEstoque,
+)
 
 
 class ClienteForm(forms.ModelForm):
@@ -91,23 +98,54 @@ class VeiculoForm(forms.ModelForm):
         }
 
 
+class SelectAutocomplete(forms.Select):
+    """
+    Select de ModelChoiceField que renderiza só a opção escolhida, sem
+    percorrer o queryset. As demais opções vêm da API de autocomplete
+    conforme o usuário digita (ver o script de ordem_form.html).
+    """
+
+    def __init__(self, tipo, attrs=None):
+        super().__init__(attrs)
+        self.tipo = tipo
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs'].update({
+            'data-autocomplete-url': reverse('autocompletar'),
+            'data-autocomplete-tipo': self.tipo,
+        })
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        escolhidos = [valor for valor in value if str(valor).isdigit()]
+        opcoes = [('', self.choices.field.empty_label or '')]
+        if escolhidos:
+            opcoes += [
+                (objeto.pk, self.choices.field.label_from_instance(objeto))
+                for objeto in self.choices.queryset.filter(pk__in=escolhidos)
+            ]
+        return [
+            (None, [self.create_option(name, valor, rotulo, str(valor) in value, indice, attrs=attrs)], indice)
+            for indice, (valor, rotulo) in enumerate(opcoes)
+        ]
+
+
 class OrdemServicoForm(forms.ModelForm):
     class Meta:
         model = OrdemServico
         fields = [
             'cliente', 'veiculo', 'data_entrada', 'data_previsao',
-            'status', 'descricao_problema', 'observacoes',
-            'valor_total', 'desconto'
+            'status', 'descricao_problema', 'observacoes', 'desconto'
         ]
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'input', 'id': 'id_cliente'}),
-            'veiculo': forms.Select(attrs={'class': 'input', 'id': 'id_veiculo'}),
+            'cliente': SelectAutocomplete('cliente', attrs={'class': 'input', 'id': 'id_cliente'}),
+            'veiculo': SelectAutocomplete('veiculo', attrs={'class': 'input', 'id': 'id_veiculo'}),
             'data_entrada': forms.DateInput(attrs={'class': 'input', 'type': 'date'}, format='%Y-%m-%d'),
             'data_previsao': forms.DateInput(attrs={'class': 'input', 'type': 'date'}, format='%Y-%m-%d'),
             'status': forms.Select(attrs={'class': 'input'}),
             'descricao_problema': forms.Textarea(attrs={'class': 'input', 'rows': 3}),
             'observacoes': forms.Textarea(attrs={'class': 'input', 'rows': 2}),
-            'valor_total': forms.NumberInput(attrs={'class': 'input', 'step': '0.01'}),
             'desconto': forms.NumberInput(attrs={'class': 'input', 'step': '0.01'}),
         }
     
@@ -119,20 +157,33 @@ class OrdemServicoForm(forms.ModelForm):
         self.fields['data_entrada'].input_formats = ['%Y-%m-%d']
         self.fields['data_previsao'].input_formats = ['%Y-%m-%d']
         
-        # Filtrar clientes e veículos pela oficina
+        # Filtrar clientes e veículos pela oficina. Os querysets nunca são
+        # listados: o widget busca só a opção escolhida e a validação faz um
+        # get() pelo id enviado
         if oficina:
-            self.fields['cliente'].queryset = Cliente.objects.filter(oficina=oficina, ativo=True)
-            self.fields['veiculo'].queryset = Veiculo.objects.filter(cliente__oficina=oficina)
-        
-        # Se estiver editando e já tiver cliente, filtrar veículos
-        if self.instance and self.instance.pk and self.instance.cliente:
-            self.fields['veiculo'].queryset = Veiculo.objects.filter(cliente=self.instance.cliente)
+            clientes = Q(ativo=True)
+            if self.instance.pk:
+                # Mantém o cliente da ordem mesmo que tenha sido inativado
+                clientes |= Q(pk=self.instance.cliente_id)
+            self.fields['cliente'].queryset = Cliente.objects.filter(clientes, oficina=oficina)
+            self.fields['veiculo'].queryset = Veiculo.objects.filter(oficina=oficina)
+        self.fields['cliente'].label_from_instance = rotulo_cliente
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        cliente = cleaned_data.get('cliente')
+        veiculo = cleaned_data.get('veiculo')
+        if cliente and veiculo and veiculo.cliente_id != cliente.pk:
+            self.add_error('veiculo', 'O veículo não pertence ao cliente selecionado.')
+        return cleaned_data
 
 
 class ItemServicoForm(forms.ModelForm):
     class Meta:
         model = ItemServico
         fields = ['servico', 'quantidade', 'valor_unitario', 'observacao']
+        # Opções e validação pelo catálogo em memória (ver catalogo.py)
+        field_classes = {'servico': ServicoChoiceField}
         widgets = {
             'servico': forms.Select(attrs={'class': 'input'}),
             'quantidade': forms.NumberInput(attrs={'class': 'input'}),
@@ -140,6 +191,29 @@ class ItemServicoForm(forms.ModelForm):
             'observacao': forms.TextInput(attrs={'class': 'input'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sem valor informado vale o valor padrão do serviço
+        self.fields['valor_unitario'].required = False
+
+    def _get_validation_exclusions(self):
+        # O serviço já foi validado pelo catálogo; o ForeignKey.validate
+        # do model repetiria a checagem com uma consulta
+        return {*super()._get_validation_exclusions(), 'servico'}
+
+    def clean_quantidade(self):
+        quantidade = self.cleaned_data['quantidade']
+        if quantidade < 1:
+            raise forms.ValidationError('A quantidade deve ser pelo menos 1.')
+        return quantidade
+
+    def clean(self):
+        cleaned_data = super().clean()
+        servico = cleaned_data.get('servico')
+        if servico and cleaned_data.get('valor_unitario') is None:
+            cleaned_data['valor_unitario'] = servico.valor_padrao
+        return cleaned_data
+
 
 class PagamentoForm(forms.ModelForm):
     class Meta:
@@ -236,3 +310,82 @@ class OficinaForm(forms.ModelForm):
                 self.add_error('password_confirm', 'As senhas não coincidem')
         
         return cleaned_data
+
+
+class PecaForm(forms.ModelForm):
+    class Meta:
+        model = Peca
+        fields = ['codigo', 'nome', 'unidade', 'custo_unitario', 'preco_venda', 'estoque_minimo', 'ativo']
+        widgets = {
+            'codigo': forms.TextInput(attrs={'class': 'input', 'placeholder': 'Ex: FLT-001'}),
+            'nome': forms.TextInput(attrs={'class': 'input', 'placeholder': 'Ex: Filtro de óleo'}),
+            'unidade': forms.TextInput(attrs={'class': 'input', 'placeholder': 'un, L, kg'}),
+            'custo_unitario': forms.NumberInput(attrs={'class': 'input', 'step': '0.01'}),
+            'preco_venda': forms.NumberInput(attrs={'class': 'input', 'step': '0.01'}),
+            'estoque_minimo': forms.NumberInput(attrs={'class': 'input', 'step': '0.001'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.oficina = kwargs.pop('oficina', None)
+        super().__init__(*args, **kwargs)
+
+    def clean_codigo(self):
+        codigo = self.cleaned_data['codigo'].strip().upper()
+        # A oficina não é campo do formulário, então a restrição única é verificada aqui
+        existentes = Peca.objects.filter(oficina=self.oficina, codigo=codigo).exclude(pk=self.instance.pk)
+        if self.oficina and existentes.exists():
+            raise forms.ValidationError('Já existe uma peça com este código.')
+        return codigo
+
+
+class MovimentoEstoqueForm(forms.ModelForm):
+    class Meta:
+        model = MovimentoEstoque
+        fields = ['peca', 'tipo', 'quantidade', 'custo_unitario', 'ordem', 'observacao']
+        widgets = {
+            'peca': forms.Select(attrs={'class': 'input'}),
+            'tipo': forms.Select(attrs={'class': 'input'}),
+            'quantidade': forms.NumberInput(attrs={'class': 'input', 'step': '0.001'}),
+            'custo_unitario': forms.NumberInput(attrs={'class': 'input', 'step': '0.01'}),
+            'ordem': SelectAutocomplete('ordem', attrs={'class': 'input'}),
+            'observacao': forms.TextInput(attrs={'class': 'input', 'placeholder': 'Nota fiscal, motivo do ajuste...'}),
+        }
+        help_texts = {
+            'quantidade': 'Entradas e saídas em valor positivo; ajustes com sinal (ex: -2 para baixa por perda).',
+            'custo_unitario': 'Em branco usa o custo cadastrado na peça.',
+        }
+
+    def __init__(self, *args, **kwargs):
+        oficina = kwargs.pop('oficina', None)
+        super().__init__(*args, **kwargs)
+        self.fields['custo_unitario'].required = False
+
+        # Filtrar peças e ordens pela oficina; as ordens não são listadas no
+        # select, só validadas (as sugestões vêm do autocomplete)
+        if oficina:
+            self.fields['peca'].queryset = Peca.objects.filter(oficina=oficina, ativo=True)
+            self.fields['ordem'].queryset = OrdemServico.objects.filter(oficina=oficina).exclude(
+                status__in=OrdemServico.STATUS_ENCERRADOS
+            ).select_related('cliente')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        tipo = cleaned_data.get('tipo')
+        quantidade = cleaned_data.get('quantidade')
+        peca = cleaned_data.get('peca')
+
+        if quantidade is not None:
+            if quantidade == 0:
+                self.add_error('quantidade', 'Informe uma quantidade diferente de zero')
+            elif tipo in ('entrada', 'saida') and quantidade < 0:
+                self.add_error('quantidade', 'Informe a quantidade em valor positivo')
+
+        if tipo == 'saida':
+            if not cleaned_data.get('ordem'):
+                self.add_error('ordem', 'Saídas devem estar ligadas a uma ordem de serviço')
+            if peca and quantidade and quantidade > 0 and quantidade > saldo_atual(peca):
+                self.add_error('quantidade', 'Quantidade maior que o saldo em estoque')
+        elif cleaned_data.get('ordem') and tipo != 'saida':
+            self.add_error('ordem', 'Apenas saídas são ligadas a uma ordem de serviço')
+
+        return cleaned_data
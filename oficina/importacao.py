@@ -0,0 +1,196 @@
+"""
+Importação em massa de clientes e veículos a partir de CSV.
+
+Os arquivos são lidos em streaming e processados em lotes: cada lote é
+validado com as mesmas regras de ClienteForm/VeiculoForm, deduplicado
+(CPF/CNPJ na oficina, placa em todo o sistema) contra o próprio lote e o
+banco, e gravado com bulk_create numa transação. A memória usada depende
+só do tamanho do lote, não do arquivo.
+
+A verificação contra o banco não impede um cadastro simultâneo da mesma
+chave. Os clientes de um lote são conferidos e gravados com a linha da
+oficina travada, o que serializa duas importações na mesma oficina. Para
+os veículos vale a unicidade da placa: se o bulk_create falhar, as placas
+gravadas nesse meio tempo contam como duplicadas e o restante é gravado.
+
+Colunas esperadas (cabeçalho na primeira linha):
+
+- clientes: nome, cpf_cnpj, telefone, email, endereco, cidade, ativo
+- veículos: cpf_cnpj (do cliente dono), marca, modelo, ano, placa, cor, km_atual
+"""
+import csv
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.db import IntegrityError, transaction
+
+from .busca import indexar_em_lote
+from .estatisticas import invalidar_dashboard
+from .forms import ClienteForm, VeiculoForm
+from .models import Cliente, Oficina, Veiculo
+
+
+TAMANHO_LOTE = 1000
+
+
+class VeiculoImportacaoForm(VeiculoForm):
+    """VeiculoForm sem o campo cliente, resolvido pelo CPF/CNPJ em lote"""
+
+    class Meta(VeiculoForm.Meta):
+        fields = ['marca', 'modelo', 'ano', 'placa', 'cor', 'km_atual']
+
+    def validate_unique(self):
+        # A placa é verificada por lote em importar_veiculos, sem uma consulta por linha
+        pass
+
+
+@dataclass
+class ResultadoImportacao:
+    criados: int = 0
+    duplicados: int = 0
+    erros: int = 0
+    # Recebe (linha, mensagem) de cada erro; as mensagens não ficam acumuladas aqui
+    ao_registrar_erro: Optional[Callable] = None
+
+    def erro(self, linha, mensagem):
+        self.erros += 1
+        if self.ao_registrar_erro is not None:
+            self.ao_registrar_erro(linha, mensagem)
+
+
+def _linhas(arquivo):
+    """Gera (número da linha, dicionário) com cabeçalhos normalizados"""
+    leitor = csv.DictReader(arquivo)
+    if leitor.fieldnames:
+        leitor.fieldnames = [nome.strip().lower() for nome in leitor.fieldnames]
+    for linha in leitor:
+        yield leitor.line_num, {
+            chave: (valor or '').strip() for chave, valor in linha.items() if chave is not None
+        }
+
+
+def _em_lotes(linhas, tamanho):
+    lote = []
+    for item in linhas:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _mensagem(form):
+    return '; '.join(
+        f'{campo}: {" ".join(erros)}' if campo != '__all__' else ' '.join(erros)
+        for campo, erros in form.errors.items()
+    )
+
+
+def importar_clientes(oficina, arquivo, tamanho_lote=TAMANHO_LOTE, ao_registrar_erro=None):
+    """Importa clientes do CSV para a oficina, ignorando CPF/CNPJ já cadastrados"""
+    resultado = ResultadoImportacao(ao_registrar_erro=ao_registrar_erro)
+
+    for lote in _em_lotes(_linhas(arquivo), tamanho_lote):
+        validos = {}
+        for numero, dados in lote:
+            # Coluna ativo ausente ou vazia: cliente ativo, como no formulário
+            dados.setdefault('ativo', 'true')
+            dados['ativo'] = dados['ativo'] or 'true'
+            form = ClienteForm(data=dados)
+            if not form.is_valid():
+                resultado.erro(numero, _mensagem(form))
+                continue
+            cliente = form.save(commit=False)
+            if cliente.cpf_cnpj in validos:
+                resultado.duplicados += 1
+                continue
+            cliente.oficina = oficina
+            validos[cliente.cpf_cnpj] = cliente
+
+        with transaction.atomic():
+            # Outra importação na mesma oficina espera este lote terminar
+            Oficina.objects.select_for_update().filter(pk=oficina.pk).values_list('pk').get()
+            existentes = set(
+                Cliente.objects.filter(oficina=oficina, cpf_cnpj__in=list(validos)).values_list('cpf_cnpj', flat=True)
+            )
+            novos = [cliente for cpf, cliente in validos.items() if cpf not in existentes]
+            Cliente.objects.bulk_create(novos)
+            indexar_em_lote(novos)
+        resultado.duplicados += len(validos) - len(novos)
+        resultado.criados += len(novos)
+
+    if resultado.criados:
+        invalidar_dashboard(oficina.pk)
+    return resultado
+
+
+def importar_veiculos(oficina, arquivo, tamanho_lote=TAMANHO_LOTE, ao_registrar_erro=None):
+    """Importa veículos do CSV, ligando cada um ao cliente da oficina com o CPF/CNPJ informado"""
+    resultado = ResultadoImportacao(ao_registrar_erro=ao_registrar_erro)
+
+    for lote in _em_lotes(_linhas(arquivo), tamanho_lote):
+        validos = {}
+        for numero, dados in lote:
+            if dados.get('placa'):
+                dados['placa'] = dados['placa'].upper()
+            form = VeiculoImportacaoForm(data=dados)
+            if not form.is_valid():
+                resultado.erro(numero, _mensagem(form))
+                continue
+            if not dados.get('cpf_cnpj'):
+                resultado.erro(numero, 'cpf_cnpj: Informe o CPF/CNPJ do cliente.')
+                continue
+            veiculo = form.save(commit=False)
+            if veiculo.placa in validos:
+                resultado.duplicados += 1
+                continue
+            validos[veiculo.placa] = (numero, dados['cpf_cnpj'], veiculo)
+
+        clientes = dict(
+            Cliente.objects.filter(
+                oficina=oficina, cpf_cnpj__in={cpf for _, cpf, _ in validos.values()}
+            ).values_list('cpf_cnpj', 'id')
+        )
+        existentes = _placas_cadastradas(validos)
+
+        novos = []
+        for placa, (numero, cpf, veiculo) in validos.items():
+            if placa in existentes:
+                resultado.duplicados += 1
+            elif cpf not in clientes:
+                resultado.erro(numero, f'cpf_cnpj: Cliente {cpf} não encontrado na oficina.')
+            else:
+                veiculo.cliente_id = clientes[cpf]
+                veiculo.oficina = oficina
+                novos.append(veiculo)
+
+        resultado.criados += _gravar_veiculos(novos, resultado)
+
+    return resultado
+
+
+def _placas_cadastradas(placas):
+    return set(Veiculo.objects.filter(placa__in=list(placas)).values_list('placa', flat=True))
+
+
+def _gravar_veiculos(novos, resultado):
+    """
+    Grava os veículos do lote e retorna quantos foram criados. Placas
+    cadastradas depois da verificação do lote fazem o bulk_create falhar:
+    elas são descontadas como duplicadas e o restante é gravado de novo.
+    """
+    while novos:
+        try:
+            with transaction.atomic():
+                Veiculo.objects.bulk_create(novos)
+                indexar_em_lote(novos)
+            break
+        except IntegrityError:
+            conflitos = _placas_cadastradas(veiculo.placa for veiculo in novos)
+            if not conflitos:
+                raise
+            novos = [veiculo for veiculo in novos if veiculo.placa not in conflitos]
+            resultado.duplicados += len(conflitos)
+    return len(novos)
+
@@ -0,0 +1,23 @@
+from django.db.models.lookups import In
+
+
+class InLiteral(In):
+    """
+    Variante de `__in` que escreve os valores diretamente no SQL.
+
+    O SQLite só usa um índice parcial quando consegue provar a condição do
+    índice a partir do WHERE da consulta, o que não acontece com parâmetros
+    vinculados. Só é registrada nos campos de status cobertos por índices
+    parciais (ver models.py), e só aceita valores das `choices` fixas do
+    campo: qualquer outro valor é rejeitado em vez de ir para o SQL.
+    """
+    lookup_name = 'in_literal'
+
+    def process_rhs(self, compiler, connection):
+        permitidos = {valor for valor, _ in self.lhs.output_field.flatchoices}
+        invalidos = [valor for valor in self.rhs if valor not in permitidos]
+        if invalidos:
+            raise ValueError(f'__in_literal aceita apenas valores das choices do campo: {invalidos!r}')
+        # As choices são constantes do código; o escape é só por garantia
+        valores = ', '.join("'%s'" % valor.replace("'", "''") for valor in self.rhs)
+        return f'({valores})', []
@@ -0,0 +1,169 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.middleware.csrf import CSRF_ALLOWED_CHARS, CSRF_SECRET_LENGTH
+from django.utils.crypto import get_random_string
+
+from oficina.models import STATUS_OS_ABERTOS, OrdemServico, Pagamento, Veiculo
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede as APIs JSON (leitura e alteração) sob concorrência em servidores já '
+        'iniciados, para comparar o caminho WSGI (ex.: gunicorn mecanosync_project.wsgi) '
+        'com o ASGI (ex.: uvicorn mecanosync_project.asgi:application). As alterações '
+        'regravam os valores atuais; os veículos criados são excluídos pela própria medição.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Usuário dono da oficina usada no teste')
+        parser.add_argument('--url', action='append', required=True,
+                            help='Endereço de um servidor (repita para comparar, ex.: --url http://127.0.0.1:8000)')
+        parser.add_argument('--concorrencia', type=int, default=50, help='Requisições simultâneas')
+        parser.add_argument('--requisicoes', type=int, default=500, help='Requisições por API em cada servidor')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário {options["usuario"]} não encontrado.')
+
+        veiculo = Veiculo.objects.filter(oficina__proprietario=usuario).first()
+        if veiculo is None:
+            raise CommandError('A oficina do usuário não tem veículos cadastrados.')
+
+        # O token CSRF sem máscara é aceito no cabeçalho, igual ao segredo do cookie
+        csrf = get_random_string(CSRF_SECRET_LENGTH, CSRF_ALLOWED_CHARS)
+        cabecalhos = {
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={self._sessao(usuario)}; {settings.CSRF_COOKIE_NAME}={csrf}',
+            'X-CSRFToken': csrf,
+        }
+        cenarios = self._cenarios(usuario, veiculo)
+
+        medicoes = {}
+        for indice, url in enumerate(options['url']):
+            base = url.rstrip('/')
+            self._requisitar(base, cabecalhos, ('GET', f'/api/obter-veiculo/{veiculo.pk}/', None))  # aquecimento
+            criados = []
+            for nome, requisicoes in cenarios:
+                if nome == 'criar_veiculo_rapido':
+                    requisicoes = self._novos_veiculos(veiculo, indice, options['requisicoes'])
+                elif nome == 'excluir_veiculo':
+                    requisicoes = [('POST', f'/api/excluir-veiculo/{pk}/', {}) for pk in criados]
+                else:
+                    requisicoes = [requisicoes[i % len(requisicoes)] for i in range(options['requisicoes'])]
+                if not requisicoes:
+                    continue
+                resultados, duracao = self._medir(base, cabecalhos, requisicoes, options['concorrencia'])
+                if nome == 'criar_veiculo_rapido':
+                    criados = [corpo['veiculo']['id'] for _, _, corpo in resultados if corpo]
+                medicoes.setdefault(nome, []).append((url, resultados, duracao))
+
+        for nome, por_servidor in medicoes.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(nome))
+            for url, resultados, duracao in por_servidor:
+                self.stdout.write(f'  {self._resumo(url, resultados, duracao)}')
+
+    def _cenarios(self, usuario, veiculo):
+        """(API, requisições) de cada medição; as alterações regravam os valores atuais"""
+        cenarios = [
+            ('obter_veiculo', [('GET', f'/api/obter-veiculo/{veiculo.pk}/', None)]),
+            ('veiculos_cliente', [('GET', f'/api/veiculos-cliente/?cliente_id={veiculo.cliente_id}', None)]),
+            ('editar_veiculo', [('POST', f'/api/editar-veiculo/{veiculo.pk}/', {
+                'marca': veiculo.marca, 'modelo': veiculo.modelo, 'ano': veiculo.ano, 'placa': veiculo.placa,
+                'cor': veiculo.cor or '', 'km_atual': veiculo.km_atual or '',
+            })]),
+            ('criar_veiculo_rapido', None),
+            ('excluir_veiculo', None),
+        ]
+
+        # Só ordens abertas: concluir uma ordem criaria um pagamento
+        ordens = list(OrdemServico.objects.filter(
+            oficina__proprietario=usuario, status__in=STATUS_OS_ABERTOS
+        ).values_list('pk', 'status')[:10])
+        if ordens:
+            cenarios.append(('alterar_status_ordem', [
+                ('POST', f'/api/alterar-status-ordem/{pk}/', {'status': status}) for pk, status in ordens
+            ]))
+            cenarios.append(('alterar_status_ordens', [('POST', '/api/alterar-status-ordens/', {
+                'ordem': [pk for pk, _ in ordens], 'status': [status for _, status in ordens],
+            })]))
+        else:
+            self.stderr.write('Sem ordens abertas: as APIs de status de ordem não serão medidas.')
+
+        # Marcar como pago muda a data do pagamento: só pendentes, que continuam pendentes
+        pagamentos = list(Pagamento.objects.filter(
+            oficina__proprietario=usuario, status='pendente'
+        ).values_list('pk', 'metodo')[:10])
+        if pagamentos:
+            cenarios.append(('alterar_status_pagamento', [
+                ('POST', f'/api/alterar-status-pagamento/{pk}/', {'status': 'pendente'}) for pk, _ in pagamentos
+            ]))
+            cenarios.append(('alterar_metodo_pagamento', [
+                ('POST', f'/api/alterar-metodo-pagamento/{pk}/', {'metodo': metodo}) for pk, metodo in pagamentos
+            ]))
+        else:
+            self.stderr.write('Sem pagamentos pendentes: as APIs de pagamento não serão medidas.')
+        return cenarios
+
+    def _novos_veiculos(self, veiculo, servidor, quantidade):
+        """Criações com placas próprias de cada servidor, excluídas em seguida por excluir_veiculo"""
+        return [
+            ('POST', '/api/criar-veiculo-rapido/', {
+                'cliente': veiculo.cliente_id, 'marca': 'Benchmark', 'modelo': 'API', 'ano': 2020,
+                'placa': f'Z{servidor % 10}{i:06d}',
+            })
+            for i in range(quantidade)
+        ]
+
+    def _medir(self, base, cabecalhos, requisicoes, concorrencia):
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            resultados = list(executor.map(lambda requisicao: self._requisitar(base, cabecalhos, requisicao), requisicoes))
+        return resultados, time.perf_counter() - inicio
+
+    def _resumo(self, url, resultados, duracao):
+        tempos = sorted(tempo for ok, tempo, _ in resultados if ok)
+        erros = len(resultados) - len(tempos)
+        if not tempos:
+            return f'{url}: todas as requisições falharam'
+        percentis = statistics.quantiles(tempos, n=100) if len(tempos) > 1 else [tempos[0]] * 99
+        return (
+            f'{url}: {len(resultados) / duracao:.1f} req/s, '
+            f'p50 {percentis[49] * 1000:.1f} ms, p95 {percentis[94] * 1000:.1f} ms, '
+            f'p99 {percentis[98] * 1000:.1f} ms, {erros} erro(s)'
+        )
+
+    def _sessao(self, usuario):
+        """Cria uma sessão autenticada, como a do login, para as requisições do teste"""
+        sessao = SessionStore()
+        sessao[SESSION_KEY] = str(usuario.pk)
+        sessao[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sessao[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sessao.create()
+        return sessao.session_key
+
+    def _requisitar(self, base, cabecalhos, requisicao):
+        """Retorna (ok, duração, JSON da resposta se ok)"""
+        metodo, caminho, dados = requisicao
+        corpo = urlencode(dados, doseq=True).encode() if dados is not None else None
+        inicio = time.perf_counter()
+        try:
+            with urlopen(Request(base + caminho, data=corpo, headers=cabecalhos, method=metodo), timeout=30) as resposta:
+                conteudo = resposta.read()
+                # Um redirecionamento para o login também termina em 200, mas em HTML
+                ok = resposta.status == 200 and resposta.headers.get_content_type() == 'application/json'
+        except (HTTPError, URLError, OSError):
+            ok = False
+        duracao = time.perf_counter() - inicio
+        return ok, duracao, json.loads(conteudo) if ok else None
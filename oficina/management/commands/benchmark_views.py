@@ -0,0 +1,242 @@
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from oficina import urls
+from oficina.metricas import medir_sql
+from oficina.models import Cliente, ItemServico, Oficina, OrdemServico, Pagamento, Peca, Veiculo
+
+
+# Views que alteram dados mesmo em um GET
+IGNORADAS = {
+    'logout': 'encerra a sessão',
+    'cliente_deletar': 'exclui o cliente',
+    'admin_oficina_toggle': 'ativa/desativa a oficina',
+}
+# Cenários extras (nome da URL, parâmetros GET) além do GET simples de cada view
+CENARIOS_EXTRAS = [
+    ('clientes_lista', {'busca': 'silva'}),
+    ('ordens_lista', {'busca': 'freio'}),
+    ('ordens_lista', {'filtro': 'abertas'}),
+]
+# Modelo do <int:pk> de cada rota, pelo primeiro trecho encontrado no caminho
+OBJETOS_DA_ROTA = [
+    ('gerenciar/oficinas/', Oficina),
+    ('pagamento', Pagamento),
+    ('veiculo', Veiculo),
+    ('pecas/', Peca),
+    ('itens/', ItemServico),
+    ('clientes/', Cliente),
+    ('ordens/', OrdemServico),
+    ('ordem', OrdemServico),
+]
+# Folgas antes de acusar regressão de tempo e de memória
+TOLERANCIA_MINIMA_MS = 2
+TOLERANCIA_MINIMA_KB = 64
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede cada view de oficina/urls.py pelo Client de teste (p50/p95, consultas SQL e pico de memória) '
+        'e compara com um baseline salvo, falhando se houver regressão'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Usuário dono da oficina usada (ex.: gerado por gerar_dados_sinteticos)')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Requisições medidas por cenário')
+        parser.add_argument('--aquecimento', type=int, default=2, help='Requisições descartadas antes da medição')
+        parser.add_argument('--apenas', action='append', help='Mede só a view com este nome de URL (repetível)')
+        parser.add_argument('--baseline', help='Arquivo JSON do baseline a comparar (ou gravar)')
+        parser.add_argument('--salvar-baseline', action='store_true', help='Grava o resultado em --baseline')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Aumento relativo de p50 e de memória aceito (padrão: 0.25)')
+
+    def handle(self, *args, **options):
+        if options['salvar_baseline'] and not options['baseline']:
+            raise CommandError('Informe o arquivo com --baseline.')
+        if options['repeticoes'] < 1:
+            raise CommandError('--repeticoes deve ser pelo menos 1.')
+        try:
+            dono = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário {options["usuario"]} não encontrado.')
+        oficina = Oficina.objects.filter(proprietario=dono, ativo=True).first()
+        if oficina is None:
+            raise CommandError('O usuário não tem oficina ativa.')
+
+        clientes = {'anonimo': Client(), 'oficina': Client(), 'superusuario': None}
+        clientes['oficina'].force_login(dono)
+        superusuario = User.objects.filter(is_superuser=True, is_active=True).first()
+        if superusuario is not None:
+            clientes['superusuario'] = Client()
+            clientes['superusuario'].force_login(superusuario)
+
+        escala = {
+            'clientes': Cliente.objects.filter(oficina=oficina).count(),
+            'veiculos': Veiculo.objects.filter(oficina=oficina).count(),
+            'ordens': OrdemServico.objects.filter(oficina=oficina).count(),
+            'itens': ItemServico.objects.filter(oficina=oficina).count(),
+            'pagamentos': Pagamento.objects.filter(oficina=oficina).count(),
+        }
+        self.stdout.write(f'{oficina.nome}: ' + ', '.join(f'{n} {nome}' for nome, n in escala.items()))
+
+        resultados = {}
+        # Sem o log de "Method Not Allowed" das APIs que só aceitam POST
+        registro_requisicoes = logging.getLogger('django.request')
+        nivel = registro_requisicoes.level
+        registro_requisicoes.setLevel(logging.ERROR)
+        try:
+            self._medir_todas(oficina, clientes, options, resultados)
+        finally:
+            registro_requisicoes.setLevel(nivel)
+        for nome, motivo in IGNORADAS.items():
+            if not options['apenas'] or nome in options['apenas']:
+                self.stdout.write(f'{nome:<45} ignorada: {motivo}')
+
+        if options['salvar_baseline']:
+            with open(options['baseline'], 'w') as arquivo:
+                json.dump({'escala': escala, 'views': resultados}, arquivo, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'✓ Baseline gravado em {options["baseline"]}'))
+        elif options['baseline']:
+            self._comparar(options['baseline'], escala, resultados, options['tolerancia'])
+
+    def _medir_todas(self, oficina, clientes, options, resultados):
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for chave, endereco, perfil in self._cenarios(oficina, options['apenas']):
+                cliente = clientes[perfil]
+                if cliente is None:
+                    self.stdout.write(f'{chave:<45} ignorada: nenhum superusuário ativo')
+                    continue
+                resultado = self._medir(cliente, endereco, options['repeticoes'], options['aquecimento'])
+                if resultado is None:
+                    self.stdout.write(f'{chave:<45} ignorada: só aceita POST')
+                    continue
+                resultados[chave] = resultado
+                self.stdout.write(
+                    f'{chave:<45} {resultado["status"]}  p50 {resultado["p50_ms"]:8.2f} ms  '
+                    f'p95 {resultado["p95_ms"]:8.2f} ms  {resultado["consultas"]:4d} consultas  '
+                    f'{resultado["memoria_kb"]:8.1f} KB'
+                )
+
+    def _cenarios(self, oficina, apenas):
+        """Gera (chave, endereço, perfil do usuário) de cada view e dos cenários extras"""
+        extras = {}
+        for nome, parametros in CENARIOS_EXTRAS:
+            extras.setdefault(nome, []).append(parametros)
+
+        for padrao in urls.urlpatterns:
+            nome = padrao.name
+            if nome in IGNORADAS or (apenas and nome not in apenas):
+                continue
+            rota = str(padrao.pattern)
+            kwargs = {}
+            if '<int:pk>' in rota:
+                modelo = next(modelo for trecho, modelo in OBJETOS_DA_ROTA if trecho in rota)
+                kwargs['pk'] = oficina.pk if modelo is Oficina else self._objeto(modelo, oficina)
+            endereco = reverse(nome, kwargs=kwargs)
+            if rota.startswith('login/'):
+                perfil = 'anonimo'
+            elif rota.startswith('gerenciar/'):
+                perfil = 'superusuario'
+            else:
+                perfil = 'oficina'
+
+            if nome == 'get_veiculos_cliente':
+                cliente_id = Veiculo.objects.filter(oficina=oficina).values_list('cliente_id', flat=True).first()
+                endereco += f'?cliente_id={cliente_id}'
+            yield nome, endereco, perfil
+            for parametros in extras.get(nome, []):
+                consulta = '&'.join(f'{chave}={valor}' for chave, valor in parametros.items())
+                yield f'{nome}?{consulta}', f'{endereco}?{consulta}', perfil
+
+    def _objeto(self, modelo, oficina):
+        pk = modelo.objects.filter(oficina=oficina).order_by('-pk').values_list('pk', flat=True).first()
+        if pk is None:
+            raise CommandError(f'A oficina não tem nenhum {modelo._meta.verbose_name} para medir as views.')
+        return pk
+
+    def _requisitar(self, cliente, endereco):
+        resposta = cliente.get(endereco)
+        if resposta.streaming:
+            # Exportações: o trabalho acontece ao consumir o conteúdo
+            b''.join(resposta.streaming_content)
+        return resposta
+
+    def _medir(self, cliente, endereco, repeticoes, aquecimento):
+        resposta = self._requisitar(cliente, endereco)
+        if resposta.status_code == 405:
+            return None
+        for _ in range(aquecimento):
+            self._requisitar(cliente, endereco)
+
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            self._requisitar(cliente, endereco)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+        # Consultas e memória em requisições à parte, para não pesarem nos tempos
+        with medir_sql() as medidor:
+            self._requisitar(cliente, endereco)
+        tracemalloc.start()
+        try:
+            self._requisitar(cliente, endereco)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        percentis = statistics.quantiles(tempos, n=100, method='inclusive') if len(tempos) > 1 else tempos * 99
+        return {
+            'status': resposta.status_code,
+            'p50_ms': round(percentis[49], 3),
+            'p95_ms': round(percentis[94], 3),
+            'consultas': medidor.consultas,
+            'memoria_kb': round(pico / 1024, 1),
+        }
+
+    def _comparar(self, caminho, escala, resultados, tolerancia):
+        try:
+            with open(caminho) as arquivo:
+                baseline = json.load(arquivo)
+        except (OSError, ValueError) as erro:
+            raise CommandError(f'Não foi possível ler o baseline {caminho}: {erro}')
+
+        if baseline.get('escala') != escala:
+            self.stderr.write(self.style.WARNING(
+                f'Aviso: a escala dos dados difere do baseline ({baseline.get("escala")}); '
+                f'consultas e tempos podem não ser comparáveis.'
+            ))
+
+        regressoes = []
+        for chave, atual in resultados.items():
+            anterior = baseline.get('views', {}).get(chave)
+            if anterior is None:
+                continue
+            if atual['status'] != anterior['status']:
+                regressoes.append(f'{chave}: status {anterior["status"]} → {atual["status"]}')
+            if atual['consultas'] > anterior['consultas']:
+                regressoes.append(f'{chave}: {anterior["consultas"]} → {atual["consultas"]} consultas')
+            limite = max(anterior['p50_ms'] * (1 + tolerancia), anterior['p50_ms'] + TOLERANCIA_MINIMA_MS)
+            if atual['p50_ms'] > limite:
+                regressoes.append(f'{chave}: p50 {anterior["p50_ms"]:.2f} → {atual["p50_ms"]:.2f} ms')
+            limite = max(anterior['memoria_kb'] * (1 + tolerancia), anterior['memoria_kb'] + TOLERANCIA_MINIMA_KB)
+            if atual['memoria_kb'] > limite:
+                regressoes.append(f'{chave}: memória {anterior["memoria_kb"]:.1f} → {atual["memoria_kb"]:.1f} KB')
+
+        novas = sorted(set(resultados) - set(baseline.get('views', {})))
+        if novas:
+            self.stdout.write(f'Sem baseline: {", ".join(novas)}')
+        if regressoes:
+            for regressao in regressoes:
+                self.stderr.write(self.style.ERROR(f'✗ {regressao}'))
+            raise CommandError(f'{len(regressoes)} regressão(ões) de desempenho em relação a {caminho}.')
+        self.stdout.write(self.style.SUCCESS(f'✓ Nenhuma regressão em relação a {caminho}'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.estoque import TAMANHO_LOTE, consolidar
+from oficina.models import Oficina
+
+
+class Command(BaseCommand):
+    help = 'Grava o saldo consolidado das peças com movimentos desde a última consolidação'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--oficina', type=int, help='ID da oficina (padrão: todas)')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Saldos gravados por transação')
+
+    def handle(self, *args, **options):
+        oficina = None
+        if options['oficina']:
+            try:
+                oficina = Oficina.objects.get(pk=options['oficina'])
+            except Oficina.DoesNotExist:
+                raise CommandError(f'Oficina {options["oficina"]} não encontrada.')
+
+        saldos = consolidar(oficina, options['lote'])
+        alvo = oficina.nome if oficina else 'todas as oficinas'
+        self.stdout.write(self.style.SUCCESS(f'✓ {saldos} saldo(s) de estoque consolidados para {alvo}'))
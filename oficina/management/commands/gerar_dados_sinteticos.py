@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.dados_sinteticos import TAMANHO_LOTE, Escala, gerar
+
+
+class Command(BaseCommand):
+    help = 'Gera oficinas com clientes, veículos, ordens, itens, pagamentos e peças sintéticos para testes de carga'
+
+    def add_arguments(self, parser):
+        padrao = Escala()
+        parser.add_argument('--oficinas', type=int, default=padrao.oficinas, help='Oficinas a criar')
+        parser.add_argument('--clientes', type=int, default=padrao.clientes, help='Clientes por oficina')
+        parser.add_argument('--veiculos', type=int, default=padrao.veiculos, help='Máximo de veículos por cliente')
+        parser.add_argument('--ordens', type=int, default=padrao.ordens, help='Ordens de serviço por oficina')
+        parser.add_argument('--itens', type=int, default=padrao.itens, help='Máximo de itens por ordem')
+        parser.add_argument('--pagamentos', type=int, default=padrao.pagamentos,
+                            help='Máximo de pagamentos por ordem concluída ou entregue')
+        parser.add_argument('--pecas', type=int, default=padrao.pecas, help='Peças de estoque por oficina')
+        parser.add_argument('--meses', type=int, default=padrao.meses, help='Meses cobertos pelas datas de entrada')
+        parser.add_argument('--semente', type=int, default=0, help='Semente do gerador aleatório')
+        parser.add_argument('--senha', help='Senha dos usuários criados (padrão: sem login por senha)')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Registros gravados por transação')
+
+    def handle(self, *args, **options):
+        escala = Escala(**{nome: options[nome] for nome in Escala.__dataclass_fields__})
+        if escala.oficinas < 1 or escala.clientes < 1 or escala.veiculos < 1 or escala.itens < 1:
+            raise CommandError('--oficinas, --clientes, --veiculos e --itens devem ser pelo menos 1.')
+        if min(escala.ordens, escala.pagamentos, escala.pecas, escala.meses) < 0:
+            raise CommandError('As quantidades não podem ser negativas.')
+
+        resultado = gerar(
+            escala, semente=options['semente'], senha=options['senha'], tamanho_lote=options['lote'],
+            ao_progredir=self.stdout.write,
+        )
+        resumo = ', '.join(f'{quantidade} {nome}' for nome, quantidade in resultado.contagem.items())
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(resultado.oficinas)} oficina(s) geradas: {resumo}'))
+        self.stdout.write(f'Proprietários: {", ".join(usuario.username for usuario in resultado.usuarios)}')
+        self.stdout.write(f'Superusuário: {resultado.superusuario.username}')
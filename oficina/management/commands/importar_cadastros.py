@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.importacao import TAMANHO_LOTE, importar_clientes, importar_veiculos
+from oficina.models import Oficina
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes e veículos de arquivos CSV para uma oficina'
+
+    def add_arguments(self, parser):
+        parser.add_argument('oficina', type=int, help='ID da oficina de destino')
+        parser.add_argument('--clientes', help='CSV de clientes (nome, cpf_cnpj, telefone, email, endereco, cidade, ativo)')
+        parser.add_argument('--veiculos', help='CSV de veículos (cpf_cnpj, marca, modelo, ano, placa, cor, km_atual)')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas gravadas por transação')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificação dos arquivos (padrão: utf-8-sig)')
+
+    def handle(self, *args, **options):
+        if not options['clientes'] and not options['veiculos']:
+            raise CommandError('Informe --clientes e/ou --veiculos.')
+        try:
+            oficina = Oficina.objects.get(pk=options['oficina'])
+        except Oficina.DoesNotExist:
+            raise CommandError(f'Oficina {options["oficina"]} não encontrada.')
+
+        # Clientes primeiro: os veículos são ligados a eles pelo CPF/CNPJ
+        etapas = [
+            ('clientes', importar_clientes),
+            ('veiculos', importar_veiculos),
+        ]
+        for opcao, importar in etapas:
+            caminho = options[opcao]
+            if not caminho:
+                continue
+
+            def registrar_erro(linha, mensagem):
+                self.stderr.write(f'{caminho}:{linha}: {mensagem}')
+
+            try:
+                with open(caminho, newline='', encoding=options['encoding']) as arquivo:
+                    resultado = importar(oficina, arquivo, options['lote'], registrar_erro)
+            except OSError as e:
+                raise CommandError(f'Não foi possível ler {caminho}: {e}')
+
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {opcao}: {resultado.criados} importado(s), {resultado.duplicados} duplicado(s) '
+                f'ignorado(s), {resultado.erros} com erro'
+            ))
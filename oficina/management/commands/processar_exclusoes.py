@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from oficina.exclusao import processar_exclusoes
+from oficina.models import ExclusaoOficina
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as exclusões de oficinas pendentes ou interrompidas, em lotes '
+        '(para cron/systemd ou quando a thread em segundo plano estiver desligada)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=settings.EXCLUSAO_TAMANHO_LOTE,
+                            help='Linhas apagadas por transação')
+        parser.add_argument('--repetir-erros', action='store_true',
+                            help='Volta para pendentes as exclusões que terminaram com erro')
+        parser.add_argument('--continuo', action='store_true', help='Continua aguardando novas exclusões')
+        parser.add_argument('--intervalo', type=int, default=10,
+                            help='Segundos entre verificações com --continuo (padrão: 10)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser pelo menos 1.')
+        if options['repetir_erros']:
+            ativas = ExclusaoOficina.objects.filter(status__in=ExclusaoOficina.STATUS_ATIVOS, oficina__isnull=False)
+            # Só uma exclusão ativa por oficina: as que já foram solicitadas de novo ficam como estão
+            repetidas = ExclusaoOficina.objects.filter(status='erro').exclude(
+                oficina__in=ativas.values('oficina')
+            ).update(
+                status='pendente', erro='', atualizado_em=timezone.now()
+            )
+            self.stdout.write(f'{repetidas} exclusão(ões) com erro voltaram para a fila')
+
+        while True:
+            processadas = processar_exclusoes(options['lote'])
+            if processadas:
+                self.stdout.write(self.style.SUCCESS(f'✓ {processadas} exclusão(ões) de oficina processadas'))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+        erros = ExclusaoOficina.objects.filter(status='erro').count()
+        if erros:
+            self.stderr.write(self.style.WARNING(f'{erros} exclusão(ões) com erro; use --repetir-erros após corrigir'))
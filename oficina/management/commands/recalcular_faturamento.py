@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.models import Oficina
+from oficina.receita import reconstruir_faturamento_diario
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o faturamento diário consolidado a partir dos pagamentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--oficina', type=int, help='ID da oficina (padrão: todas)')
+
+    def handle(self, *args, **options):
+        oficina = None
+        if options['oficina']:
+            try:
+                oficina = Oficina.objects.get(pk=options['oficina'])
+            except Oficina.DoesNotExist:
+                raise CommandError(f'Oficina {options["oficina"]} não encontrada.')
+
+        linhas = reconstruir_faturamento_diario(oficina)
+        alvo = oficina.nome if oficina else 'todas as oficinas'
+        self.stdout.write(self.style.SUCCESS(f'✓ {linhas} linha(s) de faturamento diário recalculadas para {alvo}'))
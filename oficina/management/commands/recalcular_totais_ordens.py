@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.models import Oficina, OrdemServico
+from oficina.totais import recalcular_totais
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o valor total e o valor final das ordens de serviço a partir dos itens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--oficina', type=int, help='ID da oficina (padrão: todas)')
+
+    def handle(self, *args, **options):
+        ordens = OrdemServico.objects.all()
+        alvo = 'todas as oficinas'
+        if options['oficina']:
+            try:
+                oficina = Oficina.objects.get(pk=options['oficina'])
+            except Oficina.DoesNotExist:
+                raise CommandError(f'Oficina {options["oficina"]} não encontrada.')
+            ordens = ordens.filter(oficina=oficina)
+            alvo = oficina.nome
+
+        quantidade = recalcular_totais(ordens)
+        self.stdout.write(self.style.SUCCESS(f'✓ Totais de {quantidade} ordem(ns) recalculados para {alvo}'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from oficina.busca import indexar_em_lote
+from oficina.models import Cliente, IndiceBusca, Oficina, OrdemServico, Veiculo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca de clientes, veículos e ordens de serviço'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--oficina', type=int, help='ID da oficina (padrão: todas)')
+        parser.add_argument('--lote', type=int, default=2000, help='Registros lidos por vez')
+
+    def handle(self, *args, **options):
+        filtro = {}
+        if options['oficina']:
+            if not Oficina.objects.filter(pk=options['oficina']).exists():
+                raise CommandError(f'Oficina {options["oficina"]} não encontrada.')
+            filtro = {'oficina_id': options['oficina']}
+
+        fontes = [
+            Cliente.objects.filter(oficina__isnull=False, **filtro),
+            Veiculo.objects.filter(oficina__isnull=False, **filtro),
+            OrdemServico.objects.filter(oficina__isnull=False, **filtro),
+        ]
+
+        with transaction.atomic():
+            IndiceBusca.objects.filter(**filtro).delete()
+            for queryset in fontes:
+                lote = []
+                for objeto in queryset.order_by().iterator(chunk_size=options['lote']):
+                    lote.append(objeto)
+                    if len(lote) >= options['lote']:
+                        indexar_em_lote(lote)
+                        lote = []
+                indexar_em_lote(lote)
+
+        total = IndiceBusca.objects.filter(**filtro).count()
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} registro(s) indexado(s)'))
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.manutencao_sqlite import BancoNaoSqlite, backup
+
+
+class Command(BaseCommand):
+    help = 'Cópia de segurança do banco SQLite com a aplicação no ar (API de backup do SQLite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('destino', help='Arquivo de destino da cópia')
+        parser.add_argument('--paginas', type=int, default=256, help='Páginas copiadas por passo')
+        parser.add_argument('--pausa', type=float, default=0.05, help='Segundos de pausa entre os passos')
+        parser.add_argument('--database', default='default', help='Alias do banco (padrão: default)')
+
+    def handle(self, *args, **options):
+        def progresso(restantes, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{total - restantes}/{total} páginas')
+
+        try:
+            destino = backup(
+                options['destino'], options['database'], options['paginas'], options['pausa'], progresso
+            )
+        except BancoNaoSqlite as e:
+            raise CommandError(str(e))
+        except (sqlite3.Error, OSError) as e:
+            raise CommandError(f'Falha na cópia: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Cópia gravada em {destino}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.manutencao_sqlite import MODOS_CHECKPOINT, BancoNaoSqlite, checkpoint
+
+
+class Command(BaseCommand):
+    help = 'Copia o WAL do SQLite para o arquivo do banco (PASSIVE não bloqueia a aplicação)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', default='PASSIVE', choices=MODOS_CHECKPOINT, help='Modo do wal_checkpoint')
+        parser.add_argument('--database', default='default', help='Alias do banco (padrão: default)')
+
+    def handle(self, *args, **options):
+        try:
+            ocupado, paginas, copiadas = checkpoint(options['database'], options['modo'])
+        except BancoNaoSqlite as e:
+            raise CommandError(str(e))
+
+        if paginas == -1:
+            raise CommandError('O banco não está em modo WAL.')
+        estilo = self.style.WARNING if ocupado or copiadas < paginas else self.style.SUCCESS
+        self.stdout.write(estilo(f'✓ Checkpoint {options["modo"]}: {copiadas} de {paginas} página(s) do WAL copiadas'))
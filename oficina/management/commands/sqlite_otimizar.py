@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from oficina.manutencao_sqlite import BancoNaoSqlite, otimizar
+
+
+class Command(BaseCommand):
+    help = 'Atualiza as estatísticas do planejador de consultas do SQLite (PRAGMA optimize)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Executa ANALYZE em todas as tabelas')
+        parser.add_argument('--database', default='default', help='Alias do banco (padrão: default)')
+
+    def handle(self, *args, **options):
+        try:
+            otimizar(options['database'], options['completo'])
+        except BancoNaoSqlite as e:
+            raise CommandError(str(e))
+
+        operacao = 'ANALYZE' if options['completo'] else 'PRAGMA optimize'
+        self.stdout.write(self.style.SUCCESS(f'✓ {operacao} concluído'))
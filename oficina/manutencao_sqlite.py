@@ -0,0 +1,86 @@
+"""
+Manutenção do banco SQLite em produção, sem parar a aplicação.
+
+- checkpoint: copia o WAL de volta para o banco. O modo PASSIVE (padrão)
+  não espera nenhum leitor nem escritor; os outros modos podem esperar o
+  busy_timeout e só devem ser usados em horários de pouco movimento.
+- otimizar: PRAGMA optimize (reanalisa só as tabelas que precisam), com
+  analysis_limit para limitar o tempo de cada ANALYZE.
+- backup: cópia consistente pela API de backup do SQLite, em passos de
+  poucas páginas com pausa entre eles. Com WAL os passos só precisam de
+  leitura, então a aplicação continua gravando normalmente; o arquivo é
+  escrito com outro nome e renomeado no fim.
+"""
+import os
+import sqlite3
+
+from django.db import connections
+
+
+MODOS_CHECKPOINT = ['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE']
+LIMITE_ANALISE = 1000
+
+
+class BancoNaoSqlite(Exception):
+    pass
+
+
+def _conexao(alias):
+    """Conexão própria com o arquivo do banco, separada das conexões da aplicação"""
+    configuracao = connections[alias].settings_dict
+    if connections[alias].vendor != 'sqlite':
+        raise BancoNaoSqlite(f'O banco "{alias}" não é SQLite.')
+    # Mesmo tempo de espera por lock do backend de produção
+    conexao = sqlite3.connect(configuracao['NAME'], timeout=10, isolation_level=None)
+    return configuracao['NAME'], conexao
+
+
+def checkpoint(alias='default', modo='PASSIVE'):
+    """Executa o checkpoint do WAL. Retorna (ocupado, páginas no WAL, páginas copiadas)"""
+    if modo not in MODOS_CHECKPOINT:
+        raise ValueError(f'Modo inválido: {modo}')
+    _, conexao = _conexao(alias)
+    try:
+        return conexao.execute(f'PRAGMA wal_checkpoint({modo})').fetchone()
+    finally:
+        conexao.close()
+
+
+def otimizar(alias='default', completo=False):
+    """PRAGMA optimize, ou ANALYZE de todas as tabelas com completo=True"""
+    _, conexao = _conexao(alias)
+    try:
+        conexao.execute(f'PRAGMA analysis_limit = {LIMITE_ANALISE}')
+        conexao.execute('ANALYZE' if completo else 'PRAGMA optimize')
+    finally:
+        conexao.close()
+
+
+def backup(destino, alias='default', paginas=256, pausa=0.05, progresso=None):
+    """
+    Copia o banco para `destino` com a API de backup. `progresso` recebe
+    (restantes, total) a cada passo.
+    """
+    _, origem = _conexao(alias)
+    temporario = f'{destino}.parcial'
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    copia = sqlite3.connect(temporario)
+    try:
+        origem.backup(
+            copia,
+            pages=paginas,
+            sleep=pausa,
+            progress=(lambda status, restantes, total: progresso(restantes, total)) if progresso else None,
+        )
+        verificacao = copia.execute('PRAGMA quick_check').fetchone()[0]
+        # A cópia sai no modo de journal padrão, pronta para ser aberta sozinha
+        copia.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        copia.close()
+        origem.close()
+    if verificacao != 'ok':
+        os.remove(temporario)
+        raise sqlite3.DatabaseError(f'Cópia inconsistente: {verificacao}')
+    os.replace(temporario, destino)
+    return destino
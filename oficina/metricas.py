@@ -0,0 +1,275 @@
+"""
+Métricas de desempenho por view e por oficina.
+
+O MetricasMiddleware mede, em cada requisição, a duração total, quantas
+consultas SQL foram feitas e quanto tempo elas levaram, e soma essas medidas
+em histogramas de faixas fixas rotulados pelo nome da URL e pela oficina.
+Somar em um histograma é um bisect e três incrementos por medida, sem
+guardar as amostras.
+
+Cada processo (worker do gunicorn/uvicorn) acumula os próprios histogramas
+em memória e os grava de tempos em tempos em METRICAS_DIR, um arquivo por
+processo. A view `metricas` soma os arquivos de todos os workers com os
+números atuais do processo que atende a requisição e responde no formato
+texto do Prometheus. Os valores são cumulativos desde o início de cada
+worker; os arquivos de workers encerrados continuam sendo somados, então
+o diretório deve ser esvaziado ao reiniciar o servidor (o Prometheus trata
+a queda dos contadores como reinício).
+
+Respostas em streaming (exportações CSV) são medidas até a resposta ser
+criada, sem o tempo de envio do conteúdo.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+
+PREFIXO = 'mecanosync'
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+# nome: (descrição, limites superiores das faixas)
+HISTOGRAMAS = {
+    'requisicao_segundos': ('Duração das requisições em segundos', LIMITES_SEGUNDOS),
+    'sql_consultas': ('Consultas SQL por requisição', LIMITES_CONSULTAS),
+    'sql_segundos': ('Tempo gasto em SQL por requisição, em segundos', LIMITES_SEGUNDOS),
+}
+SEM_VIEW = 'nao_resolvida'
+SEM_OFICINA = 'nenhuma'
+
+
+def _vazio():
+    # Contagem por faixa (a última é +Inf) e soma das medidas
+    return {nome: {'faixas': [0] * (len(limites) + 1), 'soma': 0} for nome, (_, limites) in HISTOGRAMAS.items()}
+
+
+class Registro:
+    """Histogramas do processo atual, gravados periodicamente no diretório compartilhado"""
+
+    def __init__(self, diretorio, intervalo):
+        self.diretorio = str(diretorio)
+        self.intervalo = intervalo
+        self._trava = threading.Lock()
+        self._series = {}
+        self._gravado_em = time.monotonic()
+        self._pid = None
+
+    @property
+    def arquivo(self):
+        # Recalculado após um fork: cada worker grava o próprio arquivo
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._series = {}
+            self._nome = os.path.join(self.diretorio, f'{self._pid}-{time.time_ns()}.json')
+        return self._nome
+
+    def observar(self, view, oficina, medidas):
+        """Soma `medidas` ({nome do histograma: valor}) na série (view, oficina)"""
+        arquivo = self.arquivo
+        with self._trava:
+            serie = self._series.setdefault(f'{view}|{oficina}', _vazio())
+            for nome, valor in medidas.items():
+                histograma = serie[nome]
+                histograma['faixas'][bisect_left(HISTOGRAMAS[nome][1], valor)] += 1
+                histograma['soma'] += valor
+            gravar = time.monotonic() - self._gravado_em >= self.intervalo
+            if gravar:
+                self._gravado_em = time.monotonic()
+                conteudo = json.dumps(self._series)
+        if gravar:
+            self._gravar(arquivo, conteudo)
+
+    def gravar(self):
+        arquivo = self.arquivo
+        with self._trava:
+            if not self._series:
+                return
+            self._gravado_em = time.monotonic()
+            conteudo = json.dumps(self._series)
+        self._gravar(arquivo, conteudo)
+
+    def _gravar(self, arquivo, conteudo):
+        temporario = f'{arquivo}.tmp'
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            with open(temporario, 'w') as destino:
+                destino.write(conteudo)
+            os.replace(temporario, arquivo)
+        except OSError:
+            # Métricas nunca derrubam uma requisição
+            pass
+
+    def consolidado(self):
+        """Séries de todos os workers somadas: {(view, oficina): histogramas}"""
+        proprio = self.arquivo
+        with self._trava:
+            fontes = [json.loads(json.dumps(self._series))]
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            nomes = []
+        for nome in nomes:
+            caminho = os.path.join(self.diretorio, nome)
+            if not nome.endswith('.json') or caminho == proprio:
+                continue
+            try:
+                with open(caminho) as origem:
+                    fontes.append(json.load(origem))
+            except (OSError, ValueError):
+                continue
+
+        total = {}
+        for series in fontes:
+            for chave, histogramas in series.items():
+                destino = total.setdefault(tuple(chave.split('|', 1)), _vazio())
+                for nome, histograma in histogramas.items():
+                    if nome not in destino:
+                        continue
+                    destino[nome]['soma'] += histograma['soma']
+                    for indice, quantidade in enumerate(histograma['faixas'][:len(destino[nome]['faixas'])]):
+                        destino[nome]['faixas'][indice] += quantidade
+        return total
+
+
+_registro = None
+
+
+def registro():
+    global _registro
+    if _registro is None:
+        _registro = Registro(settings.METRICAS_DIR, settings.METRICAS_INTERVALO_GRAVACAO)
+        atexit.register(_registro.gravar)
+    return _registro
+
+
+@receiver(setting_changed)
+def _descartar_registro(setting, **kwargs):
+    """Com override_settings de METRICAS_DIR (testes), o próximo registro usa o novo diretório"""
+    global _registro
+    if setting in ('METRICAS_DIR', 'METRICAS_INTERVALO_GRAVACAO') and _registro is not None:
+        atexit.unregister(_registro.gravar)
+        _registro.gravar()
+        _registro = None
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def formato_prometheus(series):
+    """Texto no formato de exposição do Prometheus (version 0.0.4)"""
+    linhas = []
+    for nome, (descricao, limites) in HISTOGRAMAS.items():
+        metrica = f'{PREFIXO}_{nome}'
+        linhas.append(f'# HELP {metrica} {descricao}')
+        linhas.append(f'# TYPE {metrica} histogram')
+        for (view, oficina), histogramas in sorted(series.items()):
+            rotulos = f'view="{view}",oficina="{oficina}"'
+            histograma = histogramas[nome]
+            acumulado = 0
+            for limite, quantidade in zip((*limites, '+Inf'), histograma['faixas']):
+                acumulado += quantidade
+                linhas.append(f'{metrica}_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+            linhas.append(f'{metrica}_sum{{{rotulos}}} {_numero(histograma["soma"])}')
+            linhas.append(f'{metrica}_count{{{rotulos}}} {acumulado}')
+    return '\n'.join(linhas) + '\n'
+
+
+class MedidorSql:
+    """execute_wrapper que conta as consultas e soma o tempo gasto nelas"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _instalar(medidor):
+    for alias in connections:
+        connections[alias].execute_wrappers.append(medidor)
+
+
+def _remover(medidor):
+    for alias in connections:
+        connections[alias].execute_wrappers.remove(medidor)
+
+
+@contextmanager
+def medir_sql():
+    """Conta as consultas e o tempo de SQL de todas as conexões dentro do bloco"""
+    medidor = MedidorSql()
+    _instalar(medidor)
+    try:
+        yield medidor
+    finally:
+        _remover(medidor)
+
+
+class MetricasMiddleware:
+    """
+    Registra duração, consultas SQL e tempo de SQL de cada requisição.
+
+    Fica no início de MIDDLEWARE para medir também sessão, autenticação e
+    oficina; a oficina é lida de `request.oficina` depois da resposta.
+
+    Sob ASGI roda no modo assíncrono, sem prender uma thread por requisição.
+    As conexões do Django são por thread e o ORM (inclusive o assíncrono)
+    consulta na thread da requisição usada pelo sync_to_async, então o
+    medidor de SQL é instalado e removido nessa thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICAS_HABILITADAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.registro = registro()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        with medir_sql() as medidor:
+            response = self.get_response(request)
+        self._registrar(request, time.perf_counter() - inicio, medidor)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        medidor = MedidorSql()
+        await sync_to_async(_instalar)(medidor)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remover)(medidor)
+        self._registrar(request, time.perf_counter() - inicio, medidor)
+        return response
+
+    def _registrar(self, request, duracao, medidor):
+        rota = getattr(request, 'resolver_match', None)
+        oficina = getattr(request, 'oficina', None)
+        self.registro.observar(
+            (rota.url_name or rota.view_name) if rota else SEM_VIEW,
+            oficina.pk if oficina is not None else SEM_OFICINA,
+            {'requisicao_segundos': duracao, 'sql_consultas': medidor.consultas, 'sql_segundos': medidor.segundos},
+        )
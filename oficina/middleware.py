@@ -0,0 +1,68 @@
+"""
+Contexto da oficina (tenant) de cada requisição.
+
+O OficinaMiddleware resolve a oficina ativa do usuário logado uma única vez
+por requisição e a disponibiliza em `request.oficina` (None para
+superusuários, anônimos e usuários sem oficina ativa).
+
+A consulta fica em cache por usuário no cache compartilhado entre os
+processos. As chaves levam um número de geração do usuário, trocado quando
+uma oficina dele é salva ou excluída (ver signals.py; o proprietário
+anterior também, se a oficina mudou de dono). Isso invalida o contexto
+desses usuários em todos os workers sem afetar as outras oficinas.
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import Oficina
+
+
+CACHE_TIMEOUT = 600
+
+
+def _chave_geracao(usuario_id):
+    return f'oficina_usuario:geracao:{usuario_id}'
+
+
+def geracao_contexto(usuario_id):
+    """Número de geração atual do contexto de oficina do usuário (trocado a cada alteração da oficina dele)"""
+    chave = _chave_geracao(usuario_id)
+    geracao = cache.get(chave)
+    if geracao is None:
+        cache.add(chave, time.time_ns(), None)
+        geracao = cache.get(chave)
+    return geracao
+
+
+def invalidar_oficinas_usuarios(usuarios_ids):
+    """Descarta o contexto de oficina em cache dos usuários"""
+    versao = time.time_ns()
+    cache.set_many({_chave_geracao(pk): versao for pk in usuarios_ids if pk is not None}, None)
+
+
+def oficina_do_usuario(user):
+    """Retorna a oficina ativa do usuário (None para superusuários), usando o cache"""
+    if not user.is_authenticated or user.is_superuser:
+        return None
+
+    chave = f'oficina_usuario:{geracao_contexto(user.pk)}:{user.pk}'
+    encontrado = cache.get(chave)
+    if encontrado is not None:
+        # Guardado como tupla para diferenciar "sem oficina" de "fora do cache"
+        return encontrado[0]
+
+    oficina = Oficina.objects.filter(proprietario=user, ativo=True).first()
+    cache.set(chave, (oficina,), CACHE_TIMEOUT)
+    return oficina
+
+
+class OficinaMiddleware:
+    """Anexa a oficina do usuário logado à requisição como `request.oficina`"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.oficina = oficina_do_usuario(request.user)
+        return self.get_response(request)
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0005_alter_ordemservico_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['oficina', '-data_cadastro', 'id'], name='cliente_oficina_cadastro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['oficina', 'ativo', '-data_cadastro', 'id'], name='cliente_oficina_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['oficina', '-data_cadastro', 'id'], name='cliente_ativos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordemservico',
+            index=models.Index(fields=['oficina', 'status'], name='os_oficina_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordemservico',
+            index=models.Index(fields=['oficina', 'data_previsao'], name='os_oficina_previsao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordemservico',
+            index=models.Index(fields=['oficina', 'data_entrada', 'numero_os'], name='os_oficina_entrada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordemservico',
+            index=models.Index(condition=models.Q(('status__in', ['aguardando_aprovacao', 'em_andamento', 'aguardando_pecas'])), fields=['oficina', 'data_previsao'], name='os_abertas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['ordem', 'status', 'data_pagamento'], name='pagamento_ordem_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['-data_pagamento', 'id'], name='pagamento_data_idx'),
+        ),
+    ]
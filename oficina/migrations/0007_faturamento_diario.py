@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:01
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def preencher_faturamento_diario(apps, schema_editor):
+    Pagamento = apps.get_model('oficina', 'Pagamento')
+    FaturamentoDiario = apps.get_model('oficina', 'FaturamentoDiario')
+
+    linhas = Pagamento.objects.filter(ordem__oficina__isnull=False).order_by().values(
+        'ordem__oficina', 'data_pagamento', 'metodo', 'status'
+    ).annotate(soma=Sum('valor'), quantidade=Count('id'))
+
+    FaturamentoDiario.objects.bulk_create(
+        (
+            FaturamentoDiario(
+                oficina_id=linha['ordem__oficina'], dia=linha['data_pagamento'],
+                metodo=linha['metodo'], status=linha['status'],
+                total=linha['soma'], quantidade=linha['quantidade']
+            )
+            for linha in linhas.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0006_indices_filtros_oficina'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaturamentoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('metodo', models.CharField(choices=[('dinheiro', 'Dinheiro'), ('cartao_credito', 'Cartão de Crédito'), ('cartao_debito', 'Cartão de Débito'), ('pix', 'PIX'), ('transferencia', 'Transferência Bancária'), ('boleto', 'Boleto')], max_length=20, verbose_name='Método de Pagamento')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('pago', 'Pago'), ('cancelado', 'Cancelado')], max_length=20, verbose_name='Status')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade')),
+                ('oficina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='faturamento_diario', to='oficina.oficina', verbose_name='Oficina')),
+            ],
+            options={
+                'verbose_name': 'Faturamento Diário',
+                'verbose_name_plural': 'Faturamento Diário',
+                'ordering': ['-dia'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='faturamentodiario',
+            constraint=models.UniqueConstraint(fields=('oficina', 'dia', 'metodo', 'status'), name='faturamento_diario_unico'),
+        ),
+        migrations.RunPython(preencher_faturamento_diario, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:02
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.db.models.functions import Cast
+import django.db.models.deletion
+
+
+def criar_sequencias(apps, schema_editor):
+    """Cria a sequência de cada oficina continuando do maior número de OS já usado"""
+    OrdemServico = apps.get_model('oficina', 'OrdemServico')
+    SequenciaOS = apps.get_model('oficina', 'SequenciaOS')
+
+    maiores = OrdemServico.objects.order_by().values('oficina').annotate(
+        maior=Max(Cast('numero_os', models.IntegerField()))
+    )
+    SequenciaOS.objects.bulk_create([
+        SequenciaOS(oficina_id=linha['oficina'], proximo_numero=max((linha['maior'] or 0) + 1, 1001))
+        for linha in maiores
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0007_faturamento_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaOS',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proximo_numero', models.PositiveIntegerField(default=1001, verbose_name='Próximo Número')),
+            ],
+            options={
+                'verbose_name': 'Sequência de OS',
+                'verbose_name_plural': 'Sequências de OS',
+            },
+        ),
+        migrations.AlterField(
+            model_name='ordemservico',
+            name='numero_os',
+            field=models.CharField(editable=False, max_length=20, verbose_name='Nº OS'),
+        ),
+        migrations.AddConstraint(
+            model_name='ordemservico',
+            constraint=models.UniqueConstraint(fields=('oficina', 'numero_os'), name='os_numero_unico_por_oficina'),
+        ),
+        migrations.AddField(
+            model_name='sequenciaos',
+            name='oficina',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sequencia_os', to='oficina.oficina', verbose_name='Oficina'),
+        ),
+        migrations.RunPython(criar_sequencias, migrations.RunPython.noop),
+    ]
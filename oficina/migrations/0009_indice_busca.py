@@ -0,0 +1,133 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:03
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Cópia do que oficina/busca.py fazia quando esta migração foi escrita: a
+# migração não pode mudar junto com o código do app
+
+TABELA = 'oficina_indicebusca'
+TABELA_FTS = 'oficina_indicebusca_fts'
+
+
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def _digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def _juntar(*partes):
+    return normalizar(' '.join(str(p) for p in partes if p))
+
+
+def conteudo_cliente(cliente):
+    return _juntar(
+        cliente.nome, cliente.cpf_cnpj, _digitos(cliente.cpf_cnpj),
+        cliente.telefone, _digitos(cliente.telefone), cliente.email
+    )
+
+
+def conteudo_veiculo(veiculo):
+    placa = veiculo.placa or ''
+    return _juntar(placa, placa.replace('-', ''), veiculo.marca, veiculo.modelo, veiculo.ano, veiculo.cor)
+
+
+def conteudo_ordem(ordem):
+    return _juntar(ordem.numero_os, ordem.descricao_problema)
+
+
+def criar_estrutura(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+            f"conteudo, content='{TABELA}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ai AFTER INSERT ON {TABELA} BEGIN "
+            f"INSERT INTO {TABELA_FTS}(rowid, conteudo) VALUES (new.id, new.conteudo); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ad AFTER DELETE ON {TABELA} BEGIN "
+            f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, conteudo) VALUES ('delete', old.id, old.conteudo); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA}_au AFTER UPDATE ON {TABELA} BEGIN "
+            f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, conteudo) VALUES ('delete', old.id, old.conteudo); "
+            f"INSERT INTO {TABELA_FTS}(rowid, conteudo) VALUES (new.id, new.conteudo); END"
+        )
+        schema_editor.execute(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')")
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TABELA}_tsv_idx ON {TABELA} "
+            f"USING GIN (to_tsvector('simple', conteudo))"
+        )
+
+
+def remover_estrutura(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sufixo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {TABELA}_{sufixo}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABELA_FTS}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TABELA}_tsv_idx')
+
+
+def indexar_existentes(apps, schema_editor):
+    IndiceBusca = apps.get_model('oficina', 'IndiceBusca')
+    Cliente = apps.get_model('oficina', 'Cliente')
+    Veiculo = apps.get_model('oficina', 'Veiculo')
+    OrdemServico = apps.get_model('oficina', 'OrdemServico')
+
+    fontes = [
+        ('cliente', Cliente.objects.filter(oficina__isnull=False), lambda c: c.oficina_id, conteudo_cliente),
+        ('veiculo', Veiculo.objects.filter(cliente__oficina__isnull=False).select_related('cliente'),
+         lambda v: v.cliente.oficina_id, conteudo_veiculo),
+        ('ordem', OrdemServico.objects.filter(oficina__isnull=False), lambda o: o.oficina_id, conteudo_ordem),
+    ]
+    for tipo, queryset, oficina_de, conteudo in fontes:
+        IndiceBusca.objects.bulk_create(
+            (
+                IndiceBusca(tipo=tipo, objeto_id=obj.pk, oficina_id=oficina_de(obj), conteudo=conteudo(obj))
+                for obj in queryset.order_by().iterator(chunk_size=2000)
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0008_sequencia_os'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cliente', 'Cliente'), ('veiculo', 'Veículo'), ('ordem', 'Ordem de Serviço')], max_length=10, verbose_name='Tipo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID do Objeto')),
+                ('conteudo', models.TextField(verbose_name='Conteúdo')),
+                ('oficina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indice_busca', to='oficina.oficina', verbose_name='Oficina')),
+            ],
+            options={
+                'verbose_name': 'Índice de Busca',
+                'verbose_name_plural': 'Índice de Busca',
+                'indexes': [models.Index(fields=['oficina', 'tipo'], name='indice_busca_oficina_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='indicebusca',
+            constraint=models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='indice_busca_objeto_unico'),
+        ),
+        migrations.RunPython(criar_estrutura, remover_estrutura),
+        migrations.RunPython(indexar_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0009_indice_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemservico',
+            name='oficina',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='itens_servico', to='oficina.oficina', verbose_name='Oficina'),
+        ),
+        migrations.AddField(
+            model_name='pagamento',
+            name='oficina',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pagamentos', to='oficina.oficina', verbose_name='Oficina'),
+        ),
+        migrations.AddField(
+            model_name='veiculo',
+            name='oficina',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='veiculos', to='oficina.oficina', verbose_name='Oficina'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery
+
+LOTE = 5000
+
+
+def _preencher(model, origem, campo_origem, using):
+    """Copia a oficina da origem em lotes de IDs, cada lote na sua transação"""
+    maior = model.objects.using(using).aggregate(maior=models.Max('pk'))['maior'] or 0
+    oficina = Subquery(origem.objects.filter(pk=OuterRef(campo_origem)).values('oficina_id')[:1])
+    for inicio in range(0, maior + 1, LOTE):
+        with transaction.atomic(using=using):
+            model.objects.using(using).filter(
+                pk__gte=inicio, pk__lt=inicio + LOTE, oficina__isnull=True
+            ).update(oficina_id=oficina)
+
+
+def preencher_oficina(apps, schema_editor):
+    using = schema_editor.connection.alias
+    Cliente = apps.get_model('oficina', 'Cliente')
+    OrdemServico = apps.get_model('oficina', 'OrdemServico')
+    _preencher(apps.get_model('oficina', 'Veiculo'), Cliente, 'cliente_id', using)
+    _preencher(apps.get_model('oficina', 'ItemServico'), OrdemServico, 'ordem_id', using)
+    _preencher(apps.get_model('oficina', 'Pagamento'), OrdemServico, 'ordem_id', using)
+
+
+class Migration(migrations.Migration):
+    # Sem transação única: cada lote do preenchimento é confirmado separadamente
+    atomic = False
+
+    dependencies = [
+        ('oficina', '0010_oficina_denormalizada'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_oficina, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='pagamento',
+            name='pagamento_ordem_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pagamento',
+            name='pagamento_data_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['oficina', 'status', 'data_pagamento'], name='pagamento_oficina_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagamento',
+            index=models.Index(fields=['oficina', '-data_pagamento', 'id'], name='pagamento_oficina_data_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0011_preencher_oficina'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['oficina', 'cpf_cnpj'], name='cliente_oficina_cpf_idx'),
+        ),
+    ]
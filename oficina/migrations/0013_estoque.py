@@ -0,0 +1,91 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('oficina', '0012_indice_cliente_cpf'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Peca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=50, verbose_name='Código')),
+                ('nome', models.CharField(max_length=200, verbose_name='Nome')),
+                ('unidade', models.CharField(default='un', max_length=10, verbose_name='Unidade')),
+                ('custo_unitario', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Custo Unitário')),
+                ('preco_venda', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Preço de Venda')),
+                ('estoque_minimo', models.DecimalField(decimal_places=3, default=0, max_digits=12, verbose_name='Estoque Mínimo')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('oficina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pecas', to='oficina.oficina', verbose_name='Oficina')),
+            ],
+            options={
+                'verbose_name': 'Peça',
+                'verbose_name_plural': 'Peças',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Quantidade')),
+                ('ultimo_movimento_id', models.BigIntegerField(verbose_name='Último Movimento')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Consolidado em')),
+                ('oficina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_estoque', to='oficina.oficina', verbose_name='Oficina')),
+                ('peca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='oficina.peca', verbose_name='Peça')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Estoque',
+                'verbose_name_plural': 'Saldos de Estoque',
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimentoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('saida', 'Saída'), ('ajuste', 'Ajuste')], max_length=10, verbose_name='Tipo')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Quantidade')),
+                ('custo_unitario', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Custo Unitário')),
+                ('observacao', models.CharField(blank=True, max_length=300, null=True, verbose_name='Observação')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Data')),
+                ('oficina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentos_estoque', to='oficina.oficina', verbose_name='Oficina')),
+                ('ordem', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movimentos_estoque', to='oficina.ordemservico', verbose_name='Ordem de Serviço')),
+                ('peca', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimentos', to='oficina.peca', verbose_name='Peça')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Movimento de Estoque',
+                'verbose_name_plural': 'Movimentos de Estoque',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='saldoestoque',
+            constraint=models.UniqueConstraint(fields=('peca', 'ultimo_movimento_id'), name='saldo_peca_movimento_unico'),
+        ),
+        migrations.AddIndex(
+            model_name='peca',
+            index=models.Index(fields=['oficina', 'nome', 'id'], name='peca_oficina_nome_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='peca',
+            constraint=models.UniqueConstraint(fields=('oficina', 'codigo'), name='peca_codigo_unico_por_oficina'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['peca', 'id'], name='movimento_peca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['oficina', '-id'], name='movimento_oficina_idx'),
+        ),
+    ]
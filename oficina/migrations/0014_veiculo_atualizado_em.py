@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0013_estoque'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='veiculo',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
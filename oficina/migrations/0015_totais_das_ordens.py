@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+NOME_SERVICO = 'Valor lançado manualmente'
+
+
+def converter_totais_digitados(apps, schema_editor):
+    """
+    Ordens sem itens guardavam o valor digitado no formulário antigo. Cada
+    uma ganha um item com esse valor (num serviço inativo, fora dos selects),
+    e então todas as ordens passam a ter o total igual à soma dos itens.
+    """
+    OrdemServico = apps.get_model('oficina', 'OrdemServico')
+    ItemServico = apps.get_model('oficina', 'ItemServico')
+    Servico = apps.get_model('oficina', 'Servico')
+
+    sem_itens = OrdemServico.objects.filter(valor_total__gt=0).exclude(
+        pk__in=ItemServico.objects.values('ordem')
+    ).values_list('pk', 'oficina_id', 'valor_total')
+    servico = None
+    lote = []
+    for pk, oficina_id, valor_total in sem_itens.iterator():
+        if servico is None:
+            servico = Servico.objects.create(nome=NOME_SERVICO, valor_padrao=0, ativo=False)
+        lote.append(ItemServico(
+            oficina_id=oficina_id, ordem_id=pk, servico=servico, quantidade=1,
+            valor_unitario=valor_total, valor_total=valor_total,
+            observacao='Total digitado antes do lançamento por itens',
+        ))
+        if len(lote) >= 1000:
+            ItemServico.objects.bulk_create(lote)
+            lote = []
+    ItemServico.objects.bulk_create(lote)
+
+    soma = ItemServico.objects.filter(ordem=OuterRef('pk')).order_by().values('ordem').annotate(
+        total=Sum('valor_total')
+    ).values('total')
+    OrdemServico.objects.update(valor_total=Coalesce(
+        Subquery(soma), Value(0), output_field=models.DecimalField(max_digits=10, decimal_places=2)
+    ))
+    # Um desconto maior que o total zera o valor final
+    OrdemServico.objects.update(valor_final=Greatest(
+        F('valor_total') - F('desconto'), Value(0, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0014_veiculo_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.RunPython(converter_totais_digitados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('oficina', '0015_totais_das_ordens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExclusaoOficina',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('oficina_nome', models.CharField(max_length=200, verbose_name='Nome da Oficina')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('em_andamento', 'Em Andamento'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Status')),
+                ('etapa', models.CharField(blank=True, max_length=50, verbose_name='Etapa')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Registros a Excluir')),
+                ('removidos', models.PositiveIntegerField(default=0, verbose_name='Registros Excluídos')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('executor', models.CharField(blank=True, max_length=100, verbose_name='Executor')),
+                ('concessao_ate', models.DateTimeField(blank=True, null=True, verbose_name='Concessão Até')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Solicitada em')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('oficina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exclusoes', to='oficina.oficina', verbose_name='Oficina')),
+                ('proprietario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Proprietário')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Exclusão de Oficina',
+                'verbose_name_plural': 'Exclusões de Oficina',
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='exclusaooficina',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pendente', 'em_andamento'])), fields=('oficina',), name='exclusao_ativa_por_oficina'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0016_exclusao_oficina'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ordemservico',
+            name='valor_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Valor Total'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:18
+
+from django.db import migrations, models
+import django.db.models.lookups
+
+
+def unificar_sequencias_sem_oficina(apps, schema_editor):
+    """Mantém só a sequência sem oficina mais adiantada, para nenhum número voltar"""
+    SequenciaOS = apps.get_model('oficina', 'SequenciaOS')
+    sem_oficina = SequenciaOS.objects.filter(oficina__isnull=True)
+    mantida = sem_oficina.order_by('-proximo_numero', 'pk').first()
+    if mantida is not None:
+        sem_oficina.exclude(pk=mantida.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0017_ordem_valor_total_calculado'),
+    ]
+
+    operations = [
+        migrations.RunPython(unificar_sequencias_sem_oficina, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ordemservico',
+            constraint=models.UniqueConstraint(condition=models.Q(('oficina__isnull', True)), fields=('numero_os',), name='os_numero_unico_sem_oficina'),
+        ),
+        migrations.AddConstraint(
+            model_name='sequenciaos',
+            constraint=models.UniqueConstraint(django.db.models.lookups.IsNull(models.F('oficina'), True), condition=models.Q(('oficina__isnull', True)), name='sequencia_os_unica_sem_oficina'),
+        ),
+    ]
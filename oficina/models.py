@@ -1,8 +1,29 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Cast, Greatest
+from django.db.models.lookups import IsNull
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .lookups import InLiteral
+
+
+# Clientes e ordens não mudam de oficina: a oficina é copiada nos veículos,
+# itens e pagamentos e entra no índice de busca e no faturamento consolidado,
+# que não seriam refeitos por uma troca
+OFICINA_FIXA = 'A oficina não pode ser alterada depois do cadastro.'
+
+# O total da ordem é a soma dos itens (ver totais.py)
+TOTAL_DOS_ITENS = 'O valor total da ordem é a soma dos itens e não pode ser informado.'
+
+
+def _oficina_alterada(instancia):
+    return getattr(instancia, '_oficina_carregada', instancia.oficina_id) != instancia.oficina_id
+
 
 class Oficina(models.Model):
     """Modelo para representar cada oficina cliente do sistema (multi-tenant)"""
@@ -44,6 +65,13 @@ class Oficina(models.Model):
     def __str__(self):
         return self.nome
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Proprietário anterior, cujo request.oficina em cache também muda com uma troca de dono
+        instance._proprietario_carregado = instance.__dict__.get('proprietario_id')
+        return instance
+
 
 class Cliente(models.Model):
     oficina = models.ForeignKey(Oficina, on_delete=models.CASCADE, related_name='clientes', verbose_name='Oficina', null=True, blank=True)
@@ -67,12 +95,45 @@ class Cliente(models.Model):
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
         ordering = ['-data_cadastro']
+        indexes = [
+            models.Index(fields=['oficina', '-data_cadastro', 'id'], name='cliente_oficina_cadastro_idx'),
+            models.Index(fields=['oficina', 'ativo', '-data_cadastro', 'id'], name='cliente_oficina_ativo_idx'),
+            models.Index(fields=['oficina', 'cpf_cnpj'], name='cliente_oficina_cpf_idx'),
+            # O SQLite não usa o índice acima para `WHERE ativo` (sem "= 1"), só o parcial
+            models.Index(
+                fields=['oficina', '-data_cadastro', 'id'],
+                name='cliente_ativos_idx',
+                condition=models.Q(ativo=True),
+            ),
+        ]
 
     def __str__(self):
         return self.nome
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._oficina_carregada = instance.__dict__.get('oficina_id')
+        return instance
+
+    def clean(self):
+        super().clean()
+        if _oficina_alterada(self):
+            raise ValidationError({'oficina': OFICINA_FIXA})
+
+    def save(self, *args, **kwargs):
+        if _oficina_alterada(self):
+            raise ValueError(OFICINA_FIXA)
+        super().save(*args, **kwargs)
+        self._oficina_carregada = self.oficina_id
+
 
 class Veiculo(models.Model):
+    # Cópia de cliente.oficina, preenchida no save, para filtrar por oficina sem join
+    oficina = models.ForeignKey(
+        Oficina, on_delete=models.CASCADE, related_name='veiculos', verbose_name='Oficina',
+        null=True, blank=True, editable=False
+    )
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='veiculos')
     marca = models.CharField(max_length=50, verbose_name='Marca')
     modelo = models.CharField(max_length=100, verbose_name='Modelo')
@@ -84,6 +145,8 @@ class Veiculo(models.Model):
     )
     cor = models.CharField(max_length=30, blank=True, null=True, verbose_name='Cor')
     km_atual = models.IntegerField(blank=True, null=True, verbose_name='KM Atual')
+    # Base dos validadores de GET condicional das APIs de veículo
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Veículo'
@@ -93,6 +156,11 @@ class Veiculo(models.Model):
     def __str__(self):
         return f"{self.marca} {self.modelo} {self.ano} - {self.placa}"
 
+    def save(self, *args, **kwargs):
+        if self.cliente_id:
+            self.oficina_id = self.cliente.oficina_id
+        super().save(*args, **kwargs)
+
 
 class Servico(models.Model):
     nome = models.CharField(max_length=200, verbose_name='Nome do Serviço')
@@ -115,6 +183,76 @@ class Servico(models.Model):
         return self.nome
 
 
+class SequenciaOS(models.Model):
+    """Próximo número de OS de cada oficina, incrementado atomicamente no banco"""
+    oficina = models.OneToOneField(
+        Oficina,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='sequencia_os',
+        verbose_name='Oficina'
+    )
+    proximo_numero = models.PositiveIntegerField(default=1001, verbose_name='Próximo Número')
+
+    class Meta:
+        verbose_name = 'Sequência de OS'
+        verbose_name_plural = 'Sequências de OS'
+        constraints = [
+            # O OneToOne não impede duas linhas com oficina NULL (ordens sem
+            # oficina); este índice parcial, em que "oficina IS NULL" é sempre
+            # verdadeiro, aceita uma só
+            models.UniqueConstraint(
+                IsNull(F('oficina'), True),
+                condition=models.Q(oficina__isnull=True),
+                name='sequencia_os_unica_sem_oficina',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.oficina or 'Sem oficina'} - próxima OS {self.proximo_numero}"
+
+    @classmethod
+    def reservar(cls, oficina_id, quantidade=1):
+        """
+        Reserva `quantidade` números consecutivos de OS para a oficina e
+        retorna um range com eles.
+
+        O UPDATE com F() trava a linha da sequência até o fim da transação,
+        então escritores concorrentes nunca recebem o mesmo número. Números
+        reservados e não usados (ex.: falha ao salvar a OS) viram lacunas.
+        """
+        sequencia = cls.objects.filter(oficina_id=oficina_id)
+        with transaction.atomic():
+            if not sequencia.update(proximo_numero=F('proximo_numero') + quantidade):
+                cls._criar(oficina_id)
+                sequencia.update(proximo_numero=F('proximo_numero') + quantidade)
+            proximo = sequencia.values_list('proximo_numero', flat=True).get()
+        return range(proximo - quantidade, proximo)
+
+    @classmethod
+    def _criar(cls, oficina_id):
+        """Cria a sequência continuando a partir do maior número de OS já usado pela oficina"""
+        maior = OrdemServico.objects.filter(oficina_id=oficina_id).aggregate(
+            maior=Max(Cast('numero_os', models.IntegerField()))
+        )['maior']
+        try:
+            with transaction.atomic():
+                cls.objects.create(oficina_id=oficina_id, proximo_numero=max((maior or 0) + 1, 1001))
+        except IntegrityError:
+            # Outra transação criou a sequência ao mesmo tempo
+            pass
+
+
+# Status em que a ordem ainda está aberta na oficina
+STATUS_OS_ABERTOS = ['aguardando_aprovacao', 'em_andamento', 'aguardando_pecas']
+
+
+def expressao_valor_final(valor_total, desconto):
+    """Expressão de valor_total - desconto, sem ficar negativa quando o desconto passa do total"""
+    return Greatest(valor_total - desconto, Value(Decimal('0')))
+
+
 class OrdemServico(models.Model):
     STATUS_CHOICES = [
         ('aguardando_aprovacao', 'Aguardando Aprovação'),
@@ -124,13 +262,16 @@ class OrdemServico(models.Model):
         ('entregue', 'Entregue'),
         ('cancelada', 'Cancelada'),
     ]
+    STATUS_ABERTOS = STATUS_OS_ABERTOS
+    # Ordens que não recebem mais peças do estoque
+    STATUS_ENCERRADOS = ['entregue', 'cancelada']
 
     oficina = models.ForeignKey(Oficina, on_delete=models.CASCADE, related_name='ordens', verbose_name='Oficina', null=True, blank=True)
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name='ordens')
     veiculo = models.ForeignKey(Veiculo, on_delete=models.PROTECT, related_name='ordens')
     servicos = models.ManyToManyField(Servico, through='ItemServico')
     
-    numero_os = models.CharField(max_length=20, unique=True, editable=False, verbose_name='Nº OS')
+    numero_os = models.CharField(max_length=20, editable=False, verbose_name='Nº OS')
     data_entrada = models.DateField(default=timezone.now, verbose_name='Data de Entrada')
     data_previsao = models.DateField(verbose_name='Previsão de Entrega')
     data_conclusao = models.DateField(blank=True, null=True, verbose_name='Data de Conclusão')
@@ -145,7 +286,9 @@ class OrdemServico(models.Model):
     descricao_problema = models.TextField(verbose_name='Descrição do Problema')
     observacoes = models.TextField(blank=True, null=True, verbose_name='Observações')
     
-    valor_total = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Valor Total')
+    valor_total = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False, verbose_name='Valor Total'
+    )
     desconto = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Desconto')
     valor_final = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Valor Final')
     
@@ -156,27 +299,91 @@ class OrdemServico(models.Model):
         verbose_name = 'Ordem de Serviço'
         verbose_name_plural = 'Ordens de Serviço'
         ordering = ['-data_entrada', '-numero_os']
+        constraints = [
+            models.UniqueConstraint(fields=['oficina', 'numero_os'], name='os_numero_unico_por_oficina'),
+            # NULL não repete no índice acima: ordens sem oficina têm o seu
+            models.UniqueConstraint(
+                fields=['numero_os'], condition=models.Q(oficina__isnull=True), name='os_numero_unico_sem_oficina'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['oficina', 'status'], name='os_oficina_status_idx'),
+            models.Index(fields=['oficina', 'data_previsao'], name='os_oficina_previsao_idx'),
+            models.Index(fields=['oficina', 'data_entrada', 'numero_os'], name='os_oficina_entrada_idx'),
+            # Ordens abertas (usadas em ordens_abertas/ordens_atrasadas do dashboard)
+            models.Index(
+                fields=['oficina', 'data_previsao'],
+                name='os_abertas_idx',
+                condition=models.Q(status__in=STATUS_OS_ABERTOS),
+            ),
+        ]
 
     def __str__(self):
         return f"OS #{self.numero_os} - {self.cliente.nome}"
 
+    @staticmethod
+    def formatar_numero(numero):
+        """Formata um número reservado em SequenciaOS como numero_os"""
+        return str(numero).zfill(4)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._oficina_carregada = instance.__dict__.get('oficina_id')
+        # Meses em que a ordem aparecia nos relatórios antes de ser alterada
+        instance._datas_carregadas = (instance.__dict__.get('data_entrada'), instance.__dict__.get('data_conclusao'))
+        return instance
+
+    def clean(self):
+        super().clean()
+        if _oficina_alterada(self):
+            raise ValidationError({'oficina': OFICINA_FIXA})
+
     def save(self, *args, **kwargs):
+        if _oficina_alterada(self):
+            raise ValueError(OFICINA_FIXA)
         if not self.numero_os:
-            # Gerar número da OS
-            last_os = OrdemServico.objects.all().order_by('-id').first()
-            if last_os and last_os.numero_os:
-                last_number = int(last_os.numero_os)
-                self.numero_os = str(last_number + 1).zfill(4)
-            else:
-                self.numero_os = '1001'
+            # Gerar número da OS a partir da sequência da oficina
+            self.numero_os = self.formatar_numero(SequenciaOS.reservar(self.oficina_id)[0])
         
-        # Calcular valor final
-        self.valor_final = self.valor_total - self.desconto
-        
-        super().save(*args, **kwargs)
+        campos = kwargs.get('update_fields')
+        if self._state.adding:
+            # Uma ordem nova ainda não tem itens (ver totais.py)
+            if self.valor_total:
+                raise ValueError(TOTAL_DOS_ITENS)
+        elif campos is None:
+            # valor_total é mantido pelos itens (ver totais.py) e pode ter mudado
+            # no banco depois que esta instância foi lida: não é regravado
+            adiados = self.get_deferred_fields()
+            campos = kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'valor_total' and campo.attname not in adiados
+            ]
+
+        if campos is None or 'valor_total' in campos:
+            # Calcular valor final
+            self.valor_final = max(self.valor_total - self.desconto, Decimal('0'))
+            super().save(*args, **kwargs)
+        elif 'valor_final' in campos:
+            # Calculado no próprio UPDATE, a partir do valor_total do banco
+            self.valor_final = expressao_valor_final(F('valor_total'), self.desconto)
+            super().save(*args, **kwargs)
+            self.refresh_from_db(fields=['valor_total', 'valor_final'])
+        else:
+            super().save(*args, **kwargs)
+        self._oficina_carregada = self.oficina_id
+
+
+# Filtros por STATUS_OS_ABERTOS casam com os índices parciais de status aberto
+OrdemServico._meta.get_field('status').register_lookup(InLiteral)
 
 
 class ItemServico(models.Model):
+    # Cópia de ordem.oficina, preenchida no save
+    oficina = models.ForeignKey(
+        Oficina, on_delete=models.CASCADE, related_name='itens_servico', verbose_name='Oficina',
+        null=True, blank=True, editable=False
+    )
     ordem = models.ForeignKey(OrdemServico, on_delete=models.CASCADE, related_name='itens')
     servico = models.ForeignKey(Servico, on_delete=models.PROTECT)
     quantidade = models.IntegerField(default=1, verbose_name='Quantidade')
@@ -191,7 +398,21 @@ class ItemServico(models.Model):
     def __str__(self):
         return f"{self.servico.nome} - OS #{self.ordem.numero_os}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda a ordem e o total lidos do banco para atualizar o total da ordem
+        if 'ordem_id' in instance.__dict__ and 'valor_total' in instance.__dict__:
+            instance._total_carregado = instance.estado_total()
+        return instance
+
+    def estado_total(self):
+        """(ordem, valor_total) que este item soma no total da ordem"""
+        return self.ordem_id, self._meta.get_field('valor_total').to_python(self.valor_total)
+
     def save(self, *args, **kwargs):
+        if self.ordem_id:
+            self.oficina_id = self.ordem.oficina_id
         self.valor_total = self.quantidade * self.valor_unitario
         super().save(*args, **kwargs)
 
@@ -212,6 +433,11 @@ class Pagamento(models.Model):
         ('cancelado', 'Cancelado'),
     ]
 
+    # Cópia de ordem.oficina, preenchida no save
+    oficina = models.ForeignKey(
+        Oficina, on_delete=models.CASCADE, related_name='pagamentos', verbose_name='Oficina',
+        null=True, blank=True, editable=False
+    )
     ordem = models.ForeignKey(OrdemServico, on_delete=models.CASCADE, related_name='pagamentos')
     data_pagamento = models.DateField(default=timezone.now, verbose_name='Data de Pagamento')
     valor = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Valor')
@@ -224,6 +450,248 @@ class Pagamento(models.Model):
         verbose_name = 'Pagamento'
         verbose_name_plural = 'Pagamentos'
         ordering = ['-data_pagamento']
+        indexes = [
+            models.Index(fields=['oficina', 'status', 'data_pagamento'], name='pagamento_oficina_status_idx'),
+            models.Index(fields=['oficina', '-data_pagamento', 'id'], name='pagamento_oficina_data_idx'),
+        ]
 
     def __str__(self):
         return f"Pagamento OS #{self.ordem.numero_os} - R$ {self.valor}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda o estado lido do banco para atualizar o FaturamentoDiario
+        instance._estado_faturamento = instance.estado_faturamento()
+        return instance
+
+    def estado_faturamento(self):
+        """Campos que determinam a linha de FaturamentoDiario deste pagamento"""
+        campos = ('oficina', 'data_pagamento', 'metodo', 'status', 'valor')
+        if any(self._meta.get_field(campo).attname not in self.__dict__ for campo in campos):
+            return None
+        return tuple(
+            self._meta.get_field(campo).to_python(getattr(self, self._meta.get_field(campo).attname))
+            for campo in campos
+        )
+
+    def save(self, *args, **kwargs):
+        if self.ordem_id:
+            self.oficina_id = self.ordem.oficina_id
+        # O FaturamentoDiario é atualizado pelo post_save na mesma transação
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class FaturamentoDiario(models.Model):
+    """Totais de pagamentos por oficina, dia, método e status, mantidos a cada alteração de Pagamento"""
+    oficina = models.ForeignKey(Oficina, on_delete=models.CASCADE, related_name='faturamento_diario', verbose_name='Oficina')
+    dia = models.DateField(verbose_name='Dia')
+    metodo = models.CharField(max_length=20, choices=Pagamento.METODO_CHOICES, verbose_name='Método de Pagamento')
+    status = models.CharField(max_length=20, choices=Pagamento.STATUS_CHOICES, verbose_name='Status')
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Total')
+    quantidade = models.IntegerField(default=0, verbose_name='Quantidade')
+
+    class Meta:
+        verbose_name = 'Faturamento Diário'
+        verbose_name_plural = 'Faturamento Diário'
+        ordering = ['-dia']
+        constraints = [
+            models.UniqueConstraint(fields=['oficina', 'dia', 'metodo', 'status'], name='faturamento_diario_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.oficina} - {self.dia} - {self.get_metodo_display()} ({self.get_status_display()})"
+
+
+class IndiceBusca(models.Model):
+    """Texto normalizado de clientes, veículos e ordens para a busca textual (ver busca.py)"""
+    TIPO_CHOICES = [
+        ('cliente', 'Cliente'),
+        ('veiculo', 'Veículo'),
+        ('ordem', 'Ordem de Serviço'),
+    ]
+
+    oficina = models.ForeignKey(Oficina, on_delete=models.CASCADE, related_name='indice_busca', verbose_name='Oficina')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, verbose_name='Tipo')
+    objeto_id = models.BigIntegerField(verbose_name='ID do Objeto')
+    conteudo = models.TextField(verbose_name='Conteúdo')
+
+    class Meta:
+        verbose_name = 'Índice de Busca'
+        verbose_name_plural = 'Índice de Busca'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='indice_busca_objeto_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['oficina', 'tipo'], name='indice_busca_oficina_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.objeto_id}"
+
+
+class Peca(models.Model):
+    """Peça do catálogo de estoque da oficina. O saldo vem do razão de movimentos (ver estoque.py)"""
+    oficina = models.ForeignKey(Oficina, on_delete=models.CASCADE, related_name='pecas', verbose_name='Oficina')
+    codigo = models.CharField(max_length=50, verbose_name='Código')
+    nome = models.CharField(max_length=200, verbose_name='Nome')
+    unidade = models.CharField(max_length=10, default='un', verbose_name='Unidade')
+    custo_unitario = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Custo Unitário')
+    preco_venda = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Preço de Venda')
+    estoque_minimo = models.DecimalField(max_digits=12, decimal_places=3, default=0, verbose_name='Estoque Mínimo')
+    ativo = models.BooleanField(default=True, verbose_name='Ativo')
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Peça'
+        verbose_name_plural = 'Peças'
+        ordering = ['nome']
+        constraints = [
+            models.UniqueConstraint(fields=['oficina', 'codigo'], name='peca_codigo_unico_por_oficina'),
+        ]
+        indexes = [
+            models.Index(fields=['oficina', 'nome', 'id'], name='peca_oficina_nome_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.codigo} - {self.nome}"
+
+
+class MovimentoEstoque(models.Model):
+    """
+    Lançamento do razão de estoque. Os lançamentos nunca são alterados nem
+    excluídos: correções são feitas com um novo movimento de ajuste.
+    """
+    TIPO_CHOICES = [
+        ('entrada', 'Entrada'),
+        ('saida', 'Saída'),
+        ('ajuste', 'Ajuste'),
+    ]
+
+    oficina = models.ForeignKey(Oficina, on_delete=models.CASCADE, related_name='movimentos_estoque', verbose_name='Oficina')
+    peca = models.ForeignKey(Peca, on_delete=models.PROTECT, related_name='movimentos', verbose_name='Peça')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, verbose_name='Tipo')
+    # Positiva para entradas, negativa para saídas; ajustes podem ter qualquer sinal
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3, verbose_name='Quantidade')
+    custo_unitario = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Custo Unitário')
+    ordem = models.ForeignKey(
+        OrdemServico, on_delete=models.PROTECT, related_name='movimentos_estoque',
+        null=True, blank=True, verbose_name='Ordem de Serviço'
+    )
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Usuário')
+    observacao = models.CharField(max_length=300, blank=True, null=True, verbose_name='Observação')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Data')
+
+    class Meta:
+        verbose_name = 'Movimento de Estoque'
+        verbose_name_plural = 'Movimentos de Estoque'
+        ordering = ['-id']
+        indexes = [
+            # Movimentos de uma peça posteriores ao último saldo consolidado
+            models.Index(fields=['peca', 'id'], name='movimento_peca_idx'),
+            models.Index(fields=['oficina', '-id'], name='movimento_oficina_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.quantidade} - {self.peca}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Movimentos de estoque não podem ser alterados; registre um ajuste.')
+        if self.peca_id:
+            self.oficina_id = self.peca.oficina_id
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Movimentos de estoque não podem ser excluídos; registre um ajuste.')
+
+
+class SaldoEstoque(models.Model):
+    """Saldo consolidado de uma peça até o movimento `ultimo_movimento_id` (inclusive)"""
+    oficina = models.ForeignKey(Oficina, on_delete=models.CASCADE, related_name='saldos_estoque', verbose_name='Oficina')
+    peca = models.ForeignKey(Peca, on_delete=models.CASCADE, related_name='saldos', verbose_name='Peça')
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3, verbose_name='Quantidade')
+    ultimo_movimento_id = models.BigIntegerField(verbose_name='Último Movimento')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Consolidado em')
+
+    class Meta:
+        verbose_name = 'Saldo de Estoque'
+        verbose_name_plural = 'Saldos de Estoque'
+        constraints = [
+            # Também serve de índice para achar o saldo mais recente da peça
+            models.UniqueConstraint(fields=['peca', 'ultimo_movimento_id'], name='saldo_peca_movimento_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.peca} - {self.quantidade} (até #{self.ultimo_movimento_id})"
+
+
+class ExclusaoOficina(models.Model):
+    """
+    Exclusão de uma oficina em segundo plano (ver exclusao.py): os dados são
+    apagados em lotes, tabela por tabela, e o progresso fica gravado para
+    retomar a exclusão depois de uma queda ou reinício.
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('em_andamento', 'Em Andamento'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+    STATUS_ATIVOS = ['pendente', 'em_andamento']
+
+    # SET_NULL: o registro da exclusão sobrevive à oficina excluída
+    oficina = models.ForeignKey(
+        Oficina, on_delete=models.SET_NULL, null=True, blank=True, related_name='exclusoes', verbose_name='Oficina'
+    )
+    oficina_nome = models.CharField(max_length=200, verbose_name='Nome da Oficina')
+    # Excluído no fim se não for superusuário nem proprietário de outra oficina
+    proprietario = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Proprietário'
+    )
+    solicitado_por = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Solicitado por'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente', verbose_name='Status')
+    etapa = models.CharField(max_length=50, blank=True, verbose_name='Etapa')
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name='Registros a Excluir')
+    removidos = models.PositiveIntegerField(default=0, verbose_name='Registros Excluídos')
+    erro = models.TextField(blank=True, verbose_name='Erro')
+    # Concessão do processo que está excluindo; vencida, outro processo retoma
+    executor = models.CharField(max_length=100, blank=True, verbose_name='Executor')
+    concessao_ate = models.DateTimeField(null=True, blank=True, verbose_name='Concessão Até')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Solicitada em')
+    atualizado_em = models.DateTimeField(auto_now=True)
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name='Concluída em')
+
+    class Meta:
+        verbose_name = 'Exclusão de Oficina'
+        verbose_name_plural = 'Exclusões de Oficina'
+        ordering = ['-criado_em']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['oficina'], name='exclusao_ativa_por_oficina',
+                condition=models.Q(status__in=['pendente', 'em_andamento']),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Exclusão de {self.oficina_nome} ({self.get_status_display()})"
+
+    @property
+    def ativa(self):
+        return self.status in self.STATUS_ATIVOS
+
+    @property
+    def pode_retomar(self):
+        """Ativa e sem executor com concessão válida (parada ou ainda na fila)"""
+        return self.ativa and (self.concessao_ate is None or self.concessao_ate < timezone.now())
+
+    @property
+    def percentual(self):
+        if self.status == 'concluida':
+            return 100
+        if not self.total:
+            return 0
+        return min(99, self.removidos * 100 // self.total)
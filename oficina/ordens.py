@@ -0,0 +1,115 @@
+"""
+Alteração de status de várias ordens de serviço de uma vez.
+
+alterar_status_em_lote aplica as mesmas regras de alterar_status_ordem
+(data de conclusão e pagamento pendente ao concluir), mas com um número
+fixo de consultas: uma leitura das ordens, um UPDATE por status de
+destino, um bulk_create dos pagamentos e uma atualização do faturamento
+diário por grupo (oficina, dia, método, status).
+
+Como UPDATE e bulk_create não disparam os sinais de post_save, o
+faturamento diário e a invalidação do dashboard e dos relatórios são feitos
+aqui explicitamente. O índice de busca não muda: o status não faz parte do
+conteúdo indexado das ordens.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .estatisticas import invalidar_dashboard
+from .models import OrdemServico, Pagamento
+from .receita import registrar_pagamentos_novos
+from .relatorios import invalidar_relatorios
+
+
+# Limite de ordens por requisição (mantém o IN (...) dentro do limite de parâmetros do SQLite)
+MAXIMO_LOTE = 500
+STATUS_VALIDOS = [status for status, _ in OrdemServico.STATUS_CHOICES]
+
+
+def ler_alteracoes(dados):
+    """
+    Lê os campos repetidos `ordem` e `status` de um QueryDict (um status por
+    ordem, ou um único status para todas). Retorna (alterações, erro).
+    """
+    ids = dados.getlist('ordem')
+    status = dados.getlist('status')
+    if len(status) == 1:
+        status = status * len(ids)
+    if not ids or len(status) != len(ids):
+        return None, 'Informe as ordens e o status de cada uma'
+    if len(ids) > MAXIMO_LOTE:
+        return None, f'Máximo de {MAXIMO_LOTE} ordens por vez'
+    try:
+        return [(int(pk), novo_status) for pk, novo_status in zip(ids, status)], None
+    except ValueError:
+        return None, 'Ordem inválida'
+
+
+def alterar_status_em_lote(oficina, alteracoes):
+    """
+    Aplica `alteracoes` ([(id da ordem, novo status), ...]) às ordens da
+    oficina numa única transação. Retorna {id: resultado}, em que resultado
+    é {'success': True, 'alterada': bool, 'pagamento': id ou None} ou
+    {'success': False, 'error': mensagem}.
+    """
+    resultados = {}
+    pedidos = {}
+    for pk, status in alteracoes:
+        if status not in STATUS_VALIDOS:
+            resultados[pk] = {'success': False, 'error': 'Status inválido'}
+        else:
+            # Se a mesma ordem vier repetida, vale a última alteração
+            pedidos[pk] = status
+            resultados.pop(pk, None)
+
+    hoje = timezone.localdate()
+    datas = {hoje}
+    with transaction.atomic():
+        ordens = OrdemServico.objects.filter(oficina=oficina, pk__in=list(pedidos)).annotate(
+            tem_pagamento=Exists(Pagamento.objects.filter(ordem=OuterRef('pk')))
+        ).values_list('pk', 'status', 'valor_final', 'data_entrada', 'data_conclusao', 'tem_pagamento')
+
+        por_status = {}
+        novos_pagamentos = []
+        for pk, atual, valor_final, data_entrada, data_conclusao, tem_pagamento in ordens:
+            novo = pedidos[pk]
+            resultados[pk] = {'success': True, 'alterada': novo != atual, 'pagamento': None}
+            if novo == atual:
+                continue
+            por_status.setdefault(novo, []).append(pk)
+            datas.update((data_entrada, data_conclusao))
+
+            # Ao concluir: data de conclusão (no UPDATE abaixo) e pagamento pendente se não houver
+            if novo == 'concluida' and not tem_pagamento and valor_final > 0:
+                novos_pagamentos.append(Pagamento(
+                    oficina=oficina,
+                    ordem_id=pk,
+                    valor=valor_final,
+                    metodo='dinheiro',  # Método padrão, pode ser alterado depois
+                    status='pendente',
+                    data_pagamento=hoje,
+                ))
+
+        agora = timezone.now()
+        for status, pks in por_status.items():
+            campos = {'status': status, 'atualizado_em': agora}
+            if status == 'concluida':
+                campos['data_conclusao'] = hoje
+            OrdemServico.objects.filter(pk__in=pks).update(**campos)
+
+        if novos_pagamentos:
+            Pagamento.objects.bulk_create(novos_pagamentos)
+            registrar_pagamentos_novos(novos_pagamentos)
+            for pagamento in novos_pagamentos:
+                resultados[pagamento.ordem_id]['pagamento'] = pagamento.pk
+
+        if por_status:
+            transaction.on_commit(partial(invalidar_dashboard, oficina.pk))
+            transaction.on_commit(partial(invalidar_relatorios, oficina.pk, datas))
+
+    for pk in pedidos:
+        resultados.setdefault(pk, {'success': False, 'error': 'Ordem não encontrada'})
+    return resultados
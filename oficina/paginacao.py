@@ -0,0 +1,145 @@
+"""
+Paginação por cursor (keyset) para as listagens da oficina.
+
+Cada página é buscada a partir dos valores da chave de ordenação do último
+registro exibido, em vez de OFFSET/LIMIT. Assim o custo de uma página profunda
+é o mesmo da primeira e não é necessário nenhum COUNT(*) sobre a listagem.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+POR_PAGINA = 25
+
+# Direção de navegação gravada no cursor
+PROXIMA = 'p'
+ANTERIOR = 'a'
+
+
+class PaginaCursor:
+    """Página de resultados com links para a página anterior/próxima"""
+
+    def __init__(self, itens, url_anterior=None, url_proxima=None):
+        self.itens = itens
+        self.url_anterior = url_anterior
+        self.url_proxima = url_proxima
+
+    @property
+    def tem_anterior(self):
+        return self.url_anterior is not None
+
+    @property
+    def tem_proxima(self):
+        return self.url_proxima is not None
+
+    @property
+    def tem_outras_paginas(self):
+        return self.tem_anterior or self.tem_proxima
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def _serializar(valor):
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def codificar_cursor(valores, direcao=PROXIMA):
+    """Codifica os valores da chave de ordenação em um token seguro para URL"""
+    dados = json.dumps({'d': direcao, 'v': [_serializar(v) for v in valores]})
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, model, campos):
+    """Retorna (direcao, valores) do cursor ou None se ele for inválido"""
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        direcao, valores = dados['d'], dados['v']
+        if direcao not in (PROXIMA, ANTERIOR) or len(valores) != len(campos):
+            return None
+        valores = [
+            model._meta.get_field(nome).to_python(valor)
+            for (nome, _), valor in zip(campos, valores)
+        ]
+    except (ValueError, KeyError, TypeError, binascii.Error, ValidationError):
+        return None
+    return direcao, valores
+
+
+def _campos_ordenacao(ordenacao):
+    """Converte ['-data', 'id'] em [('data', True), ('id', False)]"""
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in ordenacao]
+
+
+def _filtro_apos(campos, valores, voltando):
+    """
+    Monta a condição que seleciona as linhas posteriores a `valores` na
+    ordenação, expandida como (a < x) OR (a = x AND b > y) OR ...
+    """
+    condicao = Q()
+    for i, (nome, decrescente) in enumerate(campos):
+        lookup = 'lt' if decrescente != voltando else 'gt'
+        termo = Q(**{f'{nome}__{lookup}': valores[i]})
+        for j in range(i):
+            termo &= Q(**{campos[j][0]: valores[j]})
+        condicao |= termo
+    return condicao
+
+
+def _url_com_cursor(request, cursor):
+    parametros = request.GET.copy()
+    parametros['cursor'] = cursor
+    return '?' + parametros.urlencode()
+
+
+def paginar_por_cursor(request, queryset, ordenacao, por_pagina=POR_PAGINA):
+    """
+    Pagina o queryset pela chave `ordenacao` usando o parâmetro GET `cursor`.
+
+    A chave deve ser única (termine em um campo único como `id`) e não conter
+    campos nulos. Cursores inválidos voltam para a primeira página.
+    """
+    campos = _campos_ordenacao(ordenacao)
+    cursor = request.GET.get('cursor')
+    decodificado = decodificar_cursor(cursor, queryset.model, campos) if cursor else None
+    direcao, valores = decodificado or (PROXIMA, None)
+    voltando = direcao == ANTERIOR
+
+    if valores is not None:
+        queryset = queryset.filter(_filtro_apos(campos, valores, voltando))
+
+    ordem = [
+        f'-{nome}' if decrescente != voltando else nome
+        for nome, decrescente in campos
+    ]
+    # Busca um registro a mais apenas para saber se existe outra página
+    itens = list(queryset.order_by(*ordem)[:por_pagina + 1])
+    tem_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+
+    if voltando:
+        itens.reverse()
+        tem_anterior, tem_proxima = tem_mais, True
+    else:
+        tem_anterior, tem_proxima = valores is not None, tem_mais
+
+    def chave(obj):
+        return [getattr(obj, nome) for nome, _ in campos]
+
+    url_anterior = url_proxima = None
+    if itens and tem_anterior:
+        url_anterior = _url_com_cursor(request, codificar_cursor(chave(itens[0]), ANTERIOR))
+    if itens and tem_proxima:
+        url_proxima = _url_com_cursor(request, codificar_cursor(chave(itens[-1]), PROXIMA))
+
+    return PaginaCursor(itens, url_anterior, url_proxima)
@@ -0,0 +1,135 @@
+"""
+Faturamento consolidado por dia (FaturamentoDiario).
+
+Cada alteração de Pagamento aplica a diferença nas linhas de
+(oficina, dia, método, status) correspondentes, dentro da mesma transação.
+Assim as telas de receita somam poucas linhas por dia do período em vez de
+todo o histórico de pagamentos.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import FaturamentoDiario, Pagamento
+
+
+def _aplicar(oficina_id, dia, metodo, status, total, quantidade, criar=True):
+    """Soma total/quantidade (com sinal) à linha de (oficina, dia, método, status)"""
+    linhas = FaturamentoDiario.objects.filter(oficina_id=oficina_id, dia=dia, metodo=metodo, status=status)
+    delta = {'total': F('total') + total, 'quantidade': F('quantidade') + quantidade}
+    if linhas.update(**delta) or not criar:
+        return
+    try:
+        with transaction.atomic():
+            FaturamentoDiario.objects.create(
+                oficina_id=oficina_id, dia=dia, metodo=metodo, status=status,
+                total=total, quantidade=quantidade
+            )
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT
+        linhas.update(**delta)
+
+
+def _somar(estado, sinal, criar=True):
+    """Soma (sinal=1) ou subtrai (sinal=-1) um pagamento da linha do seu dia"""
+    oficina_id, dia, metodo, status, valor = estado
+    if oficina_id is None:
+        return
+    _aplicar(oficina_id, dia, metodo, status, sinal * valor, sinal, criar=criar)
+
+
+def registrar_pagamento(pagamento):
+    """Aplica a diferença entre o estado anterior e o atual de um pagamento salvo"""
+    anterior = getattr(pagamento, '_estado_faturamento', None)
+    atual = pagamento.estado_faturamento()
+    if anterior == atual:
+        return
+    if anterior is not None:
+        _somar(anterior, -1, criar=False)
+    if atual is not None:
+        _somar(atual, 1)
+    pagamento._estado_faturamento = atual
+
+
+def registrar_pagamentos_novos(pagamentos):
+    """
+    Soma ao faturamento diário pagamentos criados com bulk_create (que não
+    disparam post_save), com uma atualização por (oficina, dia, método, status).
+    """
+    grupos = {}
+    for pagamento in pagamentos:
+        estado = pagamento.estado_faturamento()
+        if estado is not None and estado[0] is not None:
+            chave = estado[:4]
+            total, quantidade = grupos.get(chave, (0, 0))
+            grupos[chave] = (total + estado[4], quantidade + 1)
+        pagamento._estado_faturamento = estado
+
+    for (oficina_id, dia, metodo, status), (total, quantidade) in grupos.items():
+        _aplicar(oficina_id, dia, metodo, status, total, quantidade)
+
+
+def remover_pagamento(pagamento):
+    """Retira um pagamento excluído do faturamento do seu dia"""
+    estado = getattr(pagamento, '_estado_faturamento', None) or pagamento.estado_faturamento()
+    if estado is not None:
+        # Não cria linhas: na exclusão da oficina elas podem já ter sido removidas
+        _somar(estado, -1, criar=False)
+
+
+def _filtrar(oficina=None, inicio=None, fim=None):
+    linhas = FaturamentoDiario.objects.all()
+    if oficina is not None:
+        linhas = linhas.filter(oficina=oficina)
+    if inicio:
+        linhas = linhas.filter(dia__gte=inicio)
+    if fim:
+        linhas = linhas.filter(dia__lte=fim)
+    return linhas
+
+
+def totais_por_status(oficina=None, inicio=None, fim=None):
+    """Total de pagamentos pagos, pendentes e cancelados no período (todas as oficinas se oficina=None)"""
+    totais = _filtrar(oficina, inicio, fim).aggregate(
+        pago=Sum('total', filter=Q(status='pago')),
+        pendente=Sum('total', filter=Q(status='pendente')),
+        cancelado=Sum('total', filter=Q(status='cancelado')),
+    )
+    return {status: total or 0 for status, total in totais.items()}
+
+
+def faturamento_por_mes(oficina, inicio, fim, status='pago'):
+    """Dicionário {primeiro dia do mês: total} dos pagamentos no período"""
+    return dict(
+        _filtrar(oficina, inicio, fim).filter(status=status).order_by().values(
+            mes=TruncMonth('dia')
+        ).annotate(soma=Sum('total')).values_list('mes', 'soma')
+    )
+
+
+def reconstruir_faturamento_diario(oficina=None):
+    """Recalcula o FaturamentoDiario a partir dos pagamentos. Retorna o número de linhas criadas."""
+    pagamentos = Pagamento.objects.filter(oficina__isnull=False)
+    existentes = FaturamentoDiario.objects.all()
+    if oficina is not None:
+        pagamentos = pagamentos.filter(oficina=oficina)
+        existentes = existentes.filter(oficina=oficina)
+
+    linhas = pagamentos.order_by().values(
+        'oficina', 'data_pagamento', 'metodo', 'status'
+    ).annotate(soma=Sum('valor'), quantidade=Count('id'))
+
+    with transaction.atomic():
+        existentes.delete()
+        criadas = FaturamentoDiario.objects.bulk_create(
+            (
+                FaturamentoDiario(
+                    oficina_id=linha['oficina'], dia=linha['data_pagamento'],
+                    metodo=linha['metodo'], status=linha['status'],
+                    total=linha['soma'], quantidade=linha['quantidade']
+                )
+                for linha in linhas.iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(criadas)
@@ -0,0 +1,279 @@
+"""
+Relatórios da oficina.
+
+Cada relatório por período é calculado por mês do calendário: o intervalo
+pedido é dividido em segmentos mensais e cada segmento fica em cache por
+(oficina, relatório, segmento). Os segmentos que faltam são calculados
+juntos, em uma consulta agrupada por mês e filtrada por um intervalo para
+cada sequência de meses contíguos, e os resultados são somados. O período
+pedido é limitado a ANOS_MAXIMOS anos (ver limitar_periodo).
+
+Cada mês da oficina tem uma versão no cache, trocada pelos sinais quando um
+pagamento, ordem ou item daquele mês muda (ver signals.py). Meses já
+encerrados ficam em cache por muito tempo e só são recalculados se forem
+alterados; na prática só o mês corrente é recalculado.
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .catalogo import nomes as nomes_servicos
+from .estatisticas import meses_calendario, proximo_mes, versao_dashboard
+from .models import FaturamentoDiario, ItemServico, OrdemServico, Pagamento, STATUS_OS_ABERTOS
+from .replica import leitura_no_primario
+
+
+CACHE_TIMEOUT_ABERTO = 300
+CACHE_TIMEOUT_FECHADO = 60 * 60 * 24 * 30
+MAIS_VENDIDOS = 10
+# Período máximo de um relatório: cada mês é um segmento com duas chaves de cache
+ANOS_MAXIMOS = 5
+# Faixas de dias de atraso (limite superior inclusivo; None = sem limite)
+FAIXAS_ATRASO = [(1, 7), (8, 15), (16, 30), (31, None)]
+
+
+def _inicio_mes(dia):
+    return dia.replace(day=1)
+
+
+def _chave_versao(oficina_id, mes):
+    return f'relatorios:{oficina_id}:{mes:%Y-%m}:versao'
+
+
+def invalidar_relatorios(oficina_id, datas):
+    """Marca como desatualizados os meses das `datas` nos relatórios da oficina"""
+    meses = set()
+    for dia in datas:
+        if isinstance(dia, str):
+            dia = parse_date(dia)
+        if dia is not None:
+            meses.add(_inicio_mes(dia))
+    if oficina_id is not None and meses:
+        versao = time.time_ns()
+        cache.set_many({_chave_versao(oficina_id, mes): versao for mes in meses}, None)
+
+
+def segmentos_mensais(inicio, fim):
+    """Divide [inicio, fim] em intervalos contidos em um único mês"""
+    segmentos = []
+    while inicio <= fim:
+        fim_segmento = min(fim, proximo_mes(inicio) - timedelta(days=1))
+        segmentos.append((inicio, fim_segmento))
+        inicio = fim_segmento + timedelta(days=1)
+    return segmentos
+
+
+def _filtro_segmentos(campo, segmentos):
+    """Um __range por sequência de segmentos contíguos (em geral um só)"""
+    intervalos = []
+    for inicio, fim in sorted(segmentos):
+        if intervalos and intervalos[-1][1] + timedelta(days=1) == inicio:
+            intervalos[-1][1] = fim
+        else:
+            intervalos.append([inicio, fim])
+    condicao = Q()
+    for inicio, fim in intervalos:
+        condicao |= Q(**{f'{campo}__range': (inicio, fim)})
+    return condicao
+
+
+def _por_segmento(oficina, nome, segmentos, calcular, vazio):
+    """
+    Dados de cada segmento, do cache quando a versão do mês confere. Os que
+    faltam são calculados juntos por `calcular(oficina, segmentos)`, que
+    retorna {primeiro dia do mês: dados}.
+    """
+    hoje = timezone.localdate()
+    chaves = {segmento: f'relatorio:{oficina.pk}:{nome}:{segmento[0]}:{segmento[1]}' for segmento in segmentos}
+    chaves_versao = {segmento: _chave_versao(oficina.pk, segmento[0]) for segmento in segmentos}
+    em_cache = cache.get_many([*chaves.values(), *chaves_versao.values()])
+
+    resultado, faltando = {}, []
+    for segmento in segmentos:
+        item = em_cache.get(chaves[segmento])
+        if item is not None and item['versao'] == em_cache.get(chaves_versao[segmento]):
+            resultado[segmento] = item['dados']
+        else:
+            faltando.append(segmento)
+
+    if faltando:
+        with leitura_no_primario():
+            calculados = calcular(oficina, faltando)
+        fechados, abertos = {}, {}
+        for segmento in faltando:
+            dados = calculados.get(_inicio_mes(segmento[0]), vazio)
+            resultado[segmento] = dados
+            # Grava com a versão lida antes do cálculo (mesma regra do dashboard)
+            item = {'versao': em_cache.get(chaves_versao[segmento]), 'dados': dados}
+            destino = fechados if segmento[1] < _inicio_mes(hoje) else abertos
+            destino[chaves[segmento]] = item
+        cache.set_many(fechados, CACHE_TIMEOUT_FECHADO)
+        cache.set_many(abertos, CACHE_TIMEOUT_ABERTO)
+
+    return [(segmento, resultado[segmento]) for segmento in segmentos]
+
+
+def _agrupar(linhas, chave, valor):
+    """{mês: {chave: valor}} a partir de linhas de values() com o campo `mes`"""
+    agrupado = {}
+    for linha in linhas:
+        agrupado.setdefault(linha['mes'], {})[linha[chave]] = valor(linha)
+    return agrupado
+
+
+def _calcular_receita(oficina, segmentos):
+    linhas = FaturamentoDiario.objects.filter(
+        _filtro_segmentos('dia', segmentos), oficina=oficina, status='pago'
+    ).order_by().values('metodo', mes=TruncMonth('dia')).annotate(soma=Sum('total'))
+    return _agrupar(linhas, 'metodo', lambda linha: linha['soma'])
+
+
+def _calcular_ordens_status(oficina, segmentos):
+    linhas = OrdemServico.objects.filter(
+        _filtro_segmentos('data_entrada', segmentos), oficina=oficina
+    ).order_by().values('status', mes=TruncMonth('data_entrada')).annotate(quantidade=Count('id'))
+    return _agrupar(linhas, 'status', lambda linha: linha['quantidade'])
+
+
+def _calcular_prazo(oficina, segmentos):
+    duracao = ExpressionWrapper(F('data_conclusao') - F('data_entrada'), output_field=DurationField())
+    linhas = OrdemServico.objects.filter(
+        _filtro_segmentos('data_conclusao', segmentos), oficina=oficina
+    ).order_by().values(mes=TruncMonth('data_conclusao')).annotate(soma=Sum(duracao), quantidade=Count('id'))
+    return {
+        linha['mes']: {'dias': linha['soma'].days if linha['soma'] else 0, 'quantidade': linha['quantidade']}
+        for linha in linhas
+    }
+
+
+def _calcular_servicos(oficina, segmentos):
+    linhas = ItemServico.objects.filter(
+        _filtro_segmentos('ordem__data_entrada', segmentos), oficina=oficina
+    ).order_by().values('servico', mes=TruncMonth('ordem__data_entrada')).annotate(
+        quantidade=Sum('quantidade'), total=Sum('valor_total')
+    )
+    return _agrupar(linhas, 'servico', lambda linha: (linha['quantidade'], linha['total']))
+
+
+def receita_por_periodo(oficina, inicio, fim):
+    """Receita paga por mês e por método de pagamento"""
+    nomes = dict(Pagamento.METODO_CHOICES)
+    segmentos = _por_segmento(oficina, 'receita', segmentos_mensais(inicio, fim), _calcular_receita, {})
+    totais = {}
+    for _, por_metodo in segmentos:
+        for metodo, valor in por_metodo.items():
+            totais[metodo] = totais.get(metodo, 0) + valor
+    # Colunas: métodos com receita no período, do maior para o menor
+    metodos = sorted(totais, key=lambda metodo: -totais[metodo])
+    return {
+        'metodos': [{'nome': nomes.get(metodo, metodo), 'total': totais[metodo]} for metodo in metodos],
+        'meses': [
+            {
+                'mes': inicio_segmento,
+                'valores': [por_metodo.get(metodo, 0) for metodo in metodos],
+                'total': sum(por_metodo.values()),
+            }
+            for (inicio_segmento, _), por_metodo in segmentos
+        ],
+        'total': sum(totais.values()),
+    }
+
+
+def ordens_por_status(oficina, inicio, fim):
+    """Quantidade de ordens abertas no período por status"""
+    status = dict(OrdemServico.STATUS_CHOICES)
+    totais = {}
+    for _, por_status in _por_segmento(oficina, 'ordens_status', segmentos_mensais(inicio, fim),
+                                        _calcular_ordens_status, {}):
+        for situacao, quantidade in por_status.items():
+            totais[situacao] = totais.get(situacao, 0) + quantidade
+    return [
+        {'status': situacao, 'nome': status.get(situacao, situacao), 'quantidade': quantidade}
+        for situacao, quantidade in sorted(totais.items(), key=lambda item: -item[1])
+    ]
+
+
+def prazo_medio(oficina, inicio, fim):
+    """Dias médios entre entrada e conclusão das ordens concluídas no período"""
+    dias = quantidade = 0
+    for _, dados in _por_segmento(oficina, 'prazo', segmentos_mensais(inicio, fim), _calcular_prazo,
+                                  {'dias': 0, 'quantidade': 0}):
+        dias += dados['dias']
+        quantidade += dados['quantidade']
+    return {'dias': dias / quantidade if quantidade else None, 'ordens': quantidade}
+
+
+def servicos_mais_vendidos(oficina, inicio, fim, limite=MAIS_VENDIDOS):
+    """Serviços com maior valor em itens das ordens abertas no período"""
+    totais = {}
+    for _, por_servico in _por_segmento(oficina, 'servicos', segmentos_mensais(inicio, fim),
+                                        _calcular_servicos, {}):
+        for servico_id, (quantidade, total) in por_servico.items():
+            soma = totais.setdefault(servico_id, [0, 0])
+            soma[0] += quantidade
+            soma[1] += total
+    mais_vendidos = sorted(totais.items(), key=lambda item: -item[1][1])[:limite]
+    # Nomes lidos do catálogo: renomear um serviço não exige recalcular os meses
+    nomes = nomes_servicos(pk for pk, _ in mais_vendidos)
+    return [
+        {'servico': nomes.get(pk, f'Serviço #{pk}'), 'quantidade': quantidade, 'total': total}
+        for pk, (quantidade, total) in mais_vendidos
+    ]
+
+
+def atrasadas_por_faixa(oficina):
+    """Ordens abertas com previsão vencida, por faixa de dias de atraso"""
+    hoje = timezone.localdate()
+    chave = f'relatorio:{oficina.pk}:atrasadas:{hoje}'
+    # Usa a versão do dashboard, trocada a cada alteração de ordem da oficina
+    versao = versao_dashboard(oficina.pk)
+    item = cache.get(chave)
+    if item is not None and item['versao'] == versao:
+        return item['dados']
+
+    agregados = {}
+    for minimo, maximo in FAIXAS_ATRASO:
+        condicao = Q(data_previsao__lte=hoje - timedelta(days=minimo))
+        if maximo is not None:
+            condicao &= Q(data_previsao__gte=hoje - timedelta(days=maximo))
+        agregados[f'{minimo}_{maximo}'] = Count('id', filter=condicao)
+    with leitura_no_primario():
+        contagem = OrdemServico.objects.filter(
+            oficina=oficina, status__in_literal=STATUS_OS_ABERTOS, data_previsao__lt=hoje
+        ).aggregate(**agregados)
+
+    dados = [
+        {
+            'faixa': f'{minimo} a {maximo} dias' if maximo is not None else f'Mais de {minimo - 1} dias',
+            'quantidade': contagem[f'{minimo}_{maximo}'],
+        }
+        for minimo, maximo in FAIXAS_ATRASO
+    ]
+    cache.set(chave, {'versao': versao, 'dados': dados}, CACHE_TIMEOUT_ABERTO)
+    return dados
+
+
+def periodo_padrao(hoje, meses=12):
+    """Últimos `meses` meses do calendário, incluindo o atual"""
+    return meses_calendario(hoje, meses)[0], hoje
+
+
+def limitar_periodo(inicio, fim, hoje):
+    """
+    Período pedido limitado ao mês corrente e aos ANOS_MAXIMOS anos que
+    terminam em `fim`. Retorna (inicio, fim, limitado).
+    """
+    limite_fim = proximo_mes(hoje) - timedelta(days=1)
+    novo_fim = min(fim, limite_fim)
+    # Primeiro dos ANOS_MAXIMOS * 12 meses do calendário que terminam em novo_fim
+    ano = novo_fim.year - ANOS_MAXIMOS
+    limite_inicio = proximo_mes(date(ano, novo_fim.month, 1)) if ano >= date.min.year else date.min
+    novo_inicio = max(inicio, limite_inicio)
+    if novo_inicio > novo_fim:
+        novo_inicio = _inicio_mes(novo_fim)
+    return novo_inicio, novo_fim, (novo_inicio, novo_fim) != (inicio, fim)
@@ -0,0 +1,121 @@
+"""
+Leituras em réplica do banco de dados.
+
+Com uma réplica configurada (alias 'replica', ver settings.py), as views
+marcadas com @somente_leitura fazem suas consultas na réplica; todo o resto,
+e qualquer escrita, vai para o primário ('default'). Autenticação, sessões
+e demais apps do Django sempre leem do primário.
+
+A réplica pode estar alguns segundos atrasada. Para o usuário ver o que
+acabou de gravar, toda resposta a um POST (ou outro método que altera dados)
+grava um cookie que fixa as leituras desse navegador no primário por
+REPLICA_ATRASO_MAXIMO segundos (read-your-writes).
+
+O estado "ler da réplica" fica em uma ContextVar, então vale também para
+views assíncronas e não vaza entre requisições atendidas pela mesma thread.
+
+Os caches versionados (dashboard, relatórios, catálogo de serviços) são
+preenchidos dentro de leitura_no_primario: a versão no cache é trocada pelas
+escritas no primário, e um resultado calculado na réplica atrasada ficaria
+guardado com a versão nova e seria servido como atual.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+REPLICA = 'replica'
+PRIMARIO = 'default'
+COOKIE_PRIMARIO = 'ler_primario'
+# Apps cujas leituras precisam enxergar as próprias escritas imediatamente
+APPS_PRIMARIO = {'auth', 'sessions', 'contenttypes', 'admin'}
+
+_ler_da_replica = ContextVar('ler_da_replica', default=False)
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+class RoteadorReplica:
+    """Roteador de banco: leituras das views somente leitura na réplica, o resto no primário"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in APPS_PRIMARIO or not _ler_da_replica.get():
+            return PRIMARIO
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return PRIMARIO
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e primário têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o esquema pela replicação (ou pela cópia do arquivo, localmente)
+        return db != REPLICA
+
+
+def somente_leitura(view):
+    """
+    Faz as consultas da view na réplica, a menos que o navegador tenha
+    alterado dados há pouco (cookie de read-your-writes) ou que o método da
+    requisição não seja seguro.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not replica_configurada() or request.method not in ('GET', 'HEAD')
+                or request.COOKIES.get(COOKIE_PRIMARIO)):
+            return view(request, *args, **kwargs)
+        token = _ler_da_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _ler_da_replica.reset(token)
+    return wrapper
+
+
+class LeituraPrimarioMiddleware:
+    """Após uma requisição que altera dados, fixa as leituras do navegador no primário por alguns segundos"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configurada():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._fixar_primario(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._fixar_primario(request, await self.get_response(request))
+
+    def _fixar_primario(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                COOKIE_PRIMARIO, '1',
+                max_age=settings.REPLICA_ATRASO_MAXIMO,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+@contextmanager
+def leitura_no_primario():
+    """Faz as leituras do bloco no primário, mesmo dentro de uma view @somente_leitura"""
+    token = _ler_da_replica.set(False)
+    try:
+        yield
+    finally:
+        _ler_da_replica.reset(token)
@@ -0,0 +1,126 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import busca
+from .catalogo import invalidar_catalogo
+from .estatisticas import invalidar_dashboard
+from .middleware import invalidar_oficinas_usuarios
+from .models import Cliente, ItemServico, Oficina, OrdemServico, Pagamento, Servico, Veiculo
+from .receita import registrar_pagamento, remover_pagamento
+from .relatorios import invalidar_relatorios
+from .totais import registrar_item, remover_item
+
+
+def _invalidar_apos_commit(oficina_id):
+    # Só invalida depois do commit, senão outra requisição poderia recalcular
+    # o dashboard com os dados antigos e guardá-lo como atual
+    transaction.on_commit(partial(invalidar_dashboard, oficina_id))
+
+
+def _invalidar_relatorios_apos_commit(oficina_id, *datas):
+    transaction.on_commit(partial(invalidar_relatorios, oficina_id, datas))
+
+
+def _excluido_com_a_ordem(origin):
+    """Se o item está sendo excluído em cascata com a ordem (ou a oficina)"""
+    # origin é a instância ou o queryset em que delete() foi chamado
+    return origin is not None and getattr(origin, 'model', type(origin)) is not ItemServico
+
+
+@receiver([post_save, post_delete], sender=OrdemServico)
+@receiver([post_save, post_delete], sender=Cliente)
+def invalidar_dashboard_oficina(sender, instance, **kwargs):
+    """Invalida o dashboard quando ordens ou clientes da oficina mudam"""
+    _invalidar_apos_commit(instance.oficina_id)
+
+
+@receiver([post_save, post_delete], sender=OrdemServico)
+def invalidar_relatorios_ordem(sender, instance, **kwargs):
+    """Invalida os meses de entrada e conclusão da ordem (atuais e anteriores) nos relatórios"""
+    _invalidar_relatorios_apos_commit(
+        instance.oficina_id, instance.data_entrada, instance.data_conclusao,
+        *getattr(instance, '_datas_carregadas', ())
+    )
+    instance._datas_carregadas = (instance.data_entrada, instance.data_conclusao)
+
+
+@receiver([post_save, post_delete], sender=ItemServico)
+def invalidar_relatorios_item(sender, instance, origin=None, **kwargs):
+    """Invalida o mês de entrada da ordem do item nos relatórios"""
+    if _excluido_com_a_ordem(origin):
+        # O post_delete da própria ordem invalida o mês dela, sem uma consulta por item
+        return
+    if ItemServico.ordem.is_cached(instance):
+        data_entrada = instance.ordem.data_entrada
+    else:
+        data_entrada = OrdemServico.objects.filter(pk=instance.ordem_id).values_list('data_entrada', flat=True).first()
+    _invalidar_relatorios_apos_commit(instance.oficina_id, data_entrada)
+
+
+@receiver(post_save, sender=ItemServico)
+def item_salvo(sender, instance, **kwargs):
+    """Aplica a alteração do item no total da ordem"""
+    registrar_item(instance)
+
+
+@receiver(post_delete, sender=ItemServico)
+def item_excluido(sender, instance, origin=None, **kwargs):
+    """Retira o item do total da ordem, a menos que a própria ordem (ou a oficina) esteja sendo excluída"""
+    if _excluido_com_a_ordem(origin):
+        return
+    remover_item(instance)
+
+
+@receiver(post_save, sender=Pagamento)
+def pagamento_salvo(sender, instance, **kwargs):
+    """Atualiza o faturamento diário e invalida o dashboard e os relatórios da oficina"""
+    anterior = getattr(instance, '_estado_faturamento', None)
+    registrar_pagamento(instance)
+    _invalidar_apos_commit(instance.oficina_id)
+    _invalidar_relatorios_apos_commit(instance.oficina_id, instance.data_pagamento, anterior and anterior[1])
+
+
+@receiver(post_delete, sender=Pagamento)
+def pagamento_excluido(sender, instance, **kwargs):
+    """Retira o pagamento do faturamento diário e invalida o dashboard e os relatórios da oficina"""
+    remover_pagamento(instance)
+    _invalidar_apos_commit(instance.oficina_id)
+    _invalidar_relatorios_apos_commit(instance.oficina_id, instance.data_pagamento)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Veiculo)
+@receiver(post_save, sender=OrdemServico)
+def indexar_busca(sender, instance, **kwargs):
+    """Mantém o índice de busca atualizado"""
+    busca.indexar(instance)
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Veiculo)
+@receiver(post_delete, sender=OrdemServico)
+def remover_busca(sender, instance, **kwargs):
+    """Remove do índice de busca os registros excluídos"""
+    busca.remover(instance)
+
+
+@receiver([post_save, post_delete], sender=Oficina)
+def invalidar_contexto_oficina(sender, instance, **kwargs):
+    """Descarta o request.oficina em cache do proprietário (atual e anterior) quando a oficina muda"""
+    usuarios = {instance.proprietario_id, getattr(instance, '_proprietario_carregado', None)}
+    transaction.on_commit(partial(invalidar_oficinas_usuarios, usuarios))
+    instance._proprietario_carregado = instance.proprietario_id
+
+
+@receiver([post_save, post_delete], sender=Servico)
+def invalidar_catalogo_servicos(sender, instance, **kwargs):
+    """Faz todos os workers relerem o catálogo de serviços"""
+    transaction.on_commit(invalidar_catalogo)
+
+
+def garantir_busca_apos_migrate(sender, using, **kwargs):
+    """Recria a estrutura de busca (FTS5/GIN) se uma migração a descartou (conectado em apps.py)"""
+    busca.garantir_estrutura_busca(connections[using])
@@ -0,0 +1,50 @@
+// Autocomplete dos selects renderizados por SelectAutocomplete (forms.py)
+
+// O select vem só com a opção escolhida; as sugestões são buscadas na API
+// conforme o usuário digita no campo de busca
+function iniciarAutocomplete(select, placeholder, parametrosExtras) {
+    const busca = document.createElement('input');
+    busca.type = 'search';
+    busca.className = 'input autocomplete-busca';
+    busca.placeholder = placeholder;
+    busca.autocomplete = 'off';
+    const rotulo = select.closest('.form-group').querySelector('label');
+    rotulo.after(busca);
+    
+    let espera = null;
+    busca.addEventListener('input', function() {
+        clearTimeout(espera);
+        espera = setTimeout(function() {
+            const texto = busca.value.trim();
+            if (texto.length < 2) return;
+            const params = new URLSearchParams({tipo: select.dataset.autocompleteTipo, q: texto, ...parametrosExtras()});
+            fetch(`${select.dataset.autocompleteUrl}?${params}`)
+                .then(response => response.json())
+                .then(data => {
+                    const resultados = data.resultados || [];
+                    select.innerHTML = '';
+                    const vazia = document.createElement('option');
+                    vazia.value = '';
+                    vazia.textContent = resultados.length ? `${resultados.length} resultado(s) - selecione` : 'Nenhum resultado';
+                    select.appendChild(vazia);
+                    resultados.forEach(resultado => {
+                        const option = document.createElement('option');
+                        option.value = resultado.id;
+                        option.textContent = resultado.texto;
+                        if (resultado.cliente_id) {
+                            option.dataset.clienteId = resultado.cliente_id;
+                            option.dataset.cliente = resultado.cliente || '';
+                        }
+                        select.appendChild(option);
+                    });
+                    if (resultados.length === 1) {
+                        select.value = resultados[0].id;
+                        select.dispatchEvent(new Event('change'));
+                    }
+                })
+                .catch(error => {
+                    console.error('Erro ao buscar sugestões:', error);
+                });
+        }, 250);
+    });
+}
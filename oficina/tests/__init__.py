@@ -0,0 +1,19 @@
+"""
+Configurações comuns dos testes.
+
+O cache padrão é de arquivos (CACHES em settings.py) e as métricas são
+gravadas em METRICAS_DIR, os dois dentro do projeto: sem `ambiente_isolado`,
+a suíte limparia o cache e misturaria métricas com as do servidor de
+desenvolvimento ou de produção. Toda classe de teste deve usá-lo.
+"""
+import tempfile
+
+from django.test import override_settings
+
+
+_metricas = tempfile.TemporaryDirectory(prefix='mecanosync-metricas-')
+
+ambiente_isolado = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    METRICAS_DIR=_metricas.name,
+)
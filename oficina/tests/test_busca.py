@@ -0,0 +1,30 @@
+"""Estrutura da busca textual recriada quando uma migração a descarta"""
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from oficina import busca
+from oficina.models import Cliente, Oficina
+from oficina.tests import ambiente_isolado
+
+
+@ambiente_isolado
+@skipUnless(connection.vendor == 'sqlite', 'Triggers da tabela FTS5 do SQLite')
+class EstruturaBuscaTests(TestCase):
+    def test_triggers_descartados_sao_recriados(self):
+        oficina = Oficina.objects.create(
+            nome='Oficina', cnpj='00.000.000/0001-00', telefone='1', email='a@b.c', cidade='X'
+        )
+        # Como uma migração que recria oficina_indicebusca no SQLite
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {busca.TABELA}_ai')
+        Cliente.objects.create(oficina=oficina, nome='Joaquim Esquecido', cpf_cnpj='1', telefone='1')
+        self.assertEqual(busca.buscar(oficina, 'esquecido'), [])
+
+        self.assertTrue(busca.garantir_estrutura_busca(connection))
+        self.assertFalse(busca.garantir_estrutura_busca(connection))
+        # A reconstrução inclui o que foi gravado sem o trigger
+        self.assertEqual(len(busca.buscar(oficina, 'esquecido')), 1)
+        Cliente.objects.create(oficina=oficina, nome='Joaquim Lembrado', cpf_cnpj='2', telefone='1')
+        self.assertEqual(len(busca.buscar(oficina, 'joaquim')), 2)
@@ -0,0 +1,249 @@
+"""
+Número de consultas SQL de cada view e API, medido em duas oficinas de
+tamanhos bem diferentes. Uma consulta por linha (N+1) aparece como diferença
+entre as duas; o teto pega páginas que cresceram demais mesmo sem depender
+do tamanho da oficina. Em caso de falha o SQL das duas medições é exibido.
+"""
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from oficina import urls
+from oficina.dados_sinteticos import Escala, gerar
+from oficina.models import Cliente, ItemServico, OrdemServico, Pagamento, Peca, Servico, Veiculo
+from oficina.tests import ambiente_isolado
+
+
+MAXIMO_CONSULTAS = 15
+
+PEQUENA = Escala(oficinas=1, clientes=3, veiculos=1, ordens=10, itens=1, pagamentos=1, pecas=2, meses=6)
+GRANDE = Escala(oficinas=1, clientes=60, veiculos=3, ordens=200, itens=4, pagamentos=3, pecas=40, meses=12)
+
+# Views medidas com GET: nome da URL -> (perfil, objeto do <pk> ou None)
+VIEWS_GET = {
+    'login': ('anonimo', None),
+    'dashboard': ('dono', None),
+    'perfil': ('dono', None),
+    'alterar_senha': ('dono', None),
+    'admin_dashboard': ('superusuario', None),
+    'admin_oficina_criar': ('superusuario', None),
+    'admin_oficina_editar': ('superusuario', 'oficina'),
+    'admin_oficina_detalhes': ('superusuario', 'oficina'),
+    'admin_oficina_excluir': ('superusuario', 'oficina'),
+    'admin_resetar_senha': ('superusuario', 'oficina'),
+    'metricas': ('superusuario', None),
+    'clientes_lista': ('dono', None),
+    'clientes_exportar': ('dono', None),
+    'cliente_criar': ('dono', None),
+    'cliente_editar': ('dono', 'cliente'),
+    'ordens_lista': ('dono', None),
+    'ordens_exportar': ('dono', None),
+    'ordem_criar': ('dono', None),
+    'ordem_editar': ('dono', 'ordem'),
+    'ordem_visualizar': ('dono', 'ordem'),
+    'get_veiculos_cliente': ('dono', None),
+    'autocompletar': ('dono', None),
+    'obter_veiculo': ('dono', 'veiculo'),
+    'faturamento': ('dono', None),
+    'faturamento_exportar': ('dono', None),
+    'estoque': ('dono', None),
+    'peca_criar': ('dono', None),
+    'peca_editar': ('dono', 'peca'),
+    'movimento_criar': ('dono', None),
+    'relatorios': ('dono', None),
+}
+# APIs que só aceitam POST, cobertas pelos testes da classe abaixo
+APIS_POST = {
+    'criar_veiculo_rapido', 'editar_veiculo', 'excluir_veiculo', 'alterar_status_ordem',
+    'alterar_status_ordens', 'alterar_status_pagamento', 'alterar_metodo_pagamento',
+}
+# Formulários que só aceitam POST e redirecionam, cobertos pelos testes da classe abaixo
+FORMULARIOS_POST = {'ordem_item_adicionar', 'ordem_item_remover'}
+# Alteram dados em um GET e não dependem do tamanho da oficina
+NAO_MEDIDAS = {'logout', 'cliente_deletar', 'admin_oficina_toggle'}
+# Parâmetros extras de cada GET
+PARAMETROS_GET = {
+    'ordens_lista': [{}, {'busca': 'freio'}, {'filtro': 'abertas'}],
+    'clientes_lista': [{}, {'busca': 'silva'}],
+    # Período muito longo: limitado na view, não cresce com o intervalo pedido
+    'relatorios': [{}, {'data_inicio': '0001-01-01', 'data_fim': '9999-12-31'}],
+    # Os textos buscados no autocomplete são os do cliente/veículo de cada oficina (ver _parametros)
+    'autocompletar': [
+        {'tipo': 'cliente', 'q': 'placa'}, {'tipo': 'veiculo', 'q': 'nome'}, {'tipo': 'ordem', 'q': 'nome'},
+    ],
+}
+
+
+@ambiente_isolado
+class ConsultasPorViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficinas = {}
+        for nome, escala in (('pequena', PEQUENA), ('grande', GRANDE)):
+            resultado = gerar(escala, semente=1, tamanho_lote=100)
+            oficina = resultado.oficinas[0]
+            cls.oficinas[nome] = {
+                'oficina': oficina,
+                'dono': resultado.usuarios[0],
+                'superusuario': resultado.superusuario,
+                # Os registros com mais itens, pagamentos e veículos de cada oficina
+                'cliente': Cliente.objects.filter(oficina=oficina).annotate(
+                    n=Count('veiculos')).order_by('-n', 'pk').first(),
+                'ordem': OrdemServico.objects.filter(oficina=oficina).annotate(
+                    n=Count('itens', distinct=True) + Count('pagamentos', distinct=True)).order_by('-n', 'pk').first(),
+                'veiculo': Veiculo.objects.filter(oficina=oficina).order_by('pk').first(),
+                'peca': Peca.objects.filter(oficina=oficina).order_by('pk').first(),
+            }
+
+    def setUp(self):
+        # O cache em memória (ver oficina/tests) é compartilhado pelos testes do processo
+        cache.clear()
+        self.clientes = {}
+        for nome, dados in self.oficinas.items():
+            perfis = {'anonimo': Client(), 'dono': Client(), 'superusuario': Client()}
+            perfis['dono'].force_login(dados['dono'])
+            perfis['superusuario'].force_login(dados['superusuario'])
+            self.clientes[nome] = perfis
+
+    def _consultas(self, cliente, metodo, endereco, dados=None):
+        """Consultas feitas por uma requisição, com o cache vazio"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = getattr(cliente, metodo)(endereco, dados or {})
+            if resposta.streaming:
+                b''.join(resposta.streaming_content)
+        self.assertLess(resposta.status_code, 500, endereco)
+        return resposta, contexto.captured_queries
+
+    def assertConsultasConstantes(self, descricao, pequena, grande):
+        if len(pequena) == len(grande) and len(grande) <= MAXIMO_CONSULTAS:
+            return
+
+        def listar(consultas):
+            return '\n'.join(f'  {numero}. {consulta["sql"]}' for numero, consulta in enumerate(consultas, 1))
+
+        self.fail(
+            f'{descricao}: {len(pequena)} consulta(s) na oficina pequena e {len(grande)} na grande '
+            f'(máximo {MAXIMO_CONSULTAS}).\n\nOficina pequena:\n{listar(pequena)}\n\nOficina grande:\n{listar(grande)}'
+        )
+
+    def test_todas_as_urls_cobertas(self):
+        nomes = {padrao.name for padrao in urls.urlpatterns}
+        self.assertEqual(nomes - set(VIEWS_GET) - APIS_POST - FORMULARIOS_POST - NAO_MEDIDAS, set(), 'URLs sem teste de consultas')
+
+    def test_views_get(self):
+        for nome, (perfil, objeto) in VIEWS_GET.items():
+            for parametros in PARAMETROS_GET.get(nome, [{}]):
+                medicoes = []
+                for tamanho, dados in self.oficinas.items():
+                    kwargs = {'pk': dados[objeto].pk} if objeto else {}
+                    consulta = self._parametros(nome, parametros, dados)
+                    _, consultas = self._consultas(
+                        self.clientes[tamanho][perfil], 'get', reverse(nome, kwargs=kwargs), consulta
+                    )
+                    medicoes.append(consultas)
+                with self.subTest(view=nome, **parametros):
+                    self.assertConsultasConstantes(f'GET {nome} {parametros or ""}', *medicoes)
+
+    def _parametros(self, nome, parametros, dados):
+        if nome == 'get_veiculos_cliente':
+            return {'cliente_id': dados['cliente'].pk}
+        if nome == 'autocompletar':
+            # Cliente pela placa de um veículo, veículo e ordem pelo nome do cliente
+            texto = {'placa': dados['veiculo'].placa, 'nome': dados['cliente'].nome}[parametros['q']]
+            return {**parametros, 'q': texto}
+        return parametros
+
+    def _comparar_post(self, nome, preparar, status=200):
+        """
+        Mede a API `nome` nas duas oficinas. `preparar(dados)` retorna
+        (kwargs, POST) de uma chamada; a primeira chamada só aquece (cria as
+        linhas de faturamento do dia, por exemplo) e a segunda é a medida.
+        """
+        medicoes = []
+        for tamanho, dados in self.oficinas.items():
+            cliente = self.clientes[tamanho]['dono']
+            for _ in range(2):
+                kwargs, post = preparar(dados)
+                resposta, consultas = self._consultas(cliente, 'post', reverse(nome, kwargs=kwargs), post)
+                self.assertEqual(resposta.status_code, status, resposta.content)
+            medicoes.append(consultas)
+        self.assertConsultasConstantes(f'POST {nome}', *medicoes)
+
+    def _nova_ordem(self, dados, status='em_andamento'):
+        veiculo = dados['veiculo']
+        ordem = OrdemServico.objects.create(
+            oficina=dados['oficina'], cliente_id=veiculo.cliente_id, veiculo=veiculo, status=status,
+            data_previsao=date.today() + timedelta(days=3), descricao_problema='Teste',
+        )
+        # Total vindo de um item, para a conclusão gerar o pagamento pendente
+        ItemServico.objects.create(ordem=ordem, servico=Servico.objects.first(), quantidade=1, valor_unitario=300)
+        return ordem
+
+    def _novo_pagamento(self, dados):
+        return Pagamento.objects.create(
+            ordem=dados['ordem'], valor=50, metodo='pix', status='pendente', data_pagamento=date.today()
+        )
+
+    def test_criar_veiculo_rapido(self):
+        placas = iter(f'TST{numero:04d}' for numero in range(100))
+        self._comparar_post('criar_veiculo_rapido', lambda dados: ({}, {
+            'cliente': dados['cliente'].pk, 'marca': 'Fiat', 'modelo': 'Uno', 'ano': 2015, 'placa': next(placas),
+        }))
+
+    def test_editar_veiculo(self):
+        self._comparar_post('editar_veiculo', lambda dados: ({'pk': dados['veiculo'].pk}, {
+            'marca': 'Fiat', 'modelo': 'Palio', 'ano': 2012, 'placa': dados['veiculo'].placa, 'km_atual': 1000,
+        }))
+
+    def test_excluir_veiculo(self):
+        def preparar(dados):
+            veiculo = Veiculo.objects.create(
+                cliente=dados['cliente'], marca='Fiat', modelo='Uno', ano=2010,
+                placa=f'EXC{Veiculo.objects.count():04d}',
+            )
+            return {'pk': veiculo.pk}, {}
+        self._comparar_post('excluir_veiculo', preparar)
+
+    def test_alterar_status_ordem(self):
+        self._comparar_post('alterar_status_ordem', lambda dados: (
+            {'pk': self._nova_ordem(dados).pk}, {'status': 'concluida'}
+        ))
+
+    def test_alterar_status_ordens(self):
+        # Lotes de tamanhos diferentes: o número de consultas não depende de quantas ordens mudam
+        tamanhos = iter([2, 2, 25, 25])
+
+        def preparar(dados):
+            ordens = [self._nova_ordem(dados) for _ in range(next(tamanhos))]
+            return {}, {'ordem': [ordem.pk for ordem in ordens], 'status': 'concluida'}
+        self._comparar_post('alterar_status_ordens', preparar)
+
+    def test_alterar_status_pagamento(self):
+        self._comparar_post('alterar_status_pagamento', lambda dados: (
+            {'pk': self._novo_pagamento(dados).pk}, {'status': 'pago'}
+        ))
+
+    def test_alterar_metodo_pagamento(self):
+        self._comparar_post('alterar_metodo_pagamento', lambda dados: (
+            {'pk': self._novo_pagamento(dados).pk}, {'metodo': 'boleto'}
+        ))
+
+    def test_ordem_item_adicionar(self):
+        servico = Servico.objects.filter(ativo=True).first()
+        self._comparar_post('ordem_item_adicionar', lambda dados: (
+            {'pk': dados['ordem'].pk}, {'servico': servico.pk, 'quantidade': 2}
+        ), status=302)
+
+    def test_ordem_item_remover(self):
+        def preparar(dados):
+            item = ItemServico.objects.create(
+                ordem=dados['ordem'], servico=Servico.objects.first(), quantidade=1, valor_unitario=50
+            )
+            return {'pk': item.pk}, {}
+        self._comparar_post('ordem_item_remover', preparar, status=302)
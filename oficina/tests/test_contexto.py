@@ -0,0 +1,62 @@
+"""Contexto da oficina em cache (middleware.py): invalidação só dos proprietários da oficina alterada"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from oficina.middleware import oficina_do_usuario
+from oficina.models import Oficina
+from oficina.tests import ambiente_isolado
+
+
+@ambiente_isolado
+class ContextoOficinaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dono, cls.outro, cls.novo_dono = (
+            User.objects.create_user(nome) for nome in ('dono', 'outro', 'novo_dono')
+        )
+        cls.oficina, cls.outra = (
+            Oficina.objects.create(
+                nome=f'Oficina {i}', cnpj=f'00.000.000/000{i}-00', telefone='(11) 99999-9999',
+                email='contato@oficina.com', cidade='São Paulo', proprietario=usuario,
+            )
+            for i, usuario in enumerate((cls.dono, cls.outro), 1)
+        )
+
+    def setUp(self):
+        # O cache em memória (ver oficina/tests) é compartilhado pelos testes do processo
+        cache.clear()
+
+    def consultas(self, usuario):
+        with CaptureQueriesContext(connection) as contexto:
+            oficina = oficina_do_usuario(usuario)
+        return oficina, len(contexto.captured_queries)
+
+    def salvar(self, oficina):
+        with self.captureOnCommitCallbacks(execute=True):
+            oficina.save()
+
+    def test_alteracao_invalida_so_o_proprietario(self):
+        for usuario in (self.dono, self.outro, self.novo_dono):
+            oficina_do_usuario(usuario)
+
+        oficina = Oficina.objects.get(pk=self.oficina.pk)
+        oficina.modulo_estoque = True
+        self.salvar(oficina)
+
+        encontrada, consultas = self.consultas(self.dono)
+        self.assertEqual((encontrada.modulo_estoque, consultas), (True, 1))
+        self.assertEqual(self.consultas(self.outro), (self.outra, 0))
+
+        # Troca de dono: o anterior e o novo são invalidados
+        oficina.proprietario = self.novo_dono
+        self.salvar(oficina)
+        self.assertEqual(self.consultas(self.dono), (None, 1))
+        self.assertEqual(self.consultas(self.novo_dono), (oficina, 1))
+        self.assertEqual(self.consultas(self.outro), (self.outra, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            oficina.delete()
+        self.assertEqual(self.consultas(self.novo_dono), (None, 1))
@@ -0,0 +1,122 @@
+"""
+Exclusão de oficinas em lotes (exclusao.py): retomada quando a concessão
+vence, retomada depois de um erro no meio do caminho e isolamento entre
+oficinas. A thread fica desligada; as exclusões são executadas pelos testes.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from oficina import exclusao
+from oficina.dados_sinteticos import Escala, gerar
+from oficina.models import (
+    Cliente, ExclusaoOficina, ItemServico, Oficina, OrdemServico, Pagamento, Peca, Veiculo,
+)
+from oficina.tests import ambiente_isolado
+
+
+ESCALA = Escala(oficinas=2, clientes=8, veiculos=2, ordens=30, itens=2, pagamentos=1, pecas=5, meses=3)
+# Lote pequeno para que cada etapa precise de vários
+LOTE = 7
+
+
+def contagens(oficina_id):
+    return {
+        modelo.__name__: modelo.objects.filter(**{caminho: oficina_id}).count()
+        for _, modelo, caminho in exclusao.ETAPAS
+    }
+
+
+@ambiente_isolado
+@override_settings(EXCLUSAO_EM_SEGUNDO_PLANO=False)
+class ExclusaoOficinaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        resultado = gerar(ESCALA, semente=1, tamanho_lote=100)
+        cls.excluida, cls.mantida = resultado.oficinas
+        cls.superusuario = resultado.superusuario
+
+    def setUp(self):
+        self.antes_mantida = contagens(self.mantida.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exclusao = exclusao.solicitar_exclusao(self.excluida, self.superusuario)
+
+    def assertExcluida(self):
+        self.exclusao.refresh_from_db()
+        self.assertEqual(self.exclusao.status, 'concluida')
+        self.assertFalse(Oficina.objects.filter(pk=self.excluida.pk).exists())
+        self.assertEqual(sum(contagens(self.excluida.pk).values()), 0)
+        self.assertEqual(self.exclusao.removidos, self.exclusao.total)
+
+    def test_isolamento_entre_oficinas(self):
+        self.assertEqual(exclusao.processar_exclusoes(LOTE), 1)
+
+        self.assertExcluida()
+        self.assertEqual(contagens(self.mantida.pk), self.antes_mantida)
+        self.assertTrue(Oficina.objects.filter(pk=self.mantida.pk).exists())
+        for modelo in (Cliente, Veiculo, OrdemServico, ItemServico, Pagamento, Peca):
+            self.assertTrue(modelo.objects.exists(), modelo.__name__)
+
+    def test_concessao_vencida_e_retomada_por_outro_executor(self):
+        self.assertEqual(exclusao.reivindicar('primeiro'), self.exclusao.pk)
+        # Com a concessão válida ninguém mais assume a exclusão
+        self.assertIsNone(exclusao.reivindicar('segundo'))
+
+        # O primeiro executor "morre" no meio da etapa de itens
+        etapas = dict((etapa, (modelo, caminho)) for etapa, modelo, caminho in exclusao.ETAPAS)
+        modelo, caminho = etapas['itens_servico']
+        exclusao._excluir_lote(modelo, caminho, self.excluida.pk, LOTE)
+        ExclusaoOficina.objects.filter(pk=self.exclusao.pk).update(
+            concessao_ate=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(exclusao.reivindicar('segundo'), self.exclusao.pk)
+        exclusao.executar(self.exclusao.pk, 'segundo', LOTE)
+        self.assertExcluida()
+        self.assertEqual(contagens(self.mantida.pk), self.antes_mantida)
+
+        # O executor antigo perdeu a concessão: não grava mais progresso
+        with self.assertRaises(exclusao.ConcessaoPerdida):
+            exclusao._registrar_progresso(self.exclusao.pk, 'primeiro', {'etapa': 'ordens'})
+
+    def test_retomada_depois_de_erro_no_meio(self):
+        excluir_lote = exclusao._excluir_lote
+        chamadas = []
+
+        def falhar_no_quarto_lote(*args):
+            chamadas.append(args)
+            if len(chamadas) == 4:
+                raise RuntimeError('conexão perdida')
+            return excluir_lote(*args)
+
+        with mock.patch.object(exclusao, '_excluir_lote', side_effect=falhar_no_quarto_lote), \
+                self.assertLogs('oficina.exclusao', 'ERROR'):
+            exclusao.processar_exclusoes(LOTE)
+
+        self.exclusao.refresh_from_db()
+        self.assertEqual(self.exclusao.status, 'erro')
+        self.assertIn('conexão perdida', self.exclusao.erro)
+        # Os lotes anteriores ao erro foram confirmados; o que falhou, não
+        restantes = sum(contagens(self.excluida.pk).values())
+        self.assertEqual(restantes, self.exclusao.total - self.exclusao.removidos)
+        self.assertGreater(self.exclusao.removidos, 0)
+
+        # Como o comando com --repetir-erros: volta para a fila e recomeça de onde parou
+        ExclusaoOficina.objects.filter(pk=self.exclusao.pk).update(status='pendente', erro='')
+        self.assertEqual(exclusao.processar_exclusoes(LOTE), 1)
+        self.assertExcluida()
+        self.assertEqual(contagens(self.mantida.pk), self.antes_mantida)
+
+    def test_painel_nao_inicia_exclusoes(self):
+        cliente = Client()
+        cliente.force_login(self.superusuario)
+        with mock.patch.object(exclusao, 'iniciar_em_segundo_plano') as iniciar:
+            with self.captureOnCommitCallbacks(execute=True):
+                resposta = cliente.get(reverse('admin_dashboard'))
+            self.assertEqual(resposta.status_code, 200)
+            iniciar.assert_not_called()
+        self.exclusao.refresh_from_db()
+        self.assertEqual(self.exclusao.status, 'pendente')
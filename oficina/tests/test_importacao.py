@@ -0,0 +1,137 @@
+"""
+Importação de clientes e veículos por CSV (importacao.py): arquivo válido,
+duplicados no próprio arquivo e no banco, linhas inválidas e uma placa
+cadastrada por outro processo entre a verificação e a gravação do lote.
+"""
+import io
+from unittest import mock
+
+from django.test import TestCase
+
+from oficina import importacao
+from oficina.models import Cliente, IndiceBusca, Oficina, Veiculo
+from oficina.tests import ambiente_isolado
+
+
+CABECALHO_CLIENTES = 'nome,cpf_cnpj,telefone,email,endereco,cidade,ativo\n'
+CABECALHO_VEICULOS = 'cpf_cnpj,marca,modelo,ano,placa,cor,km_atual\n'
+
+
+def csv(cabecalho, *linhas):
+    return io.StringIO(cabecalho + ''.join(f'{linha}\n' for linha in linhas))
+
+
+@ambiente_isolado
+class ImportacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficina = Oficina.objects.create(
+            nome='Oficina Teste', cnpj='00.000.000/0001-00', telefone='(11) 99999-9999',
+            email='contato@oficina.com', cidade='São Paulo'
+        )
+        cls.outra = Oficina.objects.create(
+            nome='Outra Oficina', cnpj='00.000.000/0002-00', telefone='(11) 99999-9999',
+            email='outra@oficina.com', cidade='São Paulo'
+        )
+
+    def importar(self, funcao, arquivo, **kwargs):
+        erros = []
+        resultado = funcao(
+            self.oficina, arquivo, ao_registrar_erro=lambda linha, mensagem: erros.append(linha), **kwargs
+        )
+        return resultado, erros
+
+    def assertResultado(self, resultado, criados, duplicados, erros):
+        self.assertEqual((resultado.criados, resultado.duplicados, resultado.erros), (criados, duplicados, erros))
+
+    def test_clientes_validos(self):
+        resultado, erros = self.importar(importacao.importar_clientes, csv(
+            CABECALHO_CLIENTES,
+            'Ana,111,(11) 1111-1111,ana@exemplo.com,Rua A,São Paulo,',
+            'Bruno,222,(11) 2222-2222,,,,false',
+        ))
+
+        self.assertResultado(resultado, 2, 0, 0)
+        self.assertEqual(erros, [])
+        self.assertEqual(
+            set(Cliente.objects.filter(oficina=self.oficina).values_list('nome', 'ativo')),
+            {('Ana', True), ('Bruno', False)},
+        )
+        self.assertEqual(IndiceBusca.objects.filter(tipo='cliente', oficina=self.oficina).count(), 2)
+
+    def test_clientes_duplicados_no_arquivo_e_no_banco(self):
+        Cliente.objects.create(oficina=self.oficina, nome='Já cadastrado', cpf_cnpj='111', telefone='1')
+        # O mesmo CPF em outra oficina não é duplicado
+        Cliente.objects.create(oficina=self.outra, nome='De outra oficina', cpf_cnpj='222', telefone='1')
+
+        resultado, _ = self.importar(importacao.importar_clientes, csv(
+            CABECALHO_CLIENTES,
+            'Ana,111,1,,,,',
+            'Bruno,222,1,,,,',
+            'Bruno de novo,222,1,,,,',
+            'Carla,333,1,,,,',
+        ), tamanho_lote=2)
+
+        self.assertResultado(resultado, 2, 2, 0)
+        self.assertEqual(
+            sorted(Cliente.objects.filter(oficina=self.oficina).values_list('cpf_cnpj', flat=True)),
+            ['111', '222', '333'],
+        )
+
+    def test_clientes_invalidos(self):
+        resultado, erros = self.importar(importacao.importar_clientes, csv(
+            CABECALHO_CLIENTES,
+            ',111,1,,,,',
+            'Bruno,222,1,email-invalido,,,',
+            'Carla,333,1,,,,',
+        ))
+
+        self.assertResultado(resultado, 1, 0, 2)
+        self.assertEqual(erros, [2, 3])
+        self.assertEqual(Cliente.objects.get(oficina=self.oficina).nome, 'Carla')
+
+    def test_veiculos_validos_duplicados_e_invalidos(self):
+        cliente = Cliente.objects.create(oficina=self.oficina, nome='Ana', cpf_cnpj='111', telefone='1')
+        Cliente.objects.create(oficina=self.outra, nome='Bruno', cpf_cnpj='222', telefone='1')
+        Veiculo.objects.create(cliente=cliente, marca='Fiat', modelo='Uno', ano=2010, placa='AAA0001')
+
+        resultado, erros = self.importar(importacao.importar_veiculos, csv(
+            CABECALHO_VEICULOS,
+            '111,Fiat,Palio,2012,aaa0002,Prata,1000',
+            '111,Fiat,Palio,2012,AAA0002,,',
+            '111,Fiat,Uno,2010,AAA0001,,',
+            '111,Fiat,Uno,ano,AAA0003,,',
+            ',Fiat,Uno,2010,AAA0004,,',
+            '222,Fiat,Uno,2010,AAA0005,,',
+        ))
+
+        self.assertResultado(resultado, 1, 2, 3)
+        self.assertEqual(erros, [5, 6, 7])
+        veiculo = Veiculo.objects.get(placa='AAA0002')
+        self.assertEqual((veiculo.cliente, veiculo.oficina, veiculo.km_atual), (cliente, self.oficina, 1000))
+        self.assertTrue(IndiceBusca.objects.filter(tipo='veiculo', objeto_id=veiculo.pk).exists())
+
+    def test_placa_cadastrada_depois_da_verificacao(self):
+        cliente = Cliente.objects.create(oficina=self.oficina, nome='Ana', cpf_cnpj='111', telefone='1')
+        Veiculo.objects.create(cliente=cliente, marca='Fiat', modelo='Uno', ano=2010, placa='AAA0001')
+        placas_cadastradas = importacao._placas_cadastradas
+        chamadas = []
+
+        def verificar(placas):
+            # A verificação do lote não vê a placa gravada por outro processo
+            chamadas.append(list(placas))
+            return set() if len(chamadas) == 1 else placas_cadastradas(chamadas[-1])
+
+        with mock.patch.object(importacao, '_placas_cadastradas', side_effect=verificar):
+            resultado, erros = self.importar(importacao.importar_veiculos, csv(
+                CABECALHO_VEICULOS,
+                '111,Fiat,Palio,2012,AAA0001,,',
+                '111,Fiat,Palio,2012,AAA0002,,',
+            ))
+
+        self.assertEqual(len(chamadas), 2)
+        self.assertResultado(resultado, 1, 1, 0)
+        self.assertEqual(erros, [])
+        self.assertEqual(Veiculo.objects.get(placa='AAA0001').modelo, 'Uno')
+        veiculo = Veiculo.objects.get(placa='AAA0002')
+        self.assertTrue(IndiceBusca.objects.filter(tipo='veiculo', objeto_id=veiculo.pk).exists())
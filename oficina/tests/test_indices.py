@@ -0,0 +1,87 @@
+import re
+from datetime import date, timedelta
+from unittest import skipUnless
+
+from django.core.exceptions import FieldError
+from django.db import connection
+from django.test import TestCase
+
+from oficina.models import Cliente, Veiculo, OrdemServico, Pagamento, Oficina, STATUS_OS_ABERTOS
+from oficina.tests import ambiente_isolado
+
+
+@ambiente_isolado
+@skipUnless(connection.vendor == 'sqlite', 'Verifica o plano de execução do SQLite')
+class IndicesFiltrosOficinaTests(TestCase):
+    """Garante que as consultas do dashboard e das listagens usam os índices compostos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficina = Oficina.objects.create(
+            nome='Oficina Teste', cnpj='00.000.000/0001-00', telefone='(11) 99999-9999',
+            email='contato@oficina.com', cidade='São Paulo'
+        )
+        hoje = date.today()
+        for i in range(20):
+            cliente = Cliente.objects.create(
+                oficina=cls.oficina, nome=f'Cliente {i}', cpf_cnpj=f'{i:011d}', telefone='(11) 90000-0000'
+            )
+            veiculo = Veiculo.objects.create(
+                cliente=cliente, marca='Fiat', modelo='Uno', ano=2010, placa=f'ABC{i:04d}'
+            )
+            ordem = OrdemServico.objects.create(
+                oficina=cls.oficina, cliente=cliente, veiculo=veiculo,
+                data_entrada=hoje - timedelta(days=i), data_previsao=hoje - timedelta(days=i - 5),
+                status=OrdemServico.STATUS_CHOICES[i % 6][0], descricao_problema='Revisão',
+            )
+            Pagamento.objects.create(ordem=ordem, valor=100, metodo='pix', status='pago', data_pagamento=hoje)
+
+    def assertUsaIndice(self, queryset, *indices):
+        plano = queryset.explain()
+        usados = set(re.findall(r'USING (?:COVERING )?INDEX (\w+)', plano))
+        self.assertTrue(usados & set(indices), f'Nenhum de {indices} foi usado:\n{plano}')
+
+    def test_dashboard_ordens_abertas(self):
+        ordens = OrdemServico.objects.filter(oficina=self.oficina, status__in_literal=STATUS_OS_ABERTOS)
+        self.assertUsaIndice(ordens.order_by(), 'os_abertas_idx', 'os_oficina_status_idx')
+
+    def test_dashboard_ordens_atrasadas_usa_indice_parcial(self):
+        ordens = OrdemServico.objects.filter(
+            oficina=self.oficina, data_previsao__lt=date.today(), status__in_literal=STATUS_OS_ABERTOS
+        )
+        self.assertUsaIndice(ordens.order_by(), 'os_abertas_idx')
+
+    def test_in_literal_so_aceita_choices_do_status(self):
+        with self.assertRaises(ValueError):
+            str(OrdemServico.objects.filter(status__in_literal=["x') OR (1=1"]).query)
+        with self.assertRaises(FieldError):
+            Cliente.objects.filter(nome__in_literal=['Cliente 1'])
+
+    def test_dashboard_clientes_ativos(self):
+        clientes = Cliente.objects.filter(oficina=self.oficina, ativo=True)
+        self.assertUsaIndice(clientes.order_by(), 'cliente_ativos_idx', 'cliente_oficina_ativo_idx')
+
+    def test_lista_clientes(self):
+        clientes = Cliente.objects.filter(oficina=self.oficina).order_by('-data_cadastro', 'id')[:26]
+        self.assertUsaIndice(clientes, 'cliente_oficina_cadastro_idx')
+        self.assertNotIn('TEMP B-TREE', clientes.explain())
+
+    def test_lista_ordens(self):
+        ordens = OrdemServico.objects.filter(oficina=self.oficina).order_by('-data_entrada', '-numero_os')[:26]
+        self.assertUsaIndice(ordens, 'os_oficina_entrada_idx')
+        self.assertNotIn('TEMP B-TREE', ordens.explain())
+
+    def test_lista_ordens_por_status(self):
+        ordens = OrdemServico.objects.filter(oficina=self.oficina, status='concluida')
+        self.assertUsaIndice(ordens.order_by(), 'os_oficina_status_idx', 'os_oficina_entrada_idx')
+
+    def test_lista_faturamento(self):
+        pagamentos = Pagamento.objects.filter(oficina=self.oficina).order_by('-data_pagamento', 'id')[:26]
+        self.assertUsaIndice(pagamentos, 'pagamento_oficina_data_idx')
+        self.assertNotIn('TEMP B-TREE', pagamentos.explain())
+
+    def test_faturamento_pagamentos_por_status_e_data(self):
+        pagamentos = Pagamento.objects.filter(
+            oficina=self.oficina, status='pago', data_pagamento__gte=date.today() - timedelta(days=30)
+        )
+        self.assertUsaIndice(pagamentos.order_by(), 'pagamento_oficina_status_idx')
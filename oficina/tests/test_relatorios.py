@@ -0,0 +1,85 @@
+"""Período dos relatórios: limite de anos, filtro por intervalos contíguos e invalidação dos meses"""
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from oficina.dados_sinteticos import Escala, gerar
+from oficina.models import Oficina, OrdemServico
+from oficina.relatorios import (
+    ANOS_MAXIMOS, _chave_versao, _filtro_segmentos, _inicio_mes, limitar_periodo, segmentos_mensais,
+)
+from oficina.tests import ambiente_isolado
+
+
+HOJE = date(2026, 10, 17)
+
+
+@ambiente_isolado
+class LimitarPeriodoTests(TestCase):
+    def test_periodo_dentro_do_limite_nao_muda(self):
+        self.assertEqual(limitar_periodo(date(2025, 1, 1), HOJE, HOJE), (date(2025, 1, 1), HOJE, False))
+
+    def test_periodo_longo_fica_com_os_ultimos_anos(self):
+        inicio, fim, limitado = limitar_periodo(date(1, 1, 1), date(9999, 12, 31), HOJE)
+        self.assertTrue(limitado)
+        self.assertEqual(fim, date(2026, 10, 31))
+        self.assertEqual(inicio, date(2021, 11, 1))
+        self.assertEqual(len(segmentos_mensais(inicio, fim)), ANOS_MAXIMOS * 12)
+
+    def test_inicio_do_calendario(self):
+        self.assertEqual(limitar_periodo(date(1, 1, 1), date(1, 3, 5), HOJE), (date(1, 1, 1), date(1, 3, 5), False))
+
+    def test_segmentos_contiguos_viram_um_intervalo(self):
+        segmentos = segmentos_mensais(date(2024, 1, 15), date(2025, 6, 3))
+        self.assertEqual(len(_filtro_segmentos('dia', segmentos).children), 1)
+        self.assertEqual(len(_filtro_segmentos('dia', segmentos[:2] + segmentos[5:]).children), 2)
+
+
+@ambiente_isolado
+class RelatoriosPeriodoLongoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        resultado = gerar(Escala(oficinas=1, clientes=3, ordens=10, meses=3), semente=1, tamanho_lote=100)
+        Oficina.objects.filter(pk=resultado.oficinas[0].pk).update(modulo_relatorios=True)
+        cls.dono = resultado.usuarios[0]
+
+    def test_periodo_muito_longo(self):
+        cache.clear()
+        cliente = Client()
+        cliente.force_login(self.dono)
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = cliente.get(reverse('relatorios'), {'data_inicio': '0001-01-01', 'data_fim': '9999-12-31'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(segmentos_mensais(resposta.context['data_inicio'], resposta.context['data_fim'])),
+                         ANOS_MAXIMOS * 12)
+        # Cada relatório filtra os meses que faltam com um único intervalo
+        for consulta in contexto.captured_queries:
+            self.assertLessEqual(consulta['sql'].count(' BETWEEN '), 1, consulta['sql'])
+
+
+@ambiente_isolado
+class InvalidacaoRelatoriosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gerar(Escala(oficinas=1, clientes=3, ordens=6, itens=4, meses=3), semente=1, tamanho_lote=100)
+
+    def test_exclusao_da_ordem_nao_consulta_a_ordem_de_cada_item(self):
+        ordem = OrdemServico.objects.annotate(quantidade=Count('itens')).filter(quantidade__gt=1).first()
+        chave = _chave_versao(ordem.oficina_id, _inicio_mes(ordem.data_entrada))
+        cache.clear()
+        with CaptureQueriesContext(connection) as contexto, self.captureOnCommitCallbacks(execute=True):
+            ordem.delete()
+
+        tabela = connection.ops.quote_name(OrdemServico._meta.db_table)
+        selects = [
+            consulta['sql'] for consulta in contexto.captured_queries
+            if consulta['sql'].startswith('SELECT') and f'FROM {tabela}' in consulta['sql']
+        ]
+        self.assertEqual(selects, [])
+        # O mês continua invalidado, pelo sinal da própria ordem
+        self.assertIsNotNone(cache.get(chave))
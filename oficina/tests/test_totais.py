@@ -0,0 +1,68 @@
+"""
+Totais das ordens mantidos pelos itens (totais.py): o valor total não é
+informado na criação e o desconto nunca deixa o valor final negativo.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+
+from oficina import totais
+from oficina.models import Cliente, ItemServico, Oficina, OrdemServico, Servico, Veiculo
+from oficina.tests import ambiente_isolado
+
+
+@ambiente_isolado
+class TotaisOrdemTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficina = Oficina.objects.create(
+            nome='Oficina Teste', cnpj='00.000.000/0001-00', telefone='(11) 99999-9999',
+            email='contato@oficina.com', cidade='São Paulo'
+        )
+        cliente = Cliente.objects.create(
+            oficina=cls.oficina, nome='Cliente', cpf_cnpj='00000000000', telefone='(11) 90000-0000'
+        )
+        cls.veiculo = Veiculo.objects.create(cliente=cliente, marca='Fiat', modelo='Uno', ano=2010, placa='ABC0001')
+        cls.servico = Servico.objects.create(nome='Revisão', valor_padrao=100)
+
+    def nova_ordem(self, **campos):
+        return OrdemServico.objects.create(
+            oficina=self.oficina, cliente_id=self.veiculo.cliente_id, veiculo=self.veiculo,
+            data_previsao=date.today() + timedelta(days=3), descricao_problema='Teste', **campos
+        )
+
+    def assertTotais(self, ordem, valor_total, valor_final):
+        ordem.refresh_from_db()
+        self.assertEqual((ordem.valor_total, ordem.valor_final), (Decimal(valor_total), Decimal(valor_final)))
+
+    def test_valor_total_informado_na_criacao(self):
+        with self.assertRaises(ValueError):
+            self.nova_ordem(valor_total=100)
+        self.assertFalse(OrdemServico.objects.exists())
+
+    def test_desconto_sem_itens_nao_fica_negativo(self):
+        ordem = self.nova_ordem(desconto=50)
+        self.assertTotais(ordem, 0, 0)
+
+        item = ItemServico.objects.create(ordem=ordem, servico=self.servico, quantidade=1, valor_unitario=30)
+        self.assertTotais(ordem, 30, 0)
+        item.quantidade = 3
+        item.save()
+        self.assertTotais(ordem, 90, 40)
+        item.delete()
+        self.assertTotais(ordem, 0, 0)
+
+    def test_desconto_alterado_e_recalculo(self):
+        ordem = self.nova_ordem()
+        ItemServico.objects.create(ordem=ordem, servico=self.servico, quantidade=1, valor_unitario=80)
+        ordem.desconto = 100
+        ordem.save(update_fields=['desconto', 'valor_final'])
+        self.assertTotais(ordem, 80, 0)
+        ordem.desconto = 20
+        ordem.save()
+        self.assertTotais(ordem, 80, 60)
+
+        OrdemServico.objects.filter(pk=ordem.pk).update(valor_total=0, valor_final=0, desconto=120)
+        self.assertEqual(totais.recalcular_totais(OrdemServico.objects.filter(pk=ordem.pk)), 1)
+        self.assertTotais(ordem, 80, 0)
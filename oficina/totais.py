@@ -0,0 +1,73 @@
+"""
+Totais das ordens de serviço mantidos a partir dos itens (ItemServico).
+
+OrdemServico.valor_total é a soma dos valor_total dos itens da ordem e
+valor_final é valor_total - desconto (zero quando o desconto passa do
+total). Cada alteração de item aplica só a
+diferença na ordem com um UPDATE de expressões F(), sem somar as outras
+linhas; assim duas alterações simultâneas na mesma ordem não se
+sobrescrevem e as listagens mostram os totais sem agregar os itens.
+
+Toda ordem começa com total zero e nenhuma tem um total que os itens não
+expliquem (a migração 0015 converteu os valores digitados no formulário
+antigo em itens). OrdemServico.save nunca grava valor_total de uma ordem
+existente (ver o model); recalcular_totais refaz os totais a partir dos
+itens quando eles forem alterados por fora dos sinais
+(UPDATE/bulk_create/SQL direto).
+"""
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ItemServico, OrdemServico, expressao_valor_final
+
+
+def _aplicar(ordem_id, delta):
+    """Soma delta (com sinal) a valor_total da ordem e recalcula valor_final"""
+    if ordem_id is None:
+        return
+    # atualizado_em muda mesmo com delta zero: os itens aparecem nos detalhes da ordem
+    OrdemServico.objects.filter(pk=ordem_id).update(
+        valor_total=F('valor_total') + delta,
+        # As expressões do SET leem a linha de antes do UPDATE
+        valor_final=expressao_valor_final(F('valor_total') + delta, F('desconto')),
+        atualizado_em=timezone.now(),
+    )
+
+
+def registrar_item(item):
+    """Aplica a diferença entre o estado anterior e o atual de um item salvo"""
+    anterior = getattr(item, '_total_carregado', None)
+    atual = item.estado_total()
+    with transaction.atomic():
+        if anterior is not None and anterior[0] != atual[0]:
+            # O item mudou de ordem: sai da anterior e entra inteiro na nova
+            _aplicar(anterior[0], -anterior[1])
+            _aplicar(atual[0], atual[1])
+        else:
+            _aplicar(atual[0], atual[1] - (anterior[1] if anterior is not None else 0))
+    item._total_carregado = atual
+
+
+def remover_item(item):
+    """Retira um item excluído do total da sua ordem"""
+    ordem_id, valor = getattr(item, '_total_carregado', None) or item.estado_total()
+    _aplicar(ordem_id, -valor)
+
+
+def recalcular_totais(ordens=None):
+    """
+    Refaz valor_total e valor_final de `ordens` (queryset; todas se None)
+    somando os itens, num único UPDATE. Retorna o número de ordens.
+    """
+    if ordens is None:
+        ordens = OrdemServico.objects.all()
+    soma = ItemServico.objects.filter(ordem=OuterRef('pk')).order_by().values('ordem').annotate(
+        total=Sum('valor_total')
+    ).values('total')
+    total = Coalesce(Subquery(soma), Value(0), output_field=DecimalField(max_digits=10, decimal_places=2))
+    with transaction.atomic():
+        quantidade = ordens.update(valor_total=total, atualizado_em=timezone.now())
+        ordens.update(valor_final=expressao_valor_final(F('valor_total'), F('desconto')))
+    return quantidade
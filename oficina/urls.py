@@ -21,34 +21,45 @@ urlpatterns = [
     path('gerenciar/oficinas/<int:pk>/toggle/', views.admin_oficina_toggle, name='admin_oficina_toggle'),
     path('gerenciar/oficinas/<int:pk>/excluir/', views.admin_oficina_excluir, name='admin_oficina_excluir'),
     path('gerenciar/oficinas/<int:pk>/resetar-senha/', views.admin_resetar_senha, name='admin_resetar_senha'),
+    path('gerenciar/metricas/', views.metricas, name='metricas'),
     
     # Clientes
     path('clientes/', views.clientes_lista, name='clientes_lista'),
+    path('clientes/exportar/', views.clientes_exportar, name='clientes_exportar'),
     path('clientes/novo/', views.cliente_criar, name='cliente_criar'),
     path('clientes/<int:pk>/editar/', views.cliente_editar, name='cliente_editar'),
     path('clientes/<int:pk>/deletar/', views.cliente_deletar, name='cliente_deletar'),
     
     # Ordens de Serviço
     path('ordens/', views.ordens_lista, name='ordens_lista'),
+    path('ordens/exportar/', views.ordens_exportar, name='ordens_exportar'),
     path('ordens/nova/', views.ordem_criar, name='ordem_criar'),
     path('ordens/<int:pk>/editar/', views.ordem_editar, name='ordem_editar'),
     path('ordens/<int:pk>/', views.ordem_visualizar, name='ordem_visualizar'),
+    path('ordens/<int:pk>/itens/adicionar/', views.ordem_item_adicionar, name='ordem_item_adicionar'),
+    path('ordens/itens/<int:pk>/remover/', views.ordem_item_remover, name='ordem_item_remover'),
     
     # API
     path('api/veiculos-cliente/', views.get_veiculos_cliente, name='get_veiculos_cliente'),
+    path('api/autocompletar/', views.autocompletar, name='autocompletar'),
     path('api/criar-veiculo-rapido/', views.criar_veiculo_rapido, name='criar_veiculo_rapido'),
     path('api/obter-veiculo/<int:pk>/', views.obter_veiculo, name='obter_veiculo'),
     path('api/editar-veiculo/<int:pk>/', views.editar_veiculo, name='editar_veiculo'),
     path('api/excluir-veiculo/<int:pk>/', views.excluir_veiculo, name='excluir_veiculo'),
     path('api/alterar-status-ordem/<int:pk>/', views.alterar_status_ordem, name='alterar_status_ordem'),
+    path('api/alterar-status-ordens/', views.alterar_status_ordens, name='alterar_status_ordens'),
     path('api/alterar-status-pagamento/<int:pk>/', views.alterar_status_pagamento, name='alterar_status_pagamento'),
     path('api/alterar-metodo-pagamento/<int:pk>/', views.alterar_metodo_pagamento, name='alterar_metodo_pagamento'),
     
     # Faturamento
     path('faturamento/', views.faturamento, name='faturamento'),
+    path('faturamento/exportar/', views.faturamento_exportar, name='faturamento_exportar'),
     
     # Estoque
     path('estoque/', views.estoque, name='estoque'),
+    path('estoque/pecas/nova/', views.peca_criar, name='peca_criar'),
+    path('estoque/pecas/<int:pk>/editar/', views.peca_editar, name='peca_editar'),
+    path('estoque/movimentos/novo/', views.movimento_criar, name='movimento_criar'),
     
     # Relatórios
     path('relatorios/', views.relatorios, name='relatorios'),
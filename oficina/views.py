@@ -3,23 +3,51 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Sum, Count, Q
+from django.db.models import Count, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django import forms
 from datetime import datetime, timedelta
-from .models import Cliente, Veiculo, OrdemServico, Servico, Pagamento, Oficina
-from .forms import ClienteForm, VeiculoForm, OrdemServicoForm, PagamentoForm, OficinaForm
+from .models import (
+    Cliente, Veiculo, OrdemServico, ItemServico, Servico, Pagamento, Oficina, Peca, MovimentoEstoque, ExclusaoOficina,
+)
+from .forms import (
+    ClienteForm, VeiculoForm, OrdemServicoForm, ItemServicoForm, PagamentoForm, OficinaForm, PecaForm,
+    MovimentoEstoqueForm,
+)
+from .busca import filtro_ids as filtro_busca, sugestoes
+from .condicional import (
+    etag_ordem, etag_veiculo, etag_veiculos_cliente, ultima_alteracao_ordem, ultima_alteracao_veiculo,
+)
+from .decorators import modulo_requerido
+from .estoque import (
+    SaldoInsuficiente, abaixo_do_minimo, com_saldo, registrar_movimento, resumo_estoque, saldo_atual,
+)
+from .estatisticas import estatisticas_dashboard, oficinas_com_totais, proximo_mes
+from .exclusao import solicitar_exclusao
+from .exportacao import (
+    CABECALHO_CLIENTES, CABECALHO_ORDENS, CABECALHO_PAGAMENTOS,
+    linhas_clientes, linhas_ordens, linhas_pagamentos, resposta_csv,
+)
+from .metricas import formato_prometheus, registro as registro_metricas
+from .middleware import oficina_do_usuario
+from .ordens import alterar_status_em_lote, ler_alteracoes
+from .paginacao import paginar_por_cursor
+from .receita import totais_por_status
+from .relatorios import (
+    ANOS_MAXIMOS as RELATORIOS_ANOS_MAXIMOS, atrasadas_por_faixa, limitar_periodo, ordens_por_status,
+    periodo_padrao, prazo_medio, receita_por_periodo, servicos_mais_vendidos,
+)
+from .replica import somente_leitura
 
 
 # Helper function para obter a oficina do usuário logado
 def get_user_oficina(user):
     """Retorna a oficina do usuário logado (se não for superuser)"""
-    if user.is_superuser:
-        return None
-    try:
-        return Oficina.objects.get(proprietario=user, ativo=True)
-    except Oficina.DoesNotExist:
-        return None
+    # Nas views use request.oficina, resolvida uma vez pelo OficinaMiddleware
+    return oficina_do_usuario(user)
 
 
 def login_view(request):
@@ -66,7 +94,7 @@ def perfil(request):
         messages.info(request, 'Superusuários não possuem perfil de oficina.')
         return redirect('admin_dashboard')
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Você não possui uma oficina associada.')
         return redirect('logout')
@@ -114,6 +142,7 @@ def alterar_senha(request):
 
 
 @login_required
+@somente_leitura
 def dashboard(request):
     """Dashboard principal com estatísticas da oficina do usuário"""
     # Verificar se é superusuário (redireciona para admin dashboard)
@@ -121,105 +150,80 @@ def dashboard(request):
         return redirect('admin_dashboard')
     
     # Obter oficina do usuário
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Você não possui uma oficina associada. Entre em contato com o administrador.')
         return redirect('logout')
     
-    hoje = timezone.now().date()
-    mes_atual = hoje.month
-    ano_atual = hoje.year
-    
-    # Estatísticas filtradas por oficina
-    ordens_abertas = OrdemServico.objects.filter(
-        oficina=oficina,
-        status__in=['aguardando_aprovacao', 'em_andamento', 'aguardando_pecas']
-    ).count()
-    
-    faturamento_mensal = Pagamento.objects.filter(
-        ordem__oficina=oficina,
-        data_pagamento__month=mes_atual,
-        data_pagamento__year=ano_atual,
-        status='pago'
-    ).aggregate(total=Sum('valor'))['total'] or 0
-    
-    clientes_ativos = Cliente.objects.filter(oficina=oficina, ativo=True).count()
-    
-    ordens_atrasadas = OrdemServico.objects.filter(
-        oficina=oficina,
-        data_previsao__lt=hoje,
-        status__in=['aguardando_aprovacao', 'em_andamento', 'aguardando_pecas']
-    ).count()
+    # Indicadores e gráfico calculados em poucas consultas e mantidos em cache
+    estatisticas = estatisticas_dashboard(oficina)
     
     # Ordens recentes da oficina
     ordens_recentes = OrdemServico.objects.filter(oficina=oficina).select_related('cliente', 'veiculo').order_by('-data_entrada')[:5]
     
-    # Faturamento últimos 6 meses da oficina
-    faturamento_meses = []
-    for i in range(5, -1, -1):
-        data = hoje - timedelta(days=30*i)
-        mes = data.month
-        ano = data.year
-        total = Pagamento.objects.filter(
-            ordem__oficina=oficina,
-            data_pagamento__month=mes,
-            data_pagamento__year=ano,
-            status='pago'
-        ).aggregate(total=Sum('valor'))['total'] or 0
-        faturamento_meses.append({
-            'mes': data.strftime('%b'),
-            'valor': float(total)
-        })
-    
     context = {
         'oficina': oficina,
-        'ordens_abertas': ordens_abertas,
-        'faturamento_mensal': faturamento_mensal,
-        'clientes_ativos': clientes_ativos,
-        'ordens_atrasadas': ordens_atrasadas,
         'ordens_recentes': ordens_recentes,
-        'faturamento_meses': faturamento_meses,
+        **estatisticas,
     }
     
     return render(request, 'oficina/dashboard.html', context)
 
 
 # CLIENTES
-@login_required
-def clientes_lista(request):
-    """Lista todos os clientes da oficina"""
-    oficina = get_user_oficina(request.user)
-    if not oficina:
-        messages.error(request, 'Acesso negado.')
-        return redirect('dashboard')
-    
-    busca = request.GET.get('busca', '')
-    filtro = request.GET.get('filtro', 'todos')
+def filtrar_clientes(oficina, params):
+    """Clientes da oficina filtrados pelos parâmetros busca/filtro da listagem"""
+    busca = params.get('busca', '')
+    filtro = params.get('filtro', 'todos')
     
     clientes = Cliente.objects.filter(oficina=oficina)
     
-    if busca:
-        clientes = clientes.filter(
-            Q(nome__icontains=busca) |
-            Q(cpf_cnpj__icontains=busca) |
-            Q(telefone__icontains=busca) |
-            Q(email__icontains=busca)
-        )
+    encontrados = filtro_busca('cliente', oficina, busca)
+    if encontrados is not None:
+        clientes = clientes.filter(pk__in=encontrados)
     
     if filtro == 'ativos':
         clientes = clientes.filter(ativo=True)
     elif filtro == 'inativos':
         clientes = clientes.filter(ativo=False)
     
-    clientes = clientes.order_by('-data_cadastro')
+    return clientes
+
+
+@login_required
+@modulo_requerido('clientes')
+@somente_leitura
+def clientes_lista(request):
+    """Lista todos os clientes da oficina"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    clientes = filtrar_clientes(oficina, request.GET)
+    pagina = paginar_por_cursor(request, clientes, ['-data_cadastro', 'id'])
     
-    return render(request, 'oficina/clientes.html', {'clientes': clientes})
+    return render(request, 'oficina/clientes.html', {'clientes': pagina, 'pagina': pagina})
 
 
 @login_required
+@modulo_requerido('clientes')
+def clientes_exportar(request):
+    """Exporta em CSV os clientes com os mesmos filtros da listagem"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    clientes = filtrar_clientes(oficina, request.GET).order_by('-data_cadastro', 'id')
+    return resposta_csv('clientes', CABECALHO_CLIENTES, linhas_clientes(clientes))
+
+
+@login_required
+@modulo_requerido('clientes')
 def cliente_criar(request):
     """Criar novo cliente"""
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Acesso negado.')
         return redirect('dashboard')
@@ -257,9 +261,10 @@ def cliente_criar(request):
 
 
 @login_required
+@modulo_requerido('clientes')
 def cliente_editar(request, pk):
     """Editar cliente existente"""
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Acesso negado.')
         return redirect('dashboard')
@@ -303,9 +308,10 @@ def cliente_editar(request, pk):
 
 
 @login_required
+@modulo_requerido('clientes')
 def cliente_deletar(request, pk):
     """Deletar cliente"""
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Acesso negado.')
         return redirect('dashboard')
@@ -317,38 +323,61 @@ def cliente_deletar(request, pk):
 
 
 # ORDENS DE SERVIÇO
-@login_required
-def ordens_lista(request):
-    """Lista todas as ordens de serviço da oficina"""
-    oficina = get_user_oficina(request.user)
-    if not oficina:
-        messages.error(request, 'Acesso negado.')
-        return redirect('dashboard')
+def filtrar_ordens(oficina, params):
+    """Ordens da oficina filtradas pelos parâmetros busca/filtro da listagem"""
+    busca = params.get('busca', '')
+    filtro = params.get('filtro', 'todas')
     
-    busca = request.GET.get('busca', '')
-    filtro = request.GET.get('filtro', 'todas')
+    ordens = OrdemServico.objects.filter(oficina=oficina)
     
-    ordens = OrdemServico.objects.filter(oficina=oficina).select_related('cliente', 'veiculo')
-    
-    if busca:
+    encontradas = filtro_busca('ordem', oficina, busca)
+    if encontradas is not None:
         ordens = ordens.filter(
-            Q(numero_os__icontains=busca) |
-            Q(cliente__nome__icontains=busca) |
-            Q(veiculo__placa__icontains=busca)
+            Q(pk__in=encontradas) |
+            Q(cliente_id__in=filtro_busca('cliente', oficina, busca)) |
+            Q(veiculo_id__in=filtro_busca('veiculo', oficina, busca))
         )
     
     if filtro != 'todas':
         ordens = ordens.filter(status=filtro)
     
-    ordens = ordens.order_by('-data_entrada')
+    return ordens
+
+
+@login_required
+@modulo_requerido('ordens')
+@somente_leitura
+def ordens_lista(request):
+    """Lista todas as ordens de serviço da oficina"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    ordens = filtrar_ordens(oficina, request.GET).select_related('cliente', 'veiculo')
+    pagina = paginar_por_cursor(request, ordens, ['-data_entrada', '-numero_os'])
     
-    return render(request, 'oficina/ordens.html', {'ordens': ordens})
+    return render(request, 'oficina/ordens.html', {'ordens': pagina, 'pagina': pagina})
 
 
 @login_required
+@modulo_requerido('ordens')
+def ordens_exportar(request):
+    """Exporta em CSV as ordens de serviço com os mesmos filtros da listagem"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    ordens = filtrar_ordens(oficina, request.GET).order_by('-data_entrada', '-numero_os')
+    return resposta_csv('ordens_servico', CABECALHO_ORDENS, linhas_ordens(ordens))
+
+
+@login_required
+@modulo_requerido('ordens')
 def ordem_criar(request):
     """Criar nova ordem de serviço"""
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Acesso negado.')
         return redirect('dashboard')
@@ -368,9 +397,10 @@ def ordem_criar(request):
 
 
 @login_required
+@modulo_requerido('ordens')
 def ordem_editar(request, pk):
     """Editar ordem de serviço"""
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Acesso negado.')
         return redirect('dashboard')
@@ -390,22 +420,84 @@ def ordem_editar(request, pk):
 
 
 @login_required
+@modulo_requerido('ordens')
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_ordem, last_modified_func=ultima_alteracao_ordem)
 def ordem_visualizar(request, pk):
     """Visualizar detalhes da ordem de serviço"""
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Acesso negado.')
         return redirect('dashboard')
     
     ordem = get_object_or_404(OrdemServico, pk=pk, oficina=oficina)
-    return render(request, 'oficina/ordem_detalhes.html', {'ordem': ordem})
+    itens = ordem.itens.select_related('servico').order_by('pk')
+    return render(request, 'oficina/ordem_detalhes.html', {
+        'ordem': ordem, 'itens': itens, 'form_item': ItemServicoForm(),
+    })
+
+
+@login_required
+@modulo_requerido('ordens')
+@require_POST
+def ordem_item_adicionar(request, pk):
+    """Adicionar item de serviço à ordem (o total da ordem é atualizado pelos sinais)"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+
+    ordem = get_object_or_404(OrdemServico, pk=pk, oficina=oficina)
+    form = ItemServicoForm(request.POST)
+    if form.is_valid():
+        item = form.save(commit=False)
+        item.ordem = ordem
+        item.save()
+        messages.success(request, f'Serviço {item.servico.nome} adicionado à OS #{ordem.numero_os}.')
+    else:
+        erros = [erro for lista in form.errors.values() for erro in lista]
+        messages.error(request, 'Item não adicionado: ' + ' '.join(erros))
+    return redirect('ordem_visualizar', pk=ordem.pk)
+
+
+@login_required
+@modulo_requerido('ordens')
+@require_POST
+def ordem_item_remover(request, pk):
+    """Remover item de serviço da ordem"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+
+    item = get_object_or_404(ItemServico, pk=pk, oficina=oficina)
+    item.delete()
+    messages.success(request, 'Item removido da ordem de serviço.')
+    return redirect('ordem_visualizar', pk=item.ordem_id)
 
 
 # FATURAMENTO
+def filtrar_pagamentos(oficina, params):
+    """Pagamentos da oficina no período data_inicio/data_fim dos parâmetros"""
+    data_inicio = params.get('data_inicio')
+    data_fim = params.get('data_fim')
+    
+    pagamentos = Pagamento.objects.filter(oficina=oficina)
+    
+    if data_inicio:
+        pagamentos = pagamentos.filter(data_pagamento__gte=data_inicio)
+    if data_fim:
+        pagamentos = pagamentos.filter(data_pagamento__lte=data_fim)
+    
+    return pagamentos
+
+
 @login_required
+@modulo_requerido('faturamento')
+@somente_leitura
 def faturamento(request):
     """Página de faturamento da oficina"""
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         messages.error(request, 'Acesso negado.')
         return redirect('dashboard')
@@ -413,26 +505,23 @@ def faturamento(request):
     data_inicio = request.GET.get('data_inicio')
     data_fim = request.GET.get('data_fim')
     
-    pagamentos = Pagamento.objects.filter(ordem__oficina=oficina).select_related('ordem', 'ordem__cliente')
+    pagamentos = filtrar_pagamentos(oficina, request.GET).select_related('ordem', 'ordem__cliente')
     
-    if data_inicio:
-        pagamentos = pagamentos.filter(data_pagamento__gte=data_inicio)
-    if data_fim:
-        pagamentos = pagamentos.filter(data_pagamento__lte=data_fim)
-    
-    # Estatísticas da oficina
-    receita_total = pagamentos.filter(status='pago').aggregate(total=Sum('valor'))['total'] or 0
+    # Estatísticas da oficina (a partir do faturamento consolidado por dia)
+    totais = totais_por_status(oficina, data_inicio, data_fim)
+    receita_total = totais['pago']
     ordens_finalizadas = OrdemServico.objects.filter(
         oficina=oficina, 
         status__in=['concluida', 'entregue']
     ).count()
-    contas_receber = pagamentos.filter(status='pendente').aggregate(total=Sum('valor'))['total'] or 0
+    contas_receber = totais['pendente']
     ticket_medio = receita_total / ordens_finalizadas if ordens_finalizadas > 0 else 0
     
-    pagamentos = pagamentos.order_by('-data_pagamento')
+    pagina = paginar_por_cursor(request, pagamentos, ['-data_pagamento', 'id'])
     
     context = {
-        'pagamentos': pagamentos,
+        'pagamentos': pagina,
+        'pagina': pagina,
         'receita_total': receita_total,
         'ordens_finalizadas': ordens_finalizadas,
         'contas_receber': contas_receber,
@@ -442,23 +531,197 @@ def faturamento(request):
     return render(request, 'oficina/faturamento.html', context)
 
 
+@login_required
+@modulo_requerido('faturamento')
+def faturamento_exportar(request):
+    """Exporta em CSV os pagamentos do período filtrado no faturamento"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    pagamentos = filtrar_pagamentos(oficina, request.GET).order_by('-data_pagamento', 'id')
+    return resposta_csv('faturamento', CABECALHO_PAGAMENTOS, linhas_pagamentos(pagamentos))
+
+
 # ESTOQUE
+def filtrar_pecas(oficina, params):
+    """Peças da oficina, com saldo, filtradas pelos parâmetros busca/filtro da listagem"""
+    busca = params.get('busca', '').strip()
+    filtro = params.get('filtro', 'ativas')
+    
+    pecas = Peca.objects.filter(oficina=oficina)
+    
+    if busca:
+        pecas = pecas.filter(Q(nome__icontains=busca) | Q(codigo__icontains=busca))
+    
+    if filtro == 'baixo':
+        return abaixo_do_minimo(pecas)
+    if filtro == 'ativas':
+        pecas = pecas.filter(ativo=True)
+    elif filtro == 'inativas':
+        pecas = pecas.filter(ativo=False)
+    
+    return com_saldo(pecas)
+
+
 @login_required
+@modulo_requerido('estoque')
+@somente_leitura
 def estoque(request):
-    """Página de estoque (em desenvolvimento)"""
-    return render(request, 'oficina/estoque.html')
+    """Lista as peças da oficina com o saldo atual"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    pecas = filtrar_pecas(oficina, request.GET)
+    pagina = paginar_por_cursor(request, pecas, ['nome', 'id'])
+    
+    context = {
+        'pecas': pagina,
+        'pagina': pagina,
+        'resumo': resumo_estoque(oficina),
+        'movimentos': MovimentoEstoque.objects.filter(oficina=oficina).select_related(
+            'peca', 'ordem', 'usuario'
+        )[:10],
+    }
+    return render(request, 'oficina/estoque.html', context)
+
+
+@login_required
+@modulo_requerido('estoque')
+def peca_criar(request):
+    """Cadastrar nova peça"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    if request.method == 'POST':
+        form = PecaForm(request.POST, oficina=oficina)
+        if form.is_valid():
+            peca = form.save(commit=False)
+            peca.oficina = oficina
+            peca.save()
+            messages.success(request, f'Peça {peca.codigo} cadastrada com sucesso!')
+            return redirect('estoque')
+    else:
+        form = PecaForm(oficina=oficina)
+    
+    return render(request, 'oficina/peca_form.html', {'form': form, 'titulo': 'Nova Peça'})
+
+
+@login_required
+@modulo_requerido('estoque')
+def peca_editar(request, pk):
+    """Editar peça existente"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    peca = get_object_or_404(Peca, pk=pk, oficina=oficina)
+    
+    if request.method == 'POST':
+        form = PecaForm(request.POST, instance=peca, oficina=oficina)
+        if form.is_valid():
+            form.save()
+            messages.success(request, f'Peça {peca.codigo} atualizada com sucesso!')
+            return redirect('estoque')
+    else:
+        form = PecaForm(instance=peca, oficina=oficina)
+    
+    context = {
+        'form': form,
+        'titulo': 'Editar Peça',
+        'peca': peca,
+        'saldo': saldo_atual(peca),
+        'movimentos': peca.movimentos.select_related('ordem', 'usuario')[:20],
+    }
+    return render(request, 'oficina/peca_form.html', context)
+
+
+@login_required
+@modulo_requerido('estoque')
+def movimento_criar(request):
+    """Lançar entrada, saída ou ajuste de estoque"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    if request.method == 'POST':
+        form = MovimentoEstoqueForm(request.POST, oficina=oficina)
+        if form.is_valid():
+            dados = form.cleaned_data
+            try:
+                movimento = registrar_movimento(
+                    dados['peca'], dados['tipo'], dados['quantidade'],
+                    usuario=request.user,
+                    ordem=dados.get('ordem'),
+                    custo_unitario=dados.get('custo_unitario'),
+                    observacao=dados.get('observacao'),
+                )
+            except SaldoInsuficiente:
+                # Outra saída da peça foi lançada depois da validação do formulário
+                form.add_error('quantidade', 'Quantidade maior que o saldo em estoque')
+            else:
+                messages.success(
+                    request, f'{movimento.get_tipo_display()} de {movimento.peca.nome} registrada com sucesso!'
+                )
+                return redirect('estoque')
+    else:
+        form = MovimentoEstoqueForm(oficina=oficina, initial={
+            'peca': request.GET.get('peca'),
+            'tipo': request.GET.get('tipo', 'entrada'),
+            'ordem': request.GET.get('ordem'),
+        })
+    
+    return render(request, 'oficina/movimento_form.html', {'form': form})
 
 
 # RELATÓRIOS
 @login_required
+@modulo_requerido('relatorios')
+@somente_leitura
 def relatorios(request):
-    """Página de relatórios (em desenvolvimento)"""
-    return render(request, 'oficina/relatorios.html')
+    """Relatórios da oficina no período (padrão: últimos 12 meses)"""
+    oficina = request.oficina
+    if not oficina:
+        messages.error(request, 'Acesso negado.')
+        return redirect('dashboard')
+    
+    inicio_padrao, fim_padrao = periodo_padrao(timezone.localdate())
+    try:
+        data_inicio = parse_date(request.GET.get('data_inicio') or '') or inicio_padrao
+        data_fim = parse_date(request.GET.get('data_fim') or '') or fim_padrao
+    except ValueError:
+        data_inicio, data_fim = inicio_padrao, fim_padrao
+    if data_inicio > data_fim:
+        data_inicio, data_fim = data_fim, data_inicio
+    data_inicio, data_fim, limitado = limitar_periodo(data_inicio, data_fim, timezone.localdate())
+    if limitado:
+        messages.info(
+            request, f'O período foi limitado a {RELATORIOS_ANOS_MAXIMOS} anos, até o mês atual.'
+        )
+    
+    context = {
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'receita': receita_por_periodo(oficina, data_inicio, data_fim),
+        'ordens_status': ordens_por_status(oficina, data_inicio, data_fim),
+        'prazo': prazo_medio(oficina, data_inicio, data_fim),
+        'servicos': servicos_mais_vendidos(oficina, data_inicio, data_fim),
+        'atrasadas': atrasadas_por_faixa(oficina),
+    }
+    return render(request, 'oficina/relatorios.html', context)
 
 
 # ==================== VIEWS DO SUPERUSUÁRIO ====================
 
 @login_required
+@somente_leitura
 def admin_dashboard(request):
     """Dashboard do superusuário para gerenciar todas as oficinas"""
     if not request.user.is_superuser:
@@ -466,34 +729,39 @@ def admin_dashboard(request):
         return redirect('dashboard')
     
     # Estatísticas gerais
-    total_oficinas = Oficina.objects.count()
-    oficinas_ativas = Oficina.objects.filter(ativo=True).count()
-    oficinas_inativas = Oficina.objects.filter(ativo=False).count()
+    contagem = Oficina.objects.aggregate(
+        total=Count('id'),
+        ativas=Count('id', filter=Q(ativo=True)),
+    )
     
     # Receita total de todas as oficinas
-    receita_total = Pagamento.objects.filter(status='pago').aggregate(total=Sum('valor'))['total'] or 0
+    receita_total = totais_por_status()['pago']
     
     # Total de ordens do mês atual
     hoje = timezone.now().date()
     total_ordens = OrdemServico.objects.filter(
-        data_entrada__month=hoje.month,
-        data_entrada__year=hoje.year
+        data_entrada__gte=hoje.replace(day=1),
+        data_entrada__lt=proximo_mes(hoje)
     ).count()
     
-    # Lista de oficinas com estatísticas
-    oficinas = Oficina.objects.annotate(
-        total_clientes=Count('clientes'),
-        total_ordens=Count('ordens'),
-        faturamento_total=Sum('ordens__pagamentos__valor', filter=Q(ordens__pagamentos__status='pago'))
-    ).order_by('-ativo', '-data_cadastro')
+    # Lista de oficinas com estatísticas (subconsultas independentes por oficina)
+    oficinas = list(oficinas_com_totais().order_by('-ativo', '-data_cadastro'))
+    
+    # Exclusões em segundo plano: as em andamento e as últimas encerradas
+    exclusoes = list(ExclusaoOficina.objects.order_by('-criado_em')[:10])
+    em_andamento = {exclusao.oficina_id: exclusao for exclusao in exclusoes if exclusao.ativa}
+    for oficina in oficinas:
+        oficina.exclusao = em_andamento.get(oficina.pk)
     
     context = {
-        'total_oficinas': total_oficinas,
-        'oficinas_ativas': oficinas_ativas,
-        'oficinas_inativas': oficinas_inativas,
+        'total_oficinas': contagem['total'],
+        'oficinas_ativas': contagem['ativas'],
+        'oficinas_inativas': contagem['total'] - contagem['ativas'],
         'receita_total': receita_total,
         'total_ordens': total_ordens,
         'oficinas': oficinas,
+        'exclusoes': exclusoes,
+        'exclusoes_ativas': bool(em_andamento),
     }
     
     return render(request, 'oficina/admin_dashboard.html', context)
@@ -533,6 +801,14 @@ def admin_oficina_criar(request):
     return render(request, 'oficina/admin_oficina_form.html', context)
 
 
+def _exclusao_em_andamento(request, oficina):
+    """Avisa e retorna True se a oficina já está sendo excluída"""
+    if ExclusaoOficina.objects.filter(oficina=oficina, status__in=ExclusaoOficina.STATUS_ATIVOS).exists():
+        messages.error(request, f'A oficina "{oficina.nome}" está sendo excluída.')
+        return True
+    return False
+
+
 @login_required
 def admin_oficina_editar(request, pk):
     """Editar oficina existente"""
@@ -541,6 +817,8 @@ def admin_oficina_editar(request, pk):
         return redirect('dashboard')
     
     oficina = get_object_or_404(Oficina, pk=pk)
+    if _exclusao_em_andamento(request, oficina):
+        return redirect('admin_dashboard')
     
     if request.method == 'POST':
         form = OficinaForm(request.POST, instance=oficina)
@@ -582,16 +860,14 @@ def admin_oficina_detalhes(request, pk):
     
     # Estatísticas da oficina
     hoje = timezone.now().date()
-    mes_atual = hoje.month
-    ano_atual = hoje.year
     
     total_clientes = oficina.clientes.filter(ativo=True).count()
-    total_veiculos = Veiculo.objects.filter(cliente__oficina=oficina).count()
+    total_veiculos = Veiculo.objects.filter(oficina=oficina).count()
     
-    # Ordens de serviço
+    # Ordens de serviço (intervalo de datas, que usa o índice de data_entrada)
     ordens_mes = oficina.ordens.filter(
-        data_entrada__month=mes_atual,
-        data_entrada__year=ano_atual
+        data_entrada__gte=hoje.replace(day=1),
+        data_entrada__lt=proximo_mes(hoje)
     )
     total_ordens_mes = ordens_mes.count()
     
@@ -600,17 +876,8 @@ def admin_oficina_detalhes(request, pk):
     ).order_by('-total')
     
     # Faturamento
-    faturamento_mes = Pagamento.objects.filter(
-        ordem__oficina=oficina,
-        status='pago',
-        data_pagamento__month=mes_atual,
-        data_pagamento__year=ano_atual
-    ).aggregate(total=Sum('valor'))['total'] or 0
-    
-    faturamento_total = Pagamento.objects.filter(
-        ordem__oficina=oficina,
-        status='pago'
-    ).aggregate(total=Sum('valor'))['total'] or 0
+    faturamento_mes = totais_por_status(oficina, hoje.replace(day=1), proximo_mes(hoje) - timedelta(days=1))['pago']
+    faturamento_total = totais_por_status(oficina)['pago']
     
     # Últimas ordens
     ultimas_ordens = oficina.ordens.select_related('cliente', 'veiculo').order_by('-data_entrada')[:10]
@@ -646,6 +913,8 @@ def admin_oficina_toggle(request, pk):
         return redirect('dashboard')
     
     oficina = get_object_or_404(Oficina, pk=pk)
+    if _exclusao_em_andamento(request, oficina):
+        return redirect('admin_dashboard')
     oficina.ativo = not oficina.ativo
     oficina.save()
     
@@ -663,27 +932,30 @@ def admin_oficina_excluir(request, pk):
     
     oficina = get_object_or_404(Oficina, pk=pk)
     
+    if request.method == 'POST' and ExclusaoOficina.objects.filter(
+        oficina=oficina, status__in=ExclusaoOficina.STATUS_ATIVOS
+    ).exists():
+        # Pedir de novo retoma a exclusão, se estiver parada (botão Retomar do painel)
+        solicitar_exclusao(oficina, request.user)
+        messages.success(request, f'A exclusão da oficina "{oficina.nome}" foi retomada.')
+        return redirect('admin_dashboard')
+    
+    if _exclusao_em_andamento(request, oficina):
+        return redirect('admin_dashboard')
+    
     if request.method == 'POST':
-        nome_oficina = oficina.nome
-        proprietario = oficina.proprietario
-        
-        # Verificar se o usuário é proprietário de outras oficinas
-        outras_oficinas = Oficina.objects.filter(proprietario=proprietario).exclude(pk=pk).exists()
-        
-        # Excluir oficina primeiro (cascade deletará clientes, ordens, etc.)
-        oficina.delete()
-        
-        # Depois excluir usuário proprietário se não for superusuário e não tiver outras oficinas
-        if proprietario and not proprietario.is_superuser and not outras_oficinas:
-            proprietario.delete()
-        
-        messages.success(request, f'Oficina "{nome_oficina}" foi excluída com sucesso!')
+        # A oficina é desativada agora e excluída em segundo plano, em lotes
+        # (ver exclusao.py); o proprietário sai junto se não tiver outra oficina
+        solicitar_exclusao(oficina, request.user)
+        messages.success(
+            request, f'A exclusão da oficina "{oficina.nome}" foi iniciada. Acompanhe o progresso nesta página.'
+        )
         return redirect('admin_dashboard')
     
     # Contar dados relacionados
     total_clientes = oficina.clientes.count()
     total_ordens = oficina.ordens.count()
-    total_veiculos = Veiculo.objects.filter(cliente__oficina=oficina).count()
+    total_veiculos = Veiculo.objects.filter(oficina=oficina).count()
     
     context = {
         'oficina': oficina,
@@ -736,6 +1008,21 @@ def admin_resetar_senha(request, pk):
 
 
 @login_required
+def metricas(request):
+    """Métricas de desempenho de todos os workers no formato texto do Prometheus"""
+    from django.http import HttpResponse, HttpResponseForbidden
+    
+    if not request.user.is_superuser:
+        return HttpResponseForbidden('Acesso negado.')
+    
+    texto = formato_prometheus(registro_metricas().consolidado())
+    return HttpResponse(texto, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@login_required
+@modulo_requerido('clientes', api=True)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_veiculos_cliente)
 def get_veiculos_cliente(request):
     """API para buscar veículos de um cliente"""
     from django.http import JsonResponse
@@ -744,19 +1031,41 @@ def get_veiculos_cliente(request):
     if not cliente_id:
         return JsonResponse({'veiculos': []})
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
     veiculos = Veiculo.objects.filter(
         cliente_id=cliente_id,
-        cliente__oficina=oficina
+        oficina=oficina
     ).values('id', 'marca', 'modelo', 'ano', 'placa')
     
     return JsonResponse({'veiculos': list(veiculos)})
 
 
 @login_required
+@modulo_requerido('ordens', api=True)
+def autocompletar(request):
+    """API de sugestões de clientes, veículos e ordens para os campos de formulário"""
+    from django.http import JsonResponse
+    
+    oficina = request.oficina
+    if not oficina:
+        return JsonResponse({'error': 'Acesso negado'}, status=403)
+    
+    tipo = request.GET.get('tipo')
+    if tipo not in ('cliente', 'veiculo', 'ordem'):
+        return JsonResponse({'error': 'Tipo inválido'}, status=400)
+    
+    cliente_id = request.GET.get('cliente', '')
+    resultados = sugestoes(
+        oficina, tipo, request.GET.get('q', ''), cliente_id=int(cliente_id) if cliente_id.isdigit() else None
+    )
+    return JsonResponse({'resultados': resultados})
+
+
+@login_required
+@modulo_requerido('clientes', api=True)
 def criar_veiculo_rapido(request):
     """API para criar veículo rapidamente"""
     from django.http import JsonResponse
@@ -764,7 +1073,7 @@ def criar_veiculo_rapido(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método não permitido'}, status=405)
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
@@ -795,16 +1104,19 @@ def criar_veiculo_rapido(request):
 
 
 @login_required
+@modulo_requerido('clientes', api=True)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_veiculo, last_modified_func=ultima_alteracao_veiculo)
 def obter_veiculo(request, pk):
     """API para obter dados de um veículo"""
     from django.http import JsonResponse
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
     try:
-        veiculo = get_object_or_404(Veiculo, pk=pk, cliente__oficina=oficina)
+        veiculo = get_object_or_404(Veiculo, pk=pk, oficina=oficina)
         return JsonResponse({
             'success': True,
             'veiculo': {
@@ -822,6 +1134,7 @@ def obter_veiculo(request, pk):
 
 
 @login_required
+@modulo_requerido('clientes', api=True)
 def editar_veiculo(request, pk):
     """API para editar um veículo"""
     from django.http import JsonResponse
@@ -829,12 +1142,12 @@ def editar_veiculo(request, pk):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método não permitido'}, status=405)
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
     try:
-        veiculo = get_object_or_404(Veiculo, pk=pk, cliente__oficina=oficina)
+        veiculo = get_object_or_404(Veiculo, pk=pk, oficina=oficina)
         
         veiculo.marca = request.POST.get('marca')
         veiculo.modelo = request.POST.get('modelo')
@@ -853,6 +1166,7 @@ def editar_veiculo(request, pk):
 
 
 @login_required
+@modulo_requerido('clientes', api=True)
 def excluir_veiculo(request, pk):
     """API para excluir um veículo"""
     from django.http import JsonResponse
@@ -860,12 +1174,12 @@ def excluir_veiculo(request, pk):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método não permitido'}, status=405)
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
     try:
-        veiculo = get_object_or_404(Veiculo, pk=pk, cliente__oficina=oficina)
+        veiculo = get_object_or_404(Veiculo, pk=pk, oficina=oficina)
         veiculo.delete()
         return JsonResponse({'success': True})
     except Exception as e:
@@ -873,6 +1187,7 @@ def excluir_veiculo(request, pk):
 
 
 @login_required
+@modulo_requerido('ordens', api=True)
 def alterar_status_ordem(request, pk):
     """API para alterar status de uma ordem de serviço"""
     from django.http import JsonResponse
@@ -881,7 +1196,7 @@ def alterar_status_ordem(request, pk):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método não permitido'}, status=405)
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
@@ -919,6 +1234,36 @@ def alterar_status_ordem(request, pk):
 
 
 @login_required
+@modulo_requerido('ordens', api=True)
+def alterar_status_ordens(request):
+    """
+    API para alterar o status de várias ordens de serviço de uma vez.
+
+    Recebe os campos repetidos `ordem` e `status` (um status por ordem, ou
+    um único status para todas) e retorna o resultado de cada ordem.
+    """
+    from django.http import JsonResponse
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+    
+    oficina = request.oficina
+    if not oficina:
+        return JsonResponse({'error': 'Acesso negado'}, status=403)
+    
+    alteracoes, erro = ler_alteracoes(request.POST)
+    if erro:
+        return JsonResponse({'success': False, 'error': erro}, status=400)
+    
+    resultados = alterar_status_em_lote(oficina, alteracoes)
+    return JsonResponse({
+        'success': all(resultado['success'] for resultado in resultados.values()),
+        'resultados': {str(pk): resultado for pk, resultado in resultados.items()},
+    })
+
+
+@login_required
+@modulo_requerido('faturamento', api=True)
 def alterar_status_pagamento(request, pk):
     """API para alterar status de um pagamento"""
     from django.http import JsonResponse
@@ -927,12 +1272,12 @@ def alterar_status_pagamento(request, pk):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método não permitido'}, status=405)
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
     try:
-        pagamento = get_object_or_404(Pagamento, pk=pk, ordem__oficina=oficina)
+        pagamento = get_object_or_404(Pagamento, pk=pk, oficina=oficina)
         novo_status = request.POST.get('status')
         
         # Validar status
@@ -954,6 +1299,7 @@ def alterar_status_pagamento(request, pk):
 
 
 @login_required
+@modulo_requerido('faturamento', api=True)
 def alterar_metodo_pagamento(request, pk):
     """API para alterar método de pagamento"""
     from django.http import JsonResponse
@@ -961,12 +1307,12 @@ def alterar_metodo_pagamento(request, pk):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método não permitido'}, status=405)
     
-    oficina = get_user_oficina(request.user)
+    oficina = request.oficina
     if not oficina:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
     try:
-        pagamento = get_object_or_404(Pagamento, pk=pk, ordem__oficina=oficina)
+        pagamento = get_object_or_404(Pagamento, pk=pk, oficina=oficina)
         
         # Não permitir alterar método se já foi pago
         if pagamento.status == 'pago':